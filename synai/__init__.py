@@ -8,8 +8,9 @@ from .weave import build_synai
 from .weaver import weave_linker
 from .cli import cli
 from .runtime import SynRuntime, FALLBACK_CHAIN
-from .interfaces import LLMProvider
-from .profiles import MODEL_PROFILES, MODEL_REGISTRY, is_profile, resolve_model
+from .interfaces import LLMProvider, GenerationResult, Usage
+from .profiles import MODEL_PROFILES, MODEL_REGISTRY, MODEL_PRICING, is_profile, resolve_model
+from .accounting import BudgetExceededError
 
 # Providers — imports diretos para conveniência
 from .providers import (
@@ -32,9 +33,13 @@ __all__ = [
     "SynRuntime",
     "FALLBACK_CHAIN",
     "LLMProvider",
+    "GenerationResult",
+    "Usage",
+    "BudgetExceededError",
     # Model Routing
     "MODEL_PROFILES",
     "MODEL_REGISTRY",
+    "MODEL_PRICING",
     "is_profile",
     "resolve_model",
     # Providers
@@ -0,0 +1,187 @@
+"""
+SynAI — Contabilidade de Tokens e Custo
+=======================================
+
+Cada execução de workflow abre um CostLedger que acumula, por chamada, por
+intent e no total, os tokens reportados pelos drivers (GenerationResult.usage)
+e o custo calculado a partir de MODEL_PRICING. Tokens lidos do ou gravados
+no cache de prompt são cobrados com os multiplicadores de CACHE_PRICING.
+
+Com um budget (USD), o roteamento consulta o ledger antes de cada tentativa:
+candidatos cujo custo estimado (prompt + max_tokens) estouraria o budget são
+pulados — a cadeia segue para modelos mais baratos, locais ou :free. Se não
+sobrar nenhum candidato, call_model levanta BudgetExceededError e o workflow
+termina com status 'budget_exceeded'.
+
+O ledger ativo vive em um ContextVar, como o profiler: herdado pelas tasks do
+workflow, sem parâmetro extra a propagar.
+
+Uso:
+    result = await rt.execute_workflow(ast, run_decl, budget=0.05)
+    result["usage"]            # totais, por intent e por chamada
+    synai run pipeline.synx --real --budget 0.05
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .interfaces import Usage
+from .profiles import get_cache_pricing, get_model_price
+
+
+class BudgetExceededError(RuntimeError):
+    """Nenhum candidato cabe no budget restante do workflow."""
+
+    def __init__(self, model: str, budget: float, spent: float):
+        super().__init__(
+            f"Budget de US$ {budget:.4f} esgotado para '{model}' (gasto: US$ {spent:.4f})."
+        )
+        self.model = model
+        self.budget = budget
+        self.spent = spent
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa barata (~4 caracteres por token) para quando não há usage."""
+    return max(1, len(text) // 4) if text else 0
+
+
+def cost_of(price: Optional[Tuple[float, float]], prompt_tokens: int, completion_tokens: int,
+            cached_tokens: int = 0, cache_write_tokens: int = 0,
+            cache: Tuple[float, float] = (1.0, 1.0)) -> float:
+    """
+    Custo (USD) de uma geração. cached_tokens e cache_write_tokens são partes
+    de prompt_tokens, cobradas com os multiplicadores (leitura, gravação) de 'cache'.
+    """
+    if not price:
+        return 0.0
+    uncached = max(0, prompt_tokens - cached_tokens - cache_write_tokens)
+    prompt = uncached + cached_tokens * cache[0] + cache_write_tokens * cache[1]
+    return (prompt * price[0] + completion_tokens * price[1]) / 1_000_000
+
+
+def usage_cost(provider: str, price: Optional[Tuple[float, float]], usage: Usage) -> float:
+    """Custo de 'usage' com o preço dado e o cache de prompt do provider."""
+    return cost_of(price, usage.prompt_tokens, usage.completion_tokens, usage.cached_tokens,
+                   usage.cache_write_tokens, get_cache_pricing(provider))
+
+
+class CostLedger:
+    """
+    Totais de tokens e custo de uma execução de workflow. 'on_record' é
+    chamado com o custo acumulado após cada registro, seja de uma chamada
+    local ou de um worker da malha (ex: RunCheckpoint.charge).
+    """
+
+    def __init__(self, budget: Optional[float] = None, on_record: Optional[Callable[[float], None]] = None):
+        self.budget = budget
+        self.on_record = on_record
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.cache_write_tokens = 0
+        self.cost_usd = 0.0
+        self.unpriced_calls = 0
+        self.calls: List[Dict[str, Any]] = []
+        self.by_intent: Dict[str, Dict[str, Any]] = {}
+
+    def activate(self):
+        """Torna este ledger o ativo no contexto atual. Retorna o token para deactivate()."""
+        return _current_ledger.set(self)
+
+    @staticmethod
+    def deactivate(token) -> None:
+        _current_ledger.reset(token)
+
+    @property
+    def remaining(self) -> Optional[float]:
+        return None if self.budget is None else self.budget - self.cost_usd
+
+    def allows(self, provider: str, slug: str, prompt: str, max_tokens: int) -> bool:
+        """
+        True se a tentativa, no pior caso (max_tokens de saída e, se o provider
+        cobra a gravação no cache acima da entrada, o prompt todo gravado), cabe no budget.
+        """
+        if self.budget is None:
+            return True
+        price = get_model_price(provider, slug)
+        if price is None:
+            # Sem preço conhecido não há como estimar: só tenta enquanto houver saldo
+            return self.cost_usd < self.budget
+        cache = get_cache_pricing(provider)
+        prompt_tokens = estimate_tokens(prompt)
+        worst = cost_of(price, prompt_tokens, max_tokens,
+                        cache_write_tokens=prompt_tokens if cache[1] > 1.0 else 0, cache=cache)
+        return self.cost_usd + worst <= self.budget
+
+    def record(self, provider: str, slug: str, usage: Usage,
+               price: Optional[Tuple[float, float]] = None) -> Dict[str, Any]:
+        """Registra uma geração concluída e retorna a entrada por chamada."""
+        if price is None:
+            price = get_model_price(provider, slug)
+        cost = usage_cost(provider, price, usage)
+        intent = _current_intent.get()
+        entry = {
+            "intent": intent,
+            "provider": provider,
+            "slug": slug,
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "cached_tokens": usage.cached_tokens,
+            "cache_write_tokens": usage.cache_write_tokens,
+            "cost_usd": round(cost, 8),
+            "priced": price is not None,
+            "estimated": usage.estimated,
+        }
+        self.calls.append(entry)
+        self.prompt_tokens += usage.prompt_tokens
+        self.completion_tokens += usage.completion_tokens
+        self.cached_tokens += usage.cached_tokens
+        self.cache_write_tokens += usage.cache_write_tokens
+        self.cost_usd += cost
+        if price is None:
+            self.unpriced_calls += 1
+        if intent is not None:
+            totals = self.by_intent.setdefault(
+                intent, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+            )
+            totals["calls"] += 1
+            totals["prompt_tokens"] += usage.prompt_tokens
+            totals["completion_tokens"] += usage.completion_tokens
+            totals["cost_usd"] = round(totals["cost_usd"] + cost, 8)
+        if self.on_record is not None:
+            self.on_record(self.cost_usd)
+        return entry
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cache_write_tokens": self.cache_write_tokens,
+            "cost_usd": round(self.cost_usd, 8),
+            "budget_usd": self.budget,
+            "unpriced_calls": self.unpriced_calls,
+            "by_intent": self.by_intent,
+            "calls": self.calls,
+        }
+
+
+_current_ledger: ContextVar[Optional[CostLedger]] = ContextVar("synai_ledger", default=None)
+_current_intent: ContextVar[Optional[str]] = ContextVar("synai_ledger_intent", default=None)
+
+
+def current_ledger() -> Optional[CostLedger]:
+    """Retorna o ledger do workflow em execução (ou None fora de um workflow)."""
+    return _current_ledger.get()
+
+
+@contextmanager
+def intent_scope(name: str):
+    """Atribui ao intent 'name' as gerações feitas dentro do bloco."""
+    token = _current_intent.set(name)
+    try:
+        yield
+    finally:
+        _current_intent.reset(token)
@@ -0,0 +1,140 @@
+"""
+SynAI — Execução em lote (synai run --inputs)
+==============================================
+
+Executa o mesmo workflow uma vez por registro de um arquivo JSONL, com
+concorrência limitada em um único event loop, via SynRuntime.execute_workflow.
+
+Formato de entrada (uma linha JSON por registro):
+    {"id": "a1", "inputs": {"doc": "..."}}   # forma explícita
+    {"doc": "..."}                            # o objeto inteiro vira 'inputs'
+
+Formato de saída (uma linha por registro, na ordem em que terminam):
+    {"index": 0, "id": "a1", "status": "completed", "results": [...], "usage": {...}}
+    {"index": 1, "id": null, "status": "error", "error": "..."}
+
+A leitura é preguiçosa e a fila entre leitor e workers é limitada, então o
+uso de memória não cresce com o tamanho do arquivo.
+"""
+import asyncio
+import json
+import time
+from typing import Any, Dict, IO, Iterator, Optional, Tuple
+
+from .runtime import SynRuntime
+
+
+def iter_records(stream: IO[str]) -> Iterator[Tuple[int, Optional[Any], Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Itera os registros de um stream JSONL.
+
+    Yields:
+        (index, record_id, inputs, error) — error preenchido em linhas inválidas.
+    """
+    index = 0
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield index, None, None, f"JSON inválido: {e}"
+        else:
+            if not isinstance(record, dict):
+                yield index, None, None, "registro deve ser um objeto JSON"
+            elif isinstance(record.get("inputs"), dict):
+                yield index, record.get("id"), record["inputs"], None
+            else:
+                yield index, record.get("id"), record, None
+        index += 1
+
+
+async def run_batch(
+    runtime: SynRuntime,
+    ast: Dict[str, Any],
+    run_decl: Dict[str, Any],
+    source: IO[str],
+    sink: IO[str],
+    jobs: int = 4,
+    budget: Optional[float] = None,
+    incremental: bool = False,
+) -> Dict[str, Any]:
+    """
+    Executa o workflow para cada registro de 'source' e escreve os resultados
+    em 'sink' (JSONL) assim que cada execução termina.
+
+    Args:
+        runtime:  Runtime compartilhado por todas as execuções.
+        ast:      AST validado do arquivo linked.
+        run_decl: Declaração 'Run' a executar.
+        source:   Stream de texto com os registros JSONL.
+        sink:     Stream de texto onde os resultados são escritos.
+        jobs:     Número máximo de workflows simultâneos.
+        budget:   Limite de custo (USD) de cada execução.
+        incremental: Reaproveita resultados de intents já executados com a
+                  mesma fingerprint (requer runtime.checkpoints).
+
+    Returns:
+        Resumo: {"total", "completed", "failed", "total_tokens", "cost_usd", "elapsed_s"}.
+    """
+    jobs = max(1, jobs)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=jobs * 2)
+    summary = {"total": 0, "completed": 0, "failed": 0, "total_tokens": 0, "cost_usd": 0.0}
+    started = time.perf_counter()
+
+    def _write(entry: Dict[str, Any]) -> None:
+        sink.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        sink.flush()
+        summary["total"] += 1
+        usage = entry.get("usage")
+        if usage:
+            summary["total_tokens"] += usage["total_tokens"]
+            summary["cost_usd"] += usage["cost_usd"]
+        if entry["status"] == "completed":
+            summary["completed"] += 1
+        else:
+            summary["failed"] += 1
+
+    async def _worker() -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                queue.task_done()
+                return
+            index, record_id, inputs, error = item
+            entry: Dict[str, Any] = {"index": index, "id": record_id}
+            if error:
+                entry.update(status="error", error=error)
+            else:
+                try:
+                    result = await runtime.execute_workflow(
+                        ast, run_decl, mock=not runtime.real, inputs=inputs, budget=budget, incremental=incremental
+                    )
+                    usage = result["usage"]
+                    entry.update(status=result["status"], results=result["results"], usage={
+                        k: usage[k] for k in ("prompt_tokens", "completion_tokens", "total_tokens", "cost_usd")
+                    })
+                    if "error" in result:
+                        entry["error"] = result["error"]
+                    if "run_id" in result:
+                        entry["run_id"] = result["run_id"]
+                except Exception as e:
+                    entry.update(status="error", error=f"{type(e).__name__}: {e}")
+            _write(entry)
+            queue.task_done()
+
+    workers = [asyncio.create_task(_worker()) for _ in range(jobs)]
+    try:
+        for item in iter_records(source):
+            await queue.put(item)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for w in workers:
+            w.cancel()
+
+    summary["cost_usd"] = round(summary["cost_usd"], 8)
+    summary["elapsed_s"] = round(time.perf_counter() - started, 3)
+    return summary
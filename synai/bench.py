@@ -0,0 +1,493 @@
+"""
+SynAI — Benchmark de Roteamento (synai bench)
+==============================================
+
+Mede o custo do próprio runtime (roteamento, fallback, eventos, serialização
+dos drivers) separado da latência dos providers. Para isso sobe servidores
+HTTP locais que imitam os formatos de fio de OpenAI, Anthropic, Gemini e
+Ollama, com latência e taxas de erro/429 configuráveis, e dirige
+call_model, perfis e workflows completos contra eles com concorrência fixa.
+
+Cenários:
+    call_model/openai     OpenAIDriver    → /v1/chat/completions
+    call_model/anthropic  AnthropicDriver → /v1/messages
+    call_model/google     GoogleDriver    → /v1beta/models/{m}:generateContent
+    call_model/ollama     OllamaDriver    → /api/generate
+    profile               perfil 'best-local' resolvido para o Ollama stand-in
+    fallback              OpenAI sempre falha (500) → Anthropic responde
+    workflow              workflow de 4 intents LLM encadeados (OpenAI)
+
+Modelos de latência (--latency):
+    none | fixed:MS | uniform:MIN:MAX | normal:MEAN:STDDEV | lognormal:MEDIAN:SIGMA
+
+O resultado é um JSON estável (percentis em ms, throughput em req/s e
+overhead por chamada = latência média - tempo de serviço injetado) para ser
+comparado entre versões.
+"""
+import asyncio
+import json
+import math
+import platform
+import random
+import re
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .providers.ollama import model_tag as _ollama_tag
+from .runtime import SynRuntime
+from .server import read_request, send_json
+
+BENCH_REPLY = "synai-bench-ok"
+
+SCENARIOS: List[str] = [
+    "call_model/openai",
+    "call_model/anthropic",
+    "call_model/google",
+    "call_model/ollama",
+    "profile",
+    "fallback",
+    "workflow",
+]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Distribuições de latência
+# ─────────────────────────────────────────────────────────────────────────────
+class LatencyModel:
+    """Distribuição de latência injetada pelos servidores stand-in."""
+
+    KINDS = ("none", "fixed", "uniform", "normal", "lognormal")
+
+    def __init__(self, kind: str = "none", params: Optional[List[float]] = None, seed: Optional[int] = None):
+        if kind not in self.KINDS:
+            raise ValueError(f"Distribuição '{kind}' desconhecida. Válidas: {', '.join(self.KINDS)}")
+        self.kind = kind
+        self.params = params or []
+        self._rng = random.Random(seed)
+
+    @classmethod
+    def parse(cls, spec: str, seed: Optional[int] = None) -> "LatencyModel":
+        """Converte 'uniform:10:50' (ms) em um LatencyModel."""
+        kind, *raw = spec.strip().lower().split(":")
+        try:
+            params = [float(p) for p in raw]
+        except ValueError:
+            raise ValueError(f"Parâmetros inválidos em '{spec}'")
+        expected = {"none": 0, "fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}.get(kind)
+        if expected is not None and len(params) != expected:
+            raise ValueError(f"'{kind}' espera {expected} parâmetro(s), recebeu '{spec}'")
+        return cls(kind, params, seed)
+
+    def sample(self) -> float:
+        """Retorna uma amostra em segundos (nunca negativa)."""
+        p = self.params
+        if self.kind == "fixed":
+            ms = p[0]
+        elif self.kind == "uniform":
+            ms = self._rng.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            ms = self._rng.gauss(p[0], p[1])
+        elif self.kind == "lognormal":
+            ms = self._rng.lognormvariate(math.log(max(p[0], 1e-6)), p[1])
+        else:
+            ms = 0.0
+        return max(ms, 0.0) / 1000.0
+
+    def describe(self) -> str:
+        return ":".join([self.kind] + [f"{v:g}" for v in self.params])
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Servidor stand-in multi-formato
+# ─────────────────────────────────────────────────────────────────────────────
+_GEMINI_PATH = re.compile(r"^/v1beta/models/([^/:]+):generateContent$")
+_DURATION = re.compile(r"^(-?\d+(?:\.\d+)?)(ms|s|m|h)?$")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def _keep_alive_seconds(value: Any) -> float:
+    """keep_alive do Ollama em segundos: número (s) ou duração ('30s', '10m'); negativo = sempre."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _DURATION.match(str(value).strip())
+    if not match:
+        return 300.0
+    return float(match.group(1)) * _DURATION_UNITS[match.group(2) or "s"]
+
+
+class StandInServer:
+    """
+    Servidor HTTP local que responde nos formatos de fio de OpenAI,
+    Anthropic, Gemini e Ollama, com latência e falhas injetadas.
+
+    A parte Ollama simula a residência dos modelos: um modelo fora da memória
+    custa ollama_load_s na primeira chamada e fica carregado pelo keep_alive
+    do request (5 min por padrão; 0 descarrega). /api/ps e /api/tags refletem
+    esse estado e ollama_installed.
+    """
+
+    def __init__(
+        self,
+        latency: Optional[LatencyModel] = None,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        seed: Optional[int] = None,
+        host: str = "127.0.0.1",
+        ollama_load_s: float = 0.0,
+        ollama_installed: Optional[List[str]] = None,
+        ollama_loaded: Optional[List[str]] = None,
+    ):
+        self.latency = latency or LatencyModel()
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.ollama_load_s = ollama_load_s
+        self.ollama_installed = [_ollama_tag(m) for m in (ollama_installed or ["llama3", "codellama"])]
+        # modelo → instante (monotonic) em que expira; inf = residente até ser descarregado
+        self.ollama_resident: Dict[str, float] = {
+            _ollama_tag(m): math.inf for m in (ollama_loaded if ollama_loaded is not None else ["llama3"])
+        }
+        self.host = host
+        self.port = 0
+        self._rng = random.Random(seed)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.reset_stats()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def reset_stats(self) -> None:
+        self.requests = 0
+        self.by_status: Dict[str, int] = {}
+        self.service_time_s = 0.0
+        self.ollama_loads: List[str] = []
+        self.ollama_unloads: List[str] = []
+
+    async def start(self) -> "StandInServer":
+        self._server = await asyncio.start_server(self._handle, self.host, 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, path, _headers, body = request
+                delay = self.latency.sample()
+                if path.split("?", 1)[0] == "/api/generate":
+                    delay += self._ollama_residency(body)
+                if delay:
+                    await asyncio.sleep(delay)
+                status, payload = self._reply(method, path.split("?", 1)[0], body)
+                self.requests += 1
+                self.service_time_s += delay
+                self.by_status[str(status)] = self.by_status.get(str(status), 0) + 1
+                await send_json(writer, status, payload)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _ollama_residency(self, body: bytes) -> float:
+        """Atualiza a residência do modelo pedido e devolve o custo de carga (s)."""
+        try:
+            req = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            return 0.0
+        name = _ollama_tag(str(req.get("model", "")))
+        if name not in self.ollama_installed:
+            return 0.0
+        now = time.monotonic()
+        keep_alive = _keep_alive_seconds(req.get("keep_alive", "5m"))
+        resident = self.ollama_resident.get(name, 0.0) > now
+        if keep_alive == 0:
+            if resident:
+                self.ollama_unloads.append(name)
+            self.ollama_resident.pop(name, None)
+            return 0.0
+        self.ollama_resident[name] = math.inf if keep_alive < 0 else now + keep_alive
+        if resident:
+            return 0.0
+        self.ollama_loads.append(name)
+        return self.ollama_load_s
+
+    def ollama_running(self) -> List[str]:
+        now = time.monotonic()
+        return [name for name, expires in self.ollama_resident.items() if expires > now]
+
+    def _reply(self, method: str, path: str, body: bytes):
+        roll = self._rng.random()
+        if roll < self.rate_limit_rate:
+            return 429, {"error": {"type": "rate_limit_error", "message": "stand-in: rate limited"}}
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500, {"error": {"type": "api_error", "message": "stand-in: injected failure"}}
+
+        try:
+            req = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            return 400, {"error": {"message": "invalid json"}}
+        prompt_tokens = max(1, len(body) // 4)
+        completion_tokens = max(1, len(BENCH_REPLY) // 4)
+
+        if path.endswith("/chat/completions"):
+            return 200, {
+                "id": "chatcmpl-bench", "object": "chat.completion", "model": req.get("model"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": BENCH_REPLY}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens},
+            }
+        if path.endswith("/messages"):
+            return 200, {
+                "id": "msg_bench", "type": "message", "role": "assistant", "model": req.get("model"),
+                "content": [{"type": "text", "text": BENCH_REPLY}], "stop_reason": "end_turn",
+                "usage": {"input_tokens": prompt_tokens, "output_tokens": completion_tokens},
+            }
+        if _GEMINI_PATH.match(path):
+            return 200, {
+                "candidates": [{"content": {"role": "model", "parts": [{"text": BENCH_REPLY}]},
+                                "finishReason": "STOP"}],
+                "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": completion_tokens},
+            }
+        if path == "/api/generate":
+            if _ollama_tag(str(req.get("model", ""))) not in self.ollama_installed:
+                return 404, {"error": f"model '{req.get('model')}' not found, try pulling it first"}
+            if not req.get("prompt"):
+                # carga/descarga sem geração
+                return 200, {"model": req.get("model"), "response": "", "done": True,
+                             "done_reason": "unload" if req.get("keep_alive") == 0 else "load"}
+            return 200, {"model": req.get("model"), "response": BENCH_REPLY, "done": True,
+                         "prompt_eval_count": prompt_tokens, "eval_count": completion_tokens}
+        if path == "/api/tags":
+            return 200, {"models": [{"name": name, "model": name} for name in self.ollama_installed]}
+        if path == "/api/ps":
+            return 200, {"models": [{"name": name, "model": name} for name in self.ollama_running()]}
+        return 404, {"error": {"message": f"stand-in: rota desconhecida {method} {path}"}}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Medição
+# ─────────────────────────────────────────────────────────────────────────────
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentil por nearest-rank sobre uma lista já ordenada."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def _drive(
+    call: Callable[[], Awaitable[bool]],
+    total: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    """Executa 'call' 'total' vezes com no máximo 'concurrency' em voo."""
+    latencies: List[float] = []
+    ok = 0
+    remaining = total
+
+    async def _worker():
+        nonlocal remaining, ok
+        while remaining > 0:
+            remaining -= 1
+            t0 = time.perf_counter()
+            try:
+                success = await call()
+            except Exception:
+                success = False
+            latencies.append(time.perf_counter() - t0)
+            ok += 1 if success else 0
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_worker() for _ in range(max(1, min(concurrency, total)))))
+    return {"latencies": latencies, "ok": ok, "elapsed": time.perf_counter() - started}
+
+
+def _summarize(raw: Dict[str, Any], servers: List[StandInServer], concurrency: int, units: int = 1) -> Dict[str, Any]:
+    lat = sorted(raw["latencies"])
+    calls = len(lat)
+    mean = sum(lat) / calls if calls else 0.0
+    service = sum(s.service_time_s for s in servers)
+    status: Dict[str, int] = {}
+    for s in servers:
+        for code, count in s.by_status.items():
+            status[code] = status.get(code, 0) + count
+    server_mean = service / calls if calls else 0.0
+    return {
+        "calls": calls,
+        "ok": raw["ok"],
+        "errors": calls - raw["ok"],
+        "concurrency": concurrency,
+        "elapsed_s": round(raw["elapsed"], 4),
+        "throughput_rps": round(calls / raw["elapsed"], 2) if raw["elapsed"] else 0.0,
+        "latency_ms": {
+            "mean": round(mean * 1000, 3),
+            "p50": round(percentile(lat, 50) * 1000, 3),
+            "p95": round(percentile(lat, 95) * 1000, 3),
+            "p99": round(percentile(lat, 99) * 1000, 3),
+            "max": round((lat[-1] if lat else 0.0) * 1000, 3),
+        },
+        "server_ms_mean": round(server_mean * 1000, 3),
+        "overhead_ms_mean": round((mean - server_mean) * 1000, 3),
+        "overhead_ms_per_upstream_call": round((mean - server_mean) * 1000 / units, 3),
+        "upstream_requests": sum(s.requests for s in servers),
+        "upstream_status": dict(sorted(status.items())),
+    }
+
+
+def _bench_workflow_ast(steps: int = 4) -> Dict[str, Any]:
+    """AST sintético: 'steps' intents LLM encadeados por connects."""
+    agents = [{"type": "Agent", "id": f"step{i}", "agent_type": "LLM",
+               "properties": {"model": "gpt-4o-mini", "provider": "openai"}} for i in range(steps)]
+    statements: List[Dict[str, Any]] = []
+    for i in range(steps):
+        statements.append({"type": "Intent", "agent": f"step{i}", "name": f"Etapa {i}",
+                           "input": "bench input" if i == 0 else None, "output": None})
+        if i + 1 < steps:
+            statements.append({"type": "Connect", "from": f"step{i}", "to": f"step{i + 1}", "options": {}})
+    return {
+        "type": "Program",
+        "declarations": [
+            {"type": "Orchestrator", "name": "Bench", "blocks": [
+                {"type": "AgentsBlock", "agents": agents},
+                {"type": "Workflow", "name": "Chain", "statements": statements},
+            ]},
+            {"type": "Run", "orchestrator": "Bench", "workflow": "Chain"},
+        ],
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Suite
+# ─────────────────────────────────────────────────────────────────────────────
+async def run_benchmarks(
+    scenarios: Optional[List[str]] = None,
+    requests: int = 200,
+    concurrency: int = 16,
+    latency: str = "fixed:20",
+    error_rate: float = 0.0,
+    rate_limit_rate: float = 0.0,
+    policy: str = "balanced",
+    seed: Optional[int] = 1234,
+) -> Dict[str, Any]:
+    """
+    Executa a suite de benchmark e retorna o relatório como dict.
+
+    Args:
+        scenarios:       Subconjunto de SCENARIOS (padrão: todos).
+        requests:        Chamadas (ou workflows) por cenário.
+        concurrency:     Chamadas simultâneas por cenário.
+        latency:         Especificação da latência injetada (ver LatencyModel).
+        error_rate:      Fração de respostas 500 nos stand-ins saudáveis.
+        rate_limit_rate: Fração de respostas 429 nos stand-ins saudáveis.
+        policy:          Política de roteamento usada pelo runtime.
+        seed:            Semente dos geradores aleatórios (reprodutibilidade).
+    """
+    from synai import __version__
+    from synai.providers import OpenAIDriver, AnthropicDriver, GoogleDriver, OllamaDriver
+
+    selected = scenarios or SCENARIOS
+    unknown = [s for s in selected if s not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"Cenários desconhecidos: {', '.join(unknown)}. Válidos: {', '.join(SCENARIOS)}")
+
+    def _server(**overrides) -> StandInServer:
+        opts = dict(latency=LatencyModel.parse(latency, seed), error_rate=error_rate,
+                    rate_limit_rate=rate_limit_rate, seed=seed)
+        opts.update(overrides)
+        return StandInServer(**opts)
+
+    def _drivers(server: StandInServer) -> Dict[str, Any]:
+        return {
+            "openai": OpenAIDriver(api_key="bench", base_url=f"{server.url}/v1"),
+            "anthropic": AnthropicDriver(api_key="bench", base_url=f"{server.url}/v1"),
+            "google": GoogleDriver(api_key="bench", base_url=f"{server.url}/v1beta"),
+            "ollama": OllamaDriver(base_url=server.url),
+        }
+
+    models = {"openai": "gpt-4o-mini", "anthropic": "claude-haiku-3-5",
+              "google": "gemini-2.5-flash", "ollama": "llama3"}
+    prompt = "Resuma em uma frase: " + "lorem ipsum " * 20
+    report: Dict[str, Any] = {}
+
+    for scenario in selected:
+        runtime = SynRuntime(real=False, policy=policy)
+        servers: List[StandInServer] = []
+        units = 1
+        try:
+            if scenario.startswith("call_model/"):
+                alias = scenario.split("/", 1)[1]
+                servers.append(await _server().start())
+                runtime.register_llm_provider(alias, _drivers(servers[0])[alias], set_default=True)
+
+                async def call(alias=alias):
+                    out = await runtime.call_model(models[alias], prompt, preferred_provider=alias)
+                    return out == BENCH_REPLY
+
+            elif scenario == "profile":
+                servers.append(await _server().start())
+                runtime.register_llm_provider("ollama", _drivers(servers[0])["ollama"], set_default=True)
+
+                async def call():
+                    return await runtime.call_model("best-local", prompt) == BENCH_REPLY
+
+            elif scenario == "fallback":
+                failing = await _server(error_rate=1.0, rate_limit_rate=0.0).start()
+                healthy = await _server().start()
+                servers.extend([failing, healthy])
+                units = 2
+                runtime.register_llm_provider("openai", _drivers(failing)["openai"], set_default=True)
+                runtime.register_llm_provider("anthropic", _drivers(healthy)["anthropic"])
+
+                async def call():
+                    out = await runtime.call_model("gpt-4o-mini", prompt, preferred_provider="openai")
+                    return out == BENCH_REPLY
+
+            else:  # workflow
+                servers.append(await _server().start())
+                runtime.register_llm_provider("openai", _drivers(servers[0])["openai"], set_default=True)
+                ast = _bench_workflow_ast()
+                run_decl = ast["declarations"][-1]
+                units = 4
+
+                async def call():
+                    result = await runtime.execute_workflow(ast, run_decl, mock=True)
+                    return all(r["output"] == BENCH_REPLY for r in result["results"])
+
+            # Aquecimento: abre conexões e popula caches antes de medir
+            await _drive(call, min(concurrency, requests), concurrency)
+            for s in servers:
+                s.reset_stats()
+            raw = await _drive(call, requests, concurrency)
+            report[scenario] = _summarize(raw, servers, concurrency, units)
+        finally:
+            await runtime.aclose()
+            for s in servers:
+                await s.stop()
+
+    return {
+        "synai_version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(terse=True),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "requests": requests,
+            "concurrency": concurrency,
+            "latency": LatencyModel.parse(latency).describe(),
+            "error_rate": error_rate,
+            "rate_limit_rate": rate_limit_rate,
+            "policy": policy,
+            "seed": seed,
+        },
+        "scenarios": report,
+    }
+
@@ -0,0 +1,162 @@
+"""
+SynAI — Blobs: Dados Grandes entre Intents sem Cópia
+====================================================
+
+Uma ferramenta que devolve um dump de vários MB não deve ter esse texto
+copiado em data_flow, results, prompts e telemetria. Durante um workflow,
+saídas de ferramentas e inputs acima de BLOB_THRESHOLD vão para um store da
+execução: o conteúdo é gravado uma vez num arquivo temporário mapeado em
+memória (mmap), e o workflow passa adiante só um BlobRef — id, tamanho e
+digest.
+
+Quem consome decide quando materializar:
+    ref.buffer()   memoryview sobre o mmap, sem cópia
+    ref.text()     texto decodificado (uma cópia) — usado só no prompt de LLM
+    str(ref)       o mesmo que text(), para compatibilidade com código que
+                   espera texto (CLI, JSON de saída, expressões de connect)
+
+Ferramentas registradas com buffers=True (ou 'buffers: "true"' no agente
+TOOL) recebem o memoryview. No executor 'process', o BlobRef atravessa o
+processo como caminho do arquivo e o worker mapeia o mesmo arquivo — os
+dados não passam pelo pipe. As demais ferramentas recebem o texto.
+
+Os arquivos são removidos no fim da execução. Em POSIX, os mapeamentos
+continuam válidos, então os BlobRefs do resultado seguem legíveis até serem
+coletados.
+
+Uso:
+    rt.blob_threshold = 1024 * 1024        # None desliga os blobs
+    rt.register_tool("contar", lambda buf: buf.tobytes().count(b"\\n"), buffers=True)
+"""
+import hashlib
+import logging
+import mmap
+import os
+import shutil
+import tempfile
+import uuid
+from contextvars import ContextVar
+from typing import Any, Optional
+
+logger = logging.getLogger("SynAI.Blobs")
+
+BLOB_THRESHOLD = 256 * 1024
+"""Tamanho (bytes, ou caracteres para texto) a partir do qual um valor vira blob."""
+
+
+class BlobRef:
+    """Referência leve a um blob mapeado em memória."""
+
+    __slots__ = ("id", "size", "kind", "digest", "path", "_map")
+
+    def __init__(self, blob_id: str, size: int, kind: str, digest: str, path: Optional[str], mapping: mmap.mmap):
+        self.id = blob_id
+        self.size = size
+        self.kind = kind
+        self.digest = digest
+        self.path = path
+        self._map = mapping
+
+    @classmethod
+    def _attach(cls, blob_id: str, path: str, size: int, kind: str, digest: str) -> "BlobRef":
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(blob_id, size, kind, digest, path, mapping)
+
+    @classmethod
+    def _detached(cls, blob_id: str, data: bytes, kind: str, digest: str) -> "BlobRef":
+        mapping = mmap.mmap(-1, len(data))
+        mapping.write(data)
+        return cls(blob_id, len(data), kind, digest, None, mapping)
+
+    def buffer(self) -> memoryview:
+        """Visão somente leitura dos bytes, sem cópia."""
+        view = memoryview(self._map)
+        return view if view.readonly else view.toreadonly()
+
+    def text(self) -> str:
+        """Conteúdo como texto (materializa uma cópia)."""
+        return str(memoryview(self._map), "utf-8", "replace")
+
+    def __str__(self) -> str:
+        return self.text()
+
+    def __bytes__(self) -> bytes:
+        return bytes(memoryview(self._map))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self) -> str:
+        return f"<BlobRef {self.id} {self.kind} {self.size} bytes>"
+
+    def __reduce__(self):
+        # Com o arquivo ainda no disco (execução em andamento), só o caminho atravessa o pickle
+        if self.path is not None and os.path.exists(self.path):
+            return BlobRef._attach, (self.id, self.path, self.size, self.kind, self.digest)
+        return BlobRef._detached, (self.id, bytes(self), self.kind, self.digest)
+
+
+def materialize(value: Any) -> Any:
+    """Texto de um BlobRef. Qualquer outro valor volta como está."""
+    return value.text() if isinstance(value, BlobRef) else value
+
+
+class BlobStore:
+    """Blobs de uma execução de workflow, em arquivos temporários mapeados."""
+
+    def __init__(self, threshold: int = BLOB_THRESHOLD, directory: Optional[str] = None):
+        self.threshold = threshold
+        self.directory = tempfile.mkdtemp(prefix="synai-blobs-", dir=directory)
+        self.count = 0
+        self.bytes_stored = 0
+
+    def activate(self):
+        """Torna este store o ativo no contexto atual. Retorna o token para deactivate()."""
+        return _current_store.set(self)
+
+    @staticmethod
+    def deactivate(token) -> None:
+        _current_store.reset(token)
+
+    def accepts(self, value: Any) -> bool:
+        """True se o valor é grande o bastante para virar blob (vazio nunca: não há o que mapear)."""
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            size = memoryview(value).nbytes
+        elif isinstance(value, str):
+            size = len(value)
+        else:
+            return False
+        return size > 0 and size >= self.threshold
+
+    def put(self, value: Any) -> BlobRef:
+        """Grava o valor (texto ou bytes) uma vez e devolve a referência mapeada."""
+        if isinstance(value, str):
+            data, kind = value.encode("utf-8"), "text"
+        else:
+            data, kind = memoryview(value).cast("B"), "bytes"
+        blob_id = uuid.uuid4().hex
+        path = os.path.join(self.directory, blob_id)
+        with open(path, "wb") as f:
+            f.write(data)
+        ref = BlobRef._attach(blob_id, path, len(data), kind, hashlib.sha256(data).hexdigest())
+        self.count += 1
+        self.bytes_stored += ref.size
+        logger.debug("Blob %s: %d bytes (%s)", blob_id, ref.size, kind)
+        return ref
+
+    def maybe_put(self, value: Any) -> Any:
+        """BlobRef para valores grandes. Os demais voltam como estão."""
+        return self.put(value) if self.accepts(value) else value
+
+    def close(self) -> None:
+        """Remove os arquivos. Os mapeamentos abertos continuam válidos (POSIX)."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+_current_store: ContextVar[Optional[BlobStore]] = ContextVar("synai_blobs", default=None)
+
+
+def current_blobs() -> Optional[BlobStore]:
+    """Retorna o store de blobs da execução em andamento (ou None)."""
+    return _current_store.get()
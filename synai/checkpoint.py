@@ -0,0 +1,264 @@
+"""
+SynAI — Checkpoints de Execução
+===============================
+
+Com rt.checkpoints = CheckpointStore("runs.db"), cada execução de workflow
+ganha um run_id e grava, em SQLite, o resultado de cada intent (e de cada
+item de um map) junto com o data_flow após o passo. Se o processo morrer no
+intent 28 de 30, rt.resume(run_id) refaz o workflow pulando tudo que já
+terminou — os intents concluídos voltam do checkpoint, sem nova chamada paga.
+
+Execução incremental (execute_workflow(..., incremental=True)): cada intent
+ganha uma fingerprint — configuração do agente, intent, modelo resolvido e o
+hash do input que recebeu dos intents anteriores. Se a fingerprint já tem
+resultado gravado (de qualquer execução), o intent é pulado; só o que mudou e
+o que depende dele volta a rodar, como no make.
+
+As gravações não bloqueiam o event loop: record() só enfileira, e uma thread
+de escrita grava em lotes (uma transação por lote). O fim de cada execução
+aguarda a fila esvaziar.
+
+Uso:
+    rt.checkpoints = CheckpointStore(".synai/checkpoints.db")
+    result = await rt.execute_workflow(ast, run_decl)    # result["run_id"]
+    result = await rt.resume(result["run_id"])           # continua de onde parou
+    synai run pipeline.synx --checkpoint runs.db
+    synai run pipeline.synx --checkpoint runs.db --resume <run_id>
+    synai run pipeline.synx --incremental
+"""
+import asyncio
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("SynAI.Checkpoint")
+
+DEFAULT_PATH = ".synai/checkpoints.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      TEXT PRIMARY KEY,
+    status      TEXT NOT NULL,
+    ast         TEXT NOT NULL,
+    run_decl    TEXT NOT NULL,
+    inputs      TEXT,
+    budget      REAL,
+    spent       REAL NOT NULL DEFAULT 0,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS steps (
+    run_id      TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    seq         INTEGER NOT NULL,
+    entry       TEXT NOT NULL,
+    data_flow   TEXT,
+    created_at  REAL NOT NULL,
+    PRIMARY KEY (run_id, key)
+);
+CREATE TABLE IF NOT EXISTS results (
+    fingerprint TEXT PRIMARY KEY,
+    output      TEXT NOT NULL,
+    created_at  REAL NOT NULL
+);
+"""
+
+_STOP = object()
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+class CheckpointStore:
+    """Store SQLite de execuções e passos, com escrita em lotes numa thread própria."""
+
+    def __init__(self, path: str, batch_size: int = 256):
+        self.path = path
+        self.batch_size = batch_size
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+            # Stores criados antes da coluna 'spent'
+            if "spent" not in {row[1] for row in conn.execute("PRAGMA table_info(runs)")}:
+                conn.execute("ALTER TABLE runs ADD COLUMN spent REAL NOT NULL DEFAULT 0")
+                conn.commit()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="synai-checkpoint", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ── Escrita (thread dedicada) ────────────────────────────────────────────
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        try:
+            while True:
+                ops = [self._queue.get()]
+                while len(ops) < self.batch_size:
+                    try:
+                        ops.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = any(op is _STOP for op in ops)
+                try:
+                    with conn:
+                        for op in ops:
+                            if op is not _STOP:
+                                sql, params = op
+                                conn.execute(sql, params() if callable(params) else params)
+                except sqlite3.Error as e:
+                    logger.error(f"Falha ao gravar {len(ops)} checkpoint(s): {e}")
+                finally:
+                    for _ in ops:
+                        self._queue.task_done()
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def start_run(self, run_id: str, ast: Dict[str, Any], run_decl: Dict[str, Any],
+                  inputs: Optional[Dict[str, Any]], budget: Optional[float]) -> None:
+        now = time.time()
+        self._queue.put((
+            "INSERT INTO runs (run_id, status, ast, run_decl, inputs, budget, created_at, updated_at) "
+            "VALUES (?, 'running', ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(run_id) DO UPDATE SET status='running', updated_at=excluded.updated_at",
+            (run_id, _dumps(ast), _dumps(run_decl), _dumps(inputs or {}), budget, now, now),
+        ))
+
+    def record_step(self, run_id: str, key: str, seq: int, entry: Dict[str, Any],
+                    data_flow: Optional[Dict[str, Any]] = None) -> None:
+        """Enfileira um passo concluído (data_flow deve ser uma cópia: é serializado depois)."""
+        # JSON montado na thread de escrita, fora do event loop
+        self._queue.put((
+            "INSERT OR REPLACE INTO steps (run_id, key, seq, entry, data_flow, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            lambda: (run_id, key, seq, _dumps(entry), None if data_flow is None else _dumps(data_flow), time.time()),
+        ))
+
+    def record_spent(self, run_id: str, spent: float) -> None:
+        """Enfileira o custo acumulado (USD) da execução, somando todas as sessões."""
+        self._queue.put(("UPDATE runs SET spent=? WHERE run_id=?", (spent, run_id)))
+
+    def record_result(self, fingerprint: str, output: Any) -> None:
+        """Enfileira a saída de um intent sob sua fingerprint (execução incremental)."""
+        self._queue.put((
+            "INSERT OR REPLACE INTO results (fingerprint, output, created_at) VALUES (?, ?, ?)",
+            lambda: (fingerprint, _dumps(output), time.time()),
+        ))
+
+    def lookup_result(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """{'output': ...} gravado para a fingerprint, ou None."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT output FROM results WHERE fingerprint=?", (fingerprint,)).fetchone()
+        return None if row is None else {"output": json.loads(row[0])}
+
+    def finish_run(self, run_id: str, status: str) -> None:
+        self._queue.put(("UPDATE runs SET status=?, updated_at=? WHERE run_id=?", (status, time.time(), run_id)))
+
+    async def flush(self) -> None:
+        """Aguarda (sem bloquear o loop) até tudo que foi enfileirado estar gravado."""
+        await asyncio.to_thread(self._queue.join)
+
+    def close(self) -> None:
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+
+    # ── Leitura ──────────────────────────────────────────────────────────────
+    def load(self, run_id: str) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]], Dict[str, Any]]:
+        """
+        Retorna (run, steps, data_flow): a linha da execução, os passos
+        concluídos por chave e o data_flow do último passo gravado.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT status, ast, run_decl, inputs, budget, spent FROM runs WHERE run_id=?",
+                               (run_id,)).fetchone()
+            if row is None:
+                raise KeyError(f"Execução '{run_id}' não encontrada em {self.path}")
+            rows = conn.execute("SELECT key, entry, data_flow FROM steps WHERE run_id=? ORDER BY seq",
+                                (run_id,)).fetchall()
+        run = {"run_id": run_id, "status": row[0], "ast": json.loads(row[1]), "run_decl": json.loads(row[2]),
+               "inputs": json.loads(row[3]) if row[3] else {}, "budget": row[4], "spent": row[5]}
+        steps, data_flow = {}, {}
+        for key, entry, flow in rows:
+            steps[key] = json.loads(entry)
+            if flow is not None:
+                data_flow = json.loads(flow)
+        return run, steps, data_flow
+
+    def runs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Execuções mais recentes: run_id, status e horários."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT run_id, status, created_at, updated_at FROM runs "
+                                "ORDER BY updated_at DESC LIMIT ?", (limit,)).fetchall()
+        return [{"run_id": r[0], "status": r[1], "created_at": r[2], "updated_at": r[3]} for r in rows]
+
+
+class RunCheckpoint:
+    """
+    Estado de checkpoint de uma execução em andamento (ativo num ContextVar,
+    como o CostLedger): passos já concluídos e gravação dos novos.
+    """
+
+    def __init__(self, store: CheckpointStore, run_id: str, completed: Optional[Dict[str, Dict[str, Any]]] = None,
+                 incremental: bool = False, spent: float = 0.0):
+        self.store = store
+        self.run_id = run_id
+        self.completed = completed or {}
+        self.incremental = incremental
+        # Custo (USD) das sessões anteriores da execução, antes de um resume
+        self.spent = spent
+        self.restored = 0
+        self.reused = 0
+        self._seq = len(self.completed)
+
+    def activate(self):
+        """Torna este checkpoint o ativo no contexto atual. Retorna o token para deactivate()."""
+        return _current_run.set(self)
+
+    @staticmethod
+    def deactivate(token) -> None:
+        _current_run.reset(token)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Entrada gravada para 'key' (intent ou item de map) ou None se ainda não concluído."""
+        entry = self.completed.get(key)
+        if entry is not None:
+            self.restored += 1
+        return entry
+
+    async def reuse(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Saída de uma execução anterior com a mesma fingerprint (leitura fora do loop)."""
+        found = await asyncio.to_thread(self.store.lookup_result, fingerprint)
+        if found is not None:
+            self.reused += 1
+        return found
+
+    def charge(self, session_cost: float) -> None:
+        """Grava o custo acumulado: sessões anteriores + 'session_cost' (ledger da sessão atual)."""
+        self.store.record_spent(self.run_id, self.spent + session_cost)
+
+    def record(self, key: str, entry: Dict[str, Any], data_flow: Optional[Dict[str, Any]] = None) -> None:
+        self._seq += 1
+        self.completed[key] = entry
+        self.store.record_step(self.run_id, key, self._seq, entry, None if data_flow is None else dict(data_flow))
+
+
+_current_run: ContextVar[Optional[RunCheckpoint]] = ContextVar("synai_checkpoint", default=None)
+
+
+def current_checkpoint() -> Optional[RunCheckpoint]:
+    """Retorna o checkpoint da execução em andamento (ou None sem checkpoints)."""
+    return _current_run.get()
@@ -1,16 +1,25 @@
 import click
+import logging
 import os
+import sys
 import json
 import networkx as nx
 import asyncio
 from .parse import parse_synai
 from .weave import build_synai
-from .weaver import weave_linker
+from .weaver import weave_linker, resolve_linked_path, load_linked
 from .runtime import SynRuntime
+from .profiler import Profiler
+from .tracing import Tracer, JsonlExporter
 
 @click.group()
-def cli():
+@click.option('--log-level', envvar='SYNAI_LOG_LEVEL', default='WARNING', show_default=True,
+              type=click.Choice(['DEBUG', 'INFO', 'WARNING', 'ERROR'], case_sensitive=False),
+              help='Nível de log do runtime (env: SYNAI_LOG_LEVEL)')
+def cli(log_level):
     """SynAI CLI - Orquestre IAs com DSL declarativa."""
+    logging.basicConfig(level=log_level.upper(), stream=sys.stderr,
+                        format='%(asctime)s %(levelname)-7s %(name)s: %(message)s')
 
 @cli.command()
 @click.argument('file_path')
@@ -80,80 +89,299 @@ def link(synx_path, diagram):
 @click.option('--api-key', help='Anthropic API key for real mode (overrides .env)')
 @click.option('--xai-key', help='xAI API key for real mode (overrides .env)')
 @click.option('--google-key', help='Google API key for real mode (overrides .env)')
-def run(synx_path, real, policy, api_key, xai_key, google_key):
+@click.option('--inputs', 'inputs_path', default=None, help='JSONL com um registro de inputs por execução (modo lote)')
+@click.option('--jobs', default=4, show_default=True, type=int, help='Execuções simultâneas no modo lote')
+@click.option('--output', 'output_path', default=None, help='JSONL de resultados do modo lote (padrão: stdout)')
+@click.option('--profile', 'profile_path', default=None, help='Grava um Chrome trace (Perfetto) da execução neste arquivo')
+@click.option('--budget', default=None, type=float, help='Limite de custo (USD) por execução do workflow')
+@click.option('--trace', 'trace_path', default=None, help='Acrescenta os spans (OTLP/JSON, um lote por linha) neste arquivo')
+@click.option('--worker', 'workers', multiple=True, help='Worker da malha (host:porta) que executa os intents (repetível)')
+@click.option('--mesh-secret', envvar='SYNAI_MESH_SECRET', default=None,
+              help='Segredo compartilhado da malha (com --worker; padrão: $SYNAI_MESH_SECRET)')
+@click.option('--checkpoint', 'checkpoint_path', default=None,
+              help='Grava cada passo neste SQLite para retomar a execução com --resume')
+@click.option('--resume', 'resume_id', default=None, help='Retoma a execução com este run_id (store: --checkpoint ou .synai/checkpoints.db)')
+@click.option('--incremental', is_flag=True,
+              help='Reaproveita resultados de intents cuja configuração e input não mudaram (store de --checkpoint)')
+@click.option('--preload-local', is_flag=True,
+              help='Pré-carrega no Ollama os modelos locais dos próximos intents enquanto os anteriores rodam')
+@click.option('--keep-alive', default='10m', show_default=True,
+              help='Tempo que os modelos locais ficam residentes no Ollama (com --preload-local)')
+def run(synx_path, real, policy, api_key, xai_key, google_key, inputs_path, jobs, output_path, profile_path, budget,
+        trace_path, workers, mesh_secret, checkpoint_path, resume_id, incremental, preload_local, keep_alive):
+    # Chaves passadas na linha de comando têm prioridade sobre o .env
+    for env_var, value in (("ANTHROPIC_API_KEY", api_key), ("XAI_API_KEY", xai_key), ("GOOGLE_API_KEY", google_key)):
+        if value:
+            os.environ[env_var] = value
+
     # Auto-detect linked file with path fix (no double)
-    dir_name = os.path.dirname(synx_path)
-    base_name = os.path.basename(synx_path)
-    if '_linked' not in base_name:
-        if base_name.endswith('.synx'):
-            linked_base = base_name[:-5] + '_linked.synx'
-        else:
-            root, ext = os.path.splitext(base_name)
-            linked_base = f"{root}_linked{ext}"
-        linked_path = os.path.join(dir_name, linked_base)
-        if os.path.exists(linked_path):
-            synx_path = linked_path
-            click.echo(f"Usando arquivo linked: {synx_path}")
-        else:
-            click.echo(f"Erro: {synx_path} não encontrado. Rode 'synai link' antes.")
-            return
-    # If already _linked, use as is
+    linked_path = resolve_linked_path(synx_path)
+    if not linked_path:
+        click.echo(f"Erro: {synx_path} não encontrado. Rode 'synai link' antes.")
+        return
+    if linked_path != synx_path:
+        click.echo(f"Usando arquivo linked: {linked_path}", err=bool(inputs_path))
 
-    if not os.path.exists(synx_path):
-        click.echo(f"Erro: {synx_path} não encontrado.")
+    try:
+        ast, run_decl = load_linked(linked_path)
+    except ValueError as e:
+        click.echo(f"Erro: {e}")
         return
 
-    data = json.load(open(synx_path, 'r', encoding='utf-8'))
-    ast = data['validated_ast']
-    G = nx.node_link_graph(data['graph'])
+    # Determinar policy: CLI flag > runtime_config no AST > default 'balanced'
+    resolved_policy = policy
+    if not resolved_policy:
+        resolved_policy = ast.get('runtime_config', {}).get('policy', 'balanced')
 
-    # Find run and workflow
-    run_decl = next((d for d in ast['declarations'] if d['type'] == 'Run'), None)
-    if not run_decl:
-        click.echo("Erro: No 'run' declaration in AST.")
-        return
-    orch_name = run_decl['orchestrator']
-    wf_name = run_decl['workflow']
+    tracer = Tracer(JsonlExporter(trace_path)) if trace_path else None
+    runtime = SynRuntime(real=real, policy=resolved_policy, tracer=tracer)
+    if workers:
+        from .network import DistributedExecutor, MeshNode
+
+        runtime.executor = DistributedExecutor(MeshNode(f"coordinator-{os.getpid()}", role="coordinator",
+                                                       secret=mesh_secret))
+        for address in workers:
+            runtime.executor.add_worker(address, f"tcp://{address}")
+
+    if preload_local and 'ollama' in runtime.llm_providers:
+        from .lifecycle import OllamaLifecycle
 
-    orch = next((d for d in ast['declarations'] if d['type'] == 'Orchestrator' and d['name'] == orch_name), None)
-    if not orch:
-        click.echo(f"Erro: Orchestrator '{orch_name}' not found.")
+        OllamaLifecycle(runtime.llm_providers['ollama'], keep_alive=keep_alive).attach(runtime)
+
+    if checkpoint_path or resume_id or incremental:
+        from .checkpoint import DEFAULT_PATH, CheckpointStore
+
+        checkpoint_path = checkpoint_path or DEFAULT_PATH
+        runtime.checkpoints = CheckpointStore(checkpoint_path)
+
+    if inputs_path:
+        if resume_id:
+            click.echo("Erro: --resume retoma uma única execução; não combina com --inputs.")
+            return
+        from .batch import run_batch
+
+        async def _batch():
+            if profile_path:
+                # Ativado aqui, o profiler é herdado por todas as execuções do lote
+                profiler.activate()
+            try:
+                with open(inputs_path, 'r', encoding='utf-8') as source:
+                    if output_path:
+                        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+                        with open(output_path, 'w', encoding='utf-8') as sink:
+                            return await run_batch(runtime, ast, run_decl, source, sink, jobs=jobs,
+                                                     budget=budget, incremental=incremental)
+                    return await run_batch(runtime, ast, run_decl, source, sys.stdout, jobs=jobs, budget=budget,
+                                           incremental=incremental)
+            finally:
+                await runtime.aclose()
+
+        profiler = Profiler("batch") if profile_path else None
+        try:
+            summary = asyncio.run(_batch())
+        finally:
+            if runtime.checkpoints is not None:
+                runtime.checkpoints.close()
+        click.echo(
+            f"Lote concluído: {summary['completed']}/{summary['total']} ok, "
+            f"{summary['failed']} falhas em {summary['elapsed_s']}s "
+            f"({summary['total_tokens']} tokens, US$ {summary['cost_usd']:.6f}).",
+            err=True,
+        )
+        if profiler:
+            _write_profile(profiler, profile_path, err=True)
         return
 
-    wf = next((b for b in orch['blocks'] if b['type'] == 'Workflow' and b['name'] == wf_name), None)
-    if not wf:
-        click.echo(f"Erro: Workflow '{wf_name}' not found.")
+    click.echo(f"Executando workflow '{run_decl['workflow']}' de '{run_decl['orchestrator']}' (real: {real})...")
+    click.echo(f"[SynAI] Policy: {resolved_policy}")
+
+    def _echo(entry):
+        click.echo(f"🎯 Intent {entry['agent']}.{entry['intent']} → Output: {entry['output']}")
+
+    async def _single():
+        try:
+            if resume_id:
+                return await runtime.resume(resume_id, on_result=_echo, profile=bool(profile_path),
+                                            incremental=incremental)
+            return await runtime.execute_workflow(ast, run_decl, mock=not real, on_result=_echo,
+                                                  profile=bool(profile_path), budget=budget, incremental=incremental)
+        finally:
+            await runtime.aclose()
+
+    try:
+        result = asyncio.run(_single())
+    except (ValueError, KeyError) as e:
+        click.echo(f"Erro: {e}")
         return
+    finally:
+        if runtime.checkpoints is not None:
+            runtime.checkpoints.close()
+    usage = result['usage']
+    if result.get('error'):
+        click.echo(f"Execução interrompida: {result['error']}")
+    else:
+        click.echo("Execução concluída.")
+    if incremental:
+        click.echo(f"♻️  {result.get('reused', 0)} intent(s) reaproveitados de execuções anteriores")
+    if result.get('run_id'):
+        click.echo(f"🧷 Run: {result['run_id']} (retome com --checkpoint {checkpoint_path} --resume {result['run_id']})")
+    click.echo(f"💰 Tokens: {usage['total_tokens']} (prompt {usage['prompt_tokens']}, "
+               f"resposta {usage['completion_tokens']}"
+               + (f", {usage['cached_tokens']} do cache" if usage.get('cached_tokens') else "")
+               + f") | Custo: US$ {usage['cost_usd']:.6f}"
+               + (f" de US$ {budget:.4f}" if budget is not None else ""))
+    if profile_path:
+        _write_profile(result['profile'], profile_path)
 
-    click.echo(f"Executando workflow '{wf_name}' de '{orch_name}' (real: {real})...")
-    data_flow = {}
 
-    # Determinar policy: CLI flag > runtime_config no AST > default 'balanced'
+def _write_profile(profiler, path, err=False):
+    profiler.write_chrome_trace(path)
+    click.echo(profiler.summary(), err=err)
+    click.echo(f"Trace salvo em {path} (abra em ui.perfetto.dev ou chrome://tracing)", err=err)
+
+@cli.command()
+@click.argument('synx_paths', nargs=-1, required=True)
+@click.option('--host', default='127.0.0.1', show_default=True, help='Interface HTTP de escuta')
+@click.option('--port', default=8765, show_default=True, type=int, help='Porta HTTP de escuta')
+@click.option('--socket', 'unix_socket', default=None, help='Escuta em um Unix socket em vez de TCP')
+@click.option('--real', is_flag=True, help='Use real API')
+@click.option('--policy', default=None, help='Routing policy: free, balanced, premium, local, openrouter_first')
+@click.option('--trace', 'trace_path', default=None, help='Acrescenta os spans (OTLP/JSON, um lote por linha) neste arquivo')
+def serve(synx_paths, host, port, unix_socket, real, policy, trace_path):
+    """Mantém um runtime aquecido e executa workflows via HTTP local."""
+    from .server import SynServer
+
+    linked_paths = []
+    for synx_path in synx_paths:
+        linked_path = resolve_linked_path(synx_path)
+        if not linked_path:
+            click.echo(f"Erro: {synx_path} não encontrado. Rode 'synai link' antes.")
+            return
+        linked_paths.append(linked_path)
+
     resolved_policy = policy
     if not resolved_policy:
-        resolved_policy = ast.get('runtime_config', {}).get('policy', 'balanced')
-    click.echo(f"[SynAI] Policy: {resolved_policy}")
+        first_ast, _ = load_linked(linked_paths[0])
+        resolved_policy = first_ast.get('runtime_config', {}).get('policy', 'balanced')
+
+    tracer = Tracer(JsonlExporter(trace_path)) if trace_path else None
+    server = SynServer(SynRuntime(real=real, policy=resolved_policy, tracer=tracer),
+                       host=host, port=port, unix_socket=unix_socket)
+    for linked_path in linked_paths:
+        name = server.load(linked_path)
+        click.echo(f"Workflow carregado: {name} ({linked_path})")
 
-    runtime = SynRuntime(real=real, policy=resolved_policy)
-
-    for stmt in wf['statements']:
-        if stmt['type'] == 'Intent':
-            input_data = data_flow.get(f"{stmt['agent']}_input", stmt.get('input', 'N/A'))
-            agent_config = next((a for block in orch['blocks'] if block['type'] == 'AgentsBlock' for a in block['agents'] if a['id'] == stmt['agent']), None)
-            if real and runtime:
-                # Real execution
-                output = asyncio.run(runtime._llm_adapter(agent_config, stmt, input_data))
-            else:
-                # Mock
-                output = f"mock_result_{stmt['name']}({input_data})"
-            data_flow[f"{stmt['agent']}_output"] = output
-            click.echo(f"🎯 Executando intent {stmt['agent']}.{stmt['name']} (input: {input_data}) → Output: {output}")
-        elif stmt['type'] == 'Connect':
-            from_data = data_flow.get(f"{stmt['from']}_output", 'N/A')
-            data_flow[f"{stmt['to']}_input"] = from_data
-            click.echo(f"🔗 Conectando {stmt['from']}.output → {stmt['to']}.input (data: {from_data}, options: {stmt['options']})")
-
-    click.echo("Execução concluída.")
+    async def _main():
+        await server.start()
+        where = f"unix:{unix_socket}" if unix_socket else f"http://{host}:{server.port}"
+        click.echo(f"[SynAI] Servindo em {where} (real: {real}, policy: {resolved_policy})")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.stop()
+
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        click.echo("Servidor encerrado.")
+
+@cli.command()
+@click.option('--host', default='127.0.0.1', show_default=True,
+              help='Interface de escuta da malha (fora do loopback exige --secret)')
+@click.option('--port', default=9101, show_default=True, type=int, help='Porta TCP da malha')
+@click.option('--secret', envvar='SYNAI_MESH_SECRET', default=None,
+              help='Segredo compartilhado da malha (padrão: $SYNAI_MESH_SECRET)')
+@click.option('--node-id', default=None, help='Identificador do nó (padrão: worker-<porta>)')
+@click.option('--real', is_flag=True, help='Use real API')
+@click.option('--policy', default='balanced', show_default=True, help='Routing policy')
+@click.option('--concurrency', default=4, show_default=True, type=int, help='Intents executados ao mesmo tempo')
+@click.option('--peer', 'peers', multiple=True, help='Outro worker (host:porta) de quem roubar intents (repetível)')
+@click.option('--discovery', is_flag=True, help='Anuncia e descobre peers via UDP broadcast')
+@click.option('--quota', 'quotas', multiple=True,
+              help='Coordena a quota de uma chave para a malha: provider:rpm=N,tpm=N,rpd=N (repetível)')
+@click.option('--quota-from', default=None, help='Worker (host:porta) que coordena as quotas dos providers')
+@click.option('--trace', 'trace_path', default=None, help='Acrescenta os spans (OTLP/JSON, um lote por linha) neste arquivo')
+def worker(host, port, secret, node_id, real, policy, concurrency, peers, discovery, quotas, quota_from, trace_path):
+    """Executa intents despachados por um coordenador (synai run --worker)."""
+    from .network import MeshNode, QuotaClient, QuotaCoordinator, QuotaLimit, WorkerService
+    from .network.transport import is_loopback
+
+    tracer = Tracer(JsonlExporter(trace_path)) if trace_path else None
+    runtime = SynRuntime(real=real, policy=policy, tracer=tracer)
+    node = MeshNode(node_id or f"worker-{port}", role="worker", port=port, host=host,
+                    secret=secret)
+    if node.secret is None and (discovery or not is_loopback(host)):
+        raise click.UsageError("--discovery e --host fora do loopback exigem --secret (ou SYNAI_MESH_SECRET)")
+    for address in peers:
+        node.register_peer(address, f"tcp://{address}", role="worker")
+    if quotas:
+        limits = {}
+        for spec in quotas:
+            provider, _, limit = spec.partition(":")
+            try:
+                limits[provider] = QuotaLimit.parse(limit)
+            except (TypeError, ValueError) as e:
+                raise click.BadParameter(f"'{spec}': {e}", param_hint="--quota")
+        runtime.quota = QuotaClient(node, QuotaCoordinator(node, limits))
+    elif quota_from:
+        node.register_peer(quota_from, f"tcp://{quota_from}", role="worker")
+        runtime.quota = QuotaClient(node, quota_from)
+    service = WorkerService(node, runtime, concurrency=concurrency)
+
+    async def _main():
+        await node.start(discovery=discovery)
+        await service.start()
+        click.echo(f"[SynAI] Worker {node.node_id} em {host}:{node.port} (real: {real}, policy: {policy}, "
+                   f"providers: {', '.join(service.providers) or '-'})")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await service.stop()
+            await node.stop()
+            await runtime.aclose()
+
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        click.echo("Worker encerrado.")
+
+@cli.command()
+@click.option('--scenario', 'scenarios', multiple=True, help='Cenário a executar (repetível; padrão: todos)')
+@click.option('--requests', 'n_requests', default=200, show_default=True, type=int, help='Chamadas por cenário')
+@click.option('--concurrency', default=16, show_default=True, type=int, help='Chamadas simultâneas')
+@click.option('--latency', default='fixed:20', show_default=True,
+              help='Latência injetada: none | fixed:MS | uniform:MIN:MAX | normal:MEAN:SD | lognormal:MEDIAN:SIGMA')
+@click.option('--error-rate', default=0.0, show_default=True, type=float, help='Fração de respostas 500')
+@click.option('--rate-limit-rate', default=0.0, show_default=True, type=float, help='Fração de respostas 429')
+@click.option('--policy', default='balanced', show_default=True, help='Routing policy')
+@click.option('--seed', default=1234, show_default=True, type=int, help='Semente aleatória')
+@click.option('-o', '--output', default=None, help='Salva o relatório JSON neste arquivo')
+def bench(scenarios, n_requests, concurrency, latency, error_rate, rate_limit_rate, policy, seed, output):
+    """Mede o overhead do runtime contra APIs stand-in locais."""
+    from .bench import run_benchmarks
+
+    try:
+        report = asyncio.run(run_benchmarks(
+            scenarios=list(scenarios) or None, requests=n_requests, concurrency=concurrency,
+            latency=latency, error_rate=error_rate, rate_limit_rate=rate_limit_rate,
+            policy=policy, seed=seed,
+        ))
+    except ValueError as e:
+        click.echo(f"Erro: {e}")
+        return
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if output:
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+        for name, res in report['scenarios'].items():
+            lat = res['latency_ms']
+            click.echo(f"{name:<22} {res['throughput_rps']:>9.1f} req/s  p50={lat['p50']:.2f}ms "
+                       f"p95={lat['p95']:.2f}ms p99={lat['p99']:.2f}ms  overhead={res['overhead_ms_mean']:.3f}ms")
+        click.echo(f"Relatório salvo em {output}")
+    else:
+        click.echo(text)
 
 if __name__ == '__main__':
     cli()
\ No newline at end of file
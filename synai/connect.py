@@ -0,0 +1,145 @@
+"""
+SynAI — Executor das Opções de Connect
+======================================
+
+As opções de um connect valem para a ligação e para o intent que a recebe:
+
+    connect fetcher.output -> analyst.input {
+        filter: "len(value) > 20"           # falso = dado não entregue, intent pulado
+        transform: "value.strip()[:4000]"   # aplicado ao dado em trânsito
+        timeout: 30s                        # prazo real do intent de 'analyst'
+        retry: 2                            # novas tentativas, backoff com jitter
+    }
+
+'transform' e 'filter' aceitam o nome de uma função registrada com
+rt.register_transform(nome, func) (sync ou async, recebe o dado) ou uma
+expressão Python sobre 'value'. Expressões são compiladas uma vez e ficam em
+cache; rodam sem builtins perigosos e sem acesso a atributos '_'.
+
+'timeout' cancela o intent ao estourar o prazo; esgotadas as tentativas, o
+workflow para com status 'timeout' — um provider travado não segura mais o
+pipeline inteiro.
+
+Uso:
+    rt.register_transform("resumo", lambda text: text[:2000])
+    connect a.output -> b.input { transform: "resumo" timeout: 20s retry: 1 }
+"""
+import ast
+import asyncio
+import builtins
+import json
+import random
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+
+from .accounting import BudgetExceededError
+from .blobs import materialize
+
+RETRY_BASE = 0.5
+"""Espera base (s) antes da primeira nova tentativa; dobra a cada tentativa."""
+RETRY_CAP = 10.0
+"""Espera máxima (s) entre tentativas."""
+
+_SAFE_BUILTINS = {
+    name: getattr(builtins, name)
+    for name in ("abs", "all", "any", "bool", "dict", "enumerate", "float", "int", "len", "list", "max",
+                 "min", "range", "reversed", "round", "set", "sorted", "str", "sum", "tuple", "zip")
+}
+
+
+class IntentTimeoutError(asyncio.TimeoutError):
+    """O intent não terminou dentro do 'timeout' do connect, nem nas novas tentativas."""
+
+    def __init__(self, intent: str, timeout: float, attempts: int):
+        super().__init__(f"Intent '{intent}' excedeu {timeout}s em {attempts} tentativa(s).")
+        self.intent = intent
+        self.timeout = timeout
+        self.attempts = attempts
+
+
+class IntentFailedError(RuntimeError):
+    """O adapter devolveu uma falha como texto (ex: erro de ferramenta); 'output' guarda essa saída."""
+
+    def __init__(self, intent: str, output: Any):
+        super().__init__(f"Intent '{intent}' falhou: {str(output)[:200]}")
+        self.intent = intent
+        self.output = output
+
+
+# Métodos que uma expressão pode chamar (str/list/dict e json); nada de format/format_map
+_SAFE_METHODS = frozenset((
+    "count", "endswith", "find", "get", "index", "items", "join", "keys", "lower", "lstrip", "replace",
+    "rsplit", "rstrip", "split", "splitlines", "startswith", "strip", "title", "upper", "values",
+    "loads", "dumps",
+))
+
+
+@lru_cache(maxsize=256)
+def compile_expression(source: str):
+    """
+    Compila uma expressão sobre 'value' (cacheada por texto). Só são aceitas
+    chamadas a builtins de _SAFE_BUILTINS e a métodos de _SAFE_METHODS.
+    """
+    tree = ast.parse(source, mode="eval")
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute) and node.attr.startswith("_"):
+            raise ValueError(f"Atributo '{node.attr}' não permitido em expressão de connect: {source}")
+        if isinstance(node, ast.Name) and node.id.startswith("__"):
+            raise ValueError(f"Nome '{node.id}' não permitido em expressão de connect: {source}")
+        if isinstance(node, ast.Call):
+            func = node.func
+            allowed = (isinstance(func, ast.Name) and func.id in _SAFE_BUILTINS) or \
+                (isinstance(func, ast.Attribute) and func.attr in _SAFE_METHODS)
+            if not allowed:
+                raise ValueError(f"Chamada a '{ast.unparse(func)}' não permitida em expressão de connect: {source}")
+        if isinstance(node, ast.Constant) and isinstance(node.value, str) and "{" in node.value and "_" in node.value:
+            raise ValueError(f"Texto com '{{' e '_' não permitido em expressão de connect: {source}")
+    return compile(tree, f"<connect: {source}>", "eval")
+
+
+async def apply_option(spec: str, value: Any, functions: Dict[str, Callable]) -> Any:
+    """
+    Aplica 'transform'/'filter': função registrada 'spec' (recebe o valor como
+    está, inclusive um BlobRef) ou expressão sobre 'value' (recebe o texto).
+    """
+    func = functions.get(spec)
+    if func is not None:
+        result = func(value)
+        if asyncio.iscoroutine(result):
+            result = await result
+        return result
+    return eval(compile_expression(spec), {"__builtins__": _SAFE_BUILTINS, "json": json},
+                {"value": materialize(value)})
+
+
+def backoff(attempt: int) -> float:
+    """Espera antes da tentativa 'attempt' (1, 2, ...): exponencial com full jitter."""
+    return random.uniform(0, min(RETRY_CAP, RETRY_BASE * 2 ** (attempt - 1)))
+
+
+async def run_with_options(intent: str, call: Callable[[], Any], timeout: Optional[float] = None,
+                           retry: int = 0) -> Any:
+    """
+    Executa call() com prazo real (cancelando a task ao estourar) e até 'retry'
+    novas tentativas em falha (budget esgotado não é repetido). Falhas que o
+    adapter devolve como texto chegam aqui como IntentFailedError. Esgotadas,
+    levanta IntentTimeoutError ou a última exceção.
+    """
+    attempt = 0
+    while True:
+        try:
+            if timeout:
+                return await asyncio.wait_for(call(), timeout)
+            return await call()
+        except (asyncio.CancelledError, BudgetExceededError):
+            raise
+        except asyncio.TimeoutError as e:
+            if attempt >= retry:
+                if isinstance(e, IntentTimeoutError) or not timeout:
+                    raise
+                raise IntentTimeoutError(intent, timeout, attempt + 1) from None
+        except Exception:
+            if attempt >= retry:
+                raise
+        attempt += 1
+        await asyncio.sleep(backoff(attempt))
@@ -1,6 +1,49 @@
+from dataclasses import dataclass
 from typing import Protocol, Optional
 
 
+@dataclass
+class Usage:
+    """Tokens consumidos por uma geração, como reportado pelo provider."""
+
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    estimated: bool = False
+    """True quando o provider não reportou usage e os valores foram estimados."""
+    cached_tokens: int = 0
+    """Parte de prompt_tokens servida do cache de prompt do provider."""
+    cache_write_tokens: int = 0
+    """Parte de prompt_tokens gravada no cache de prompt (a Anthropic cobra essa escrita à parte)."""
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def to_dict(self) -> dict:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "estimated": self.estimated,
+            "cached_tokens": self.cached_tokens,
+            "cache_write_tokens": self.cache_write_tokens,
+        }
+
+
+class GenerationResult(str):
+    """
+    Resposta de generate(): continua sendo uma str (compatível com todo código
+    que trata a resposta como texto), com o usage do provider anexado.
+    """
+
+    usage: Optional[Usage]
+
+    def __new__(cls, text: str, usage: Optional[Usage] = None):
+        obj = super().__new__(cls, text)
+        obj.usage = usage
+        return obj
+
+
 class LLMProvider(Protocol):
     """
     Protocolo que qualquer driver de IA deve implementar para o SynAI.
@@ -24,12 +67,15 @@ class LLMProvider(Protocol):
         Args:
             prompt:     O texto de entrada.
             model:      O identificador do modelo (ex: 'deepseek-chat').
+            system:     Instruções e contexto estáveis do agente (kwarg). Vão
+                        como prefixo separado e cacheável pelo provider.
             max_tokens: Número máximo de tokens na resposta (kwarg).
             temperature: Temperatura de amostragem (kwarg).
             **kwargs:   Parâmetros extras aceitos pelo provider.
 
         Returns:
-            A string de resposta gerada.
+            A string de resposta gerada — de preferência um GenerationResult,
+            que carrega o usage (tokens) reportado pelo provider.
         """
         ...
 
@@ -0,0 +1,224 @@
+"""
+SynAI — Ciclo de Vida dos Modelos Ollama
+========================================
+
+Carregar um modelo local a frio leva segundos, e esse tempo cai no primeiro
+intent que o usa. O OllamaLifecycle lê o workflow antes de executá-lo,
+descobre quais modelos locais cada intent vai usar (modelo, provider, perfil
+e policy, como o roteamento faria) e, enquanto um intent roda, pré-carrega os
+modelos dos próximos intents com um /api/generate vazio e keep_alive.
+
+Modelos usados ficam residentes por keep_alive. Um reaper periódico
+descarrega (keep_alive 0) os que passaram de idle_timeout sem uso e que
+nenhum workflow em andamento ainda vai usar. Só são descarregados modelos
+que o próprio gerenciador carregou ou viu em uso.
+
+O OllamaState guarda, com TTL curto, quais modelos estão carregados
+(/api/ps) e instalados (/api/tags). O roteamento por perfil usa esse estado
+para tentar primeiro os modelos locais já residentes e pular os que nem
+estão instalados.
+
+Uso:
+    lifecycle = OllamaLifecycle(rt.llm_providers["ollama"], keep_alive="15m", idle_timeout=600)
+    lifecycle.attach(rt)
+    await rt.execute_workflow(ast, run_decl)
+    await lifecycle.aclose()
+    synai run pipeline.synx --real --preload-local --keep-alive 15m
+"""
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .providers.ollama import model_tag
+
+logger = logging.getLogger("SynAI.Lifecycle")
+
+
+class OllamaState:
+    """Modelos carregados e instalados num Ollama, consultados com TTL (consultas simultâneas são unidas)."""
+
+    def __init__(self, driver: Any, running_ttl: float = 2.0, installed_ttl: float = 60.0):
+        self.driver = driver
+        self.running_ttl = running_ttl
+        self.installed_ttl = installed_ttl
+        self._cache: Dict[str, Tuple[float, Set[str]]] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    async def running(self) -> Set[str]:
+        """Modelos residentes na memória agora (nomes com tag)."""
+        return await self._get("running", self.driver.running_models, self.running_ttl)
+
+    async def installed(self) -> Set[str]:
+        """Modelos instalados. Vazio quando o Ollama não respondeu."""
+        return await self._get("installed", self.driver.list_models, self.installed_ttl)
+
+    def invalidate(self) -> None:
+        self._cache.clear()
+
+    async def _get(self, key: str, fetch, ttl: float) -> Set[str]:
+        cached = self._cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < ttl:
+            return cached[1]
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = asyncio.ensure_future(fetch())
+        try:
+            names = {model_tag(name) for name in await asyncio.shield(pending)}
+        finally:
+            if self._pending.get(key) is pending and pending.done():
+                del self._pending[key]
+        self._cache[key] = (time.monotonic(), names)
+        return names
+
+
+class LookaheadPlan:
+    """Modelos locais previstos para os intents de uma execução, na ordem do workflow."""
+
+    def __init__(self, lifecycle: "OllamaLifecycle", steps: List[Tuple[str, str]]):
+        self.lifecycle = lifecycle
+        self.steps = steps
+        self._position = {stmt_id: i for i, (stmt_id, _) in enumerate(steps)}
+        self.cursor = -1
+
+    def activate(self):
+        """Torna este plano o ativo no contexto atual. Retorna o token para deactivate()."""
+        return _current_plan.set(self)
+
+    @staticmethod
+    def deactivate(token) -> None:
+        _current_plan.reset(token)
+
+    def upcoming(self, include_current: bool = False) -> List[str]:
+        """Modelos ainda por usar, na ordem, sem repetição (com o do intent atual, se pedido)."""
+        start = max(self.cursor, 0) if include_current else self.cursor + 1
+        seen: List[str] = []
+        for _, model in self.steps[start:]:
+            if model not in seen:
+                seen.append(model)
+        return seen
+
+    def advance(self, stmt_id: str) -> None:
+        """O intent 'stmt_id' começou: marca seu modelo em uso e pré-carrega os próximos."""
+        index = self._position.get(stmt_id)
+        if index is None:
+            return
+        self.cursor = max(self.cursor, index)
+        current = self.steps[index][1]
+        self.lifecycle.touch(current)
+        ahead = [model for model in self.upcoming() if model != current]
+        for model in ahead[:self.lifecycle.lookahead]:
+            self.lifecycle.preload(model)
+
+
+class OllamaLifecycle:
+    """Pré-carga antecipada e descarga de modelos ociosos de um OllamaDriver."""
+
+    def __init__(self, driver: Any, keep_alive: str = "10m", idle_timeout: float = 600.0,
+                 lookahead: int = 1, reap_interval: float = 30.0):
+        self.driver = driver
+        self.keep_alive = keep_alive
+        self.idle_timeout = idle_timeout
+        self.lookahead = lookahead
+        self.reap_interval = reap_interval
+        self.state = OllamaState(driver)
+        self.last_used: Dict[str, float] = {}
+        self.plans: Set[LookaheadPlan] = set()
+        self.stats = {"preloads": 0, "unloads": 0}
+        self._loading: Dict[str, asyncio.Task] = {}
+        self._reaper: Optional[asyncio.Task] = None
+
+    def attach(self, runtime: Any) -> "OllamaLifecycle":
+        """Liga o gerenciador ao runtime; gerações do driver passam a usar o mesmo keep_alive."""
+        runtime.lifecycle = self
+        runtime.ollama_state = self.state
+        if getattr(self.driver, "keep_alive", None) is None:
+            self.driver.keep_alive = self.keep_alive
+        return self
+
+    # ── Plano por execução ──────────────────────────────────────────────────
+    def begin(self, steps: List[Tuple[str, Optional[str]]]) -> LookaheadPlan:
+        """
+        Abre o plano de uma execução a partir de (id do intent, modelo local
+        previsto ou None) e já pré-carrega os primeiros modelos.
+        """
+        plan = LookaheadPlan(self, [(stmt_id, model_tag(model)) for stmt_id, model in steps if model])
+        self.plans.add(plan)
+        for model in plan.upcoming()[:max(1, self.lookahead)]:
+            self.preload(model)
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.ensure_future(self._reap_loop())
+        logger.debug("Plano de modelos locais: %s", [model for _, model in plan.steps])
+        return plan
+
+    def finish(self, plan: LookaheadPlan) -> None:
+        self.plans.discard(plan)
+
+    # ── Carga e descarga ────────────────────────────────────────────────────
+    def touch(self, model: str) -> None:
+        self.last_used[model_tag(model)] = time.monotonic()
+
+    def preload(self, model: str) -> None:
+        """Agenda a carga de 'model' em segundo plano (sem duplicar cargas em andamento)."""
+        model = model_tag(model)
+        task = self._loading.get(model)
+        if task is not None and not task.done():
+            return
+        self.touch(model)
+        self._loading[model] = asyncio.ensure_future(self._load(model))
+
+    async def _load(self, model: str) -> None:
+        if await self.driver.load(model, self.keep_alive):
+            self.state.invalidate()
+            self.stats["preloads"] += 1
+            logger.debug("Pré-carregado: %s (keep_alive=%s)", model, self.keep_alive)
+
+    def needed(self) -> Set[str]:
+        """Modelos em uso ou que algum workflow em andamento ainda vai usar."""
+        return {model for plan in self.plans for model in plan.upcoming(include_current=True)}
+
+    async def reap(self) -> List[str]:
+        """Descarrega os modelos ociosos há mais de idle_timeout que nenhum plano ainda precisa."""
+        now = time.monotonic()
+        needed = self.needed()
+        idle = [model for model, used in self.last_used.items()
+                if now - used > self.idle_timeout and model not in needed]
+        unloaded = []
+        for model in idle:
+            task = self._loading.get(model)
+            if task is not None and not task.done():
+                continue
+            del self.last_used[model]
+            if await self.driver.unload(model):
+                self.state.invalidate()
+                self.stats["unloads"] += 1
+                unloaded.append(model)
+                logger.info(f"Modelo local ocioso descarregado: {model}")
+        return unloaded
+
+    async def _reap_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            try:
+                await self.reap()
+            except Exception as e:
+                logger.warning(f"Falha ao descarregar modelos ociosos: {type(e).__name__}: {e}")
+
+    async def aclose(self) -> None:
+        """Para o reaper e aguarda as cargas pendentes. Não descarrega nada."""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+        pending = [task for task in self._loading.values() if not task.done()]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+_current_plan: ContextVar[Optional[LookaheadPlan]] = ContextVar("synai_lookahead", default=None)
+
+
+def current_plan() -> Optional[LookaheadPlan]:
+    """Retorna o plano de pré-carga da execução em andamento (ou None)."""
+    return _current_plan.get()
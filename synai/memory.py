@@ -0,0 +1,214 @@
+"""
+SynAI — Memória de Conversa por Agente
+======================================
+
+Por padrão cada intent é uma chamada sem estado. Com 'memory' nas
+propriedades de um agente LLM, o agente guarda o histórico das suas trocas
+(prompt da tarefa e resposta) durante a execução do workflow e o envia nas
+chamadas seguintes — e o histórico é limitado à janela de contexto do modelo
+(MODEL_CONTEXT_WINDOWS), descontados o prefixo 'system', o prompt atual e a
+reserva de resposta (max_tokens).
+
+Estratégias quando o histórico não cabe:
+    trim       descarta os turnos mais antigos (padrão)
+    summarize  condensa os turnos descartados num resumo, gerado pelo próprio
+               modelo do agente, que ocupa o lugar deles
+
+A contagem de tokens de cada turno é feita uma vez, ao entrar no histórico;
+o total é mantido incrementalmente, então ajustar à janela não reconta nada.
+
+A memória vale por execução (ativa num ContextVar, como o CostLedger) e por
+agente; execuções concorrentes não compartilham histórico. 'lineage' resume
+todas as trocas já registradas (não muda com trim/summarize) e entra na
+fingerprint incremental; snapshot()/restore() levam o histórico a um worker
+da malha e o trazem de volta.
+
+Um agente com memória não pode ser usado num map nem em mais de um ramo do
+mesmo bloco parallel: as trocas entrariam no histórico em ordem arbitrária.
+
+Uso:
+    agents {
+        analyst: LLM { model: "deepseek-chat" memory: "true" }
+        writer:  LLM { model: "gpt-4o" memory: "6000" memory_strategy: "summarize" }
+    }
+"""
+import hashlib
+import logging
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from .accounting import estimate_tokens
+from .profiles import get_context_window
+
+logger = logging.getLogger("SynAI.Memory")
+
+STRATEGIES = ("trim", "summarize")
+
+SUMMARY_SHARE = 4
+"""O resumo ocupa no máximo 1/SUMMARY_SHARE do espaço disponível para histórico."""
+
+_ROLE_LABELS = {"user": "Usuário", "assistant": "Assistente", "summary": "Resumo da conversa anterior"}
+
+
+@dataclass(frozen=True)
+class Turn:
+    """Uma mensagem do histórico, com seus tokens contados uma única vez."""
+    role: str
+    content: str
+    tokens: int
+
+    @classmethod
+    def of(cls, role: str, content: str) -> "Turn":
+        return cls(role, content, estimate_tokens(content) + 2)
+
+    def render(self) -> str:
+        return f"{_ROLE_LABELS.get(self.role, self.role)}: {self.content}"
+
+
+def memory_window(value: Any, model: str) -> Optional[int]:
+    """
+    Interpreta a propriedade 'memory' de um agente: "true"/"on" usa a janela
+    do modelo; um inteiro fixa a janela em tokens; ausente/"false" desliga.
+    """
+    if value is None:
+        return None
+    text = str(value).strip().lower()
+    if text in ("", "false", "off", "no", "0"):
+        return None
+    if text in ("true", "on", "yes"):
+        return get_context_window(model)
+    try:
+        return int(text)
+    except ValueError:
+        raise ValueError(f"Valor inválido para memory: '{value}' (use true, false ou um número de tokens)")
+
+
+class ConversationMemory:
+    """Histórico de um agente limitado a 'window' tokens."""
+
+    def __init__(self, window: int, strategy: str = "trim"):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"memory_strategy inválida: '{strategy}' (use {', '.join(STRATEGIES)})")
+        self.window = window
+        self.strategy = strategy
+        self.turns: Deque[Turn] = deque()
+        self.summary: Optional[Turn] = None
+        self.tokens = 0
+        self.trimmed = 0
+        self.lineage = ""
+
+    def add(self, role: str, content: str) -> None:
+        turn = Turn.of(role, content)
+        self.turns.append(turn)
+        self.tokens += turn.tokens
+
+    def exchange(self, prompt: str, response: str) -> None:
+        """Registra uma troca completa (tarefa enviada e resposta recebida)."""
+        self.add("user", prompt)
+        self.add("assistant", response)
+        self.lineage = hashlib.sha256(f"{self.lineage}\0{prompt}\0{response}".encode("utf-8")).hexdigest()
+
+    def _drop_oldest(self, budget: int) -> List[Turn]:
+        """Remove turnos antigos (em pares, preservando trocas inteiras) até caber em 'budget'."""
+        dropped = []
+        while self.turns and self.tokens + (self.summary.tokens if self.summary else 0) > budget:
+            turn = self.turns.popleft()
+            self.tokens -= turn.tokens
+            dropped.append(turn)
+            if turn.role == "user" and self.turns and self.turns[0].role == "assistant":
+                reply = self.turns.popleft()
+                self.tokens -= reply.tokens
+                dropped.append(reply)
+        self.trimmed += len(dropped)
+        return dropped
+
+    async def fit(self, budget: int, summarize: Optional[Callable[[str, int], Awaitable[str]]] = None) -> None:
+        """
+        Ajusta o histórico para caber em 'budget' tokens. Na estratégia
+        'summarize', summarize(texto, max_tokens) condensa o que saiu.
+        """
+        budget = max(0, budget)
+        if self.summary is not None and self.summary.tokens > budget:
+            self.summary = None
+        dropped = self._drop_oldest(budget)
+        if not dropped or self.strategy != "summarize" or summarize is None:
+            if dropped:
+                logger.debug("Memória: %d turno(s) descartados para caber em %d tokens", len(dropped), budget)
+            return
+        limit = budget // SUMMARY_SHARE
+        if limit < 16:
+            return
+        previous = [self.summary] if self.summary is not None else []
+        text = "\n".join(turn.render() for turn in previous + dropped)
+        try:
+            condensed = await summarize(text, limit)
+        except Exception as e:
+            logger.warning(f"Falha ao resumir histórico ({type(e).__name__}: {e}); turnos descartados.")
+            self.summary = None
+            return
+        self.summary = Turn.of("summary", str(condensed).strip())
+        self._drop_oldest(budget)
+        if self.summary.tokens > budget:
+            self.summary = None
+        logger.debug("Memória: %d turno(s) resumidos em %d tokens", len(dropped), self.summary.tokens if self.summary else 0)
+
+    def render(self) -> str:
+        """Histórico em texto, do mais antigo ao mais recente ('' se vazio)."""
+        turns = ([self.summary] if self.summary is not None else []) + list(self.turns)
+        return "\n".join(turn.render() for turn in turns)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado serializável (JSON) do histórico."""
+        return {
+            "window": self.window,
+            "strategy": self.strategy,
+            "turns": [[turn.role, turn.content] for turn in self.turns],
+            "summary": self.summary.content if self.summary is not None else None,
+            "trimmed": self.trimmed,
+            "lineage": self.lineage,
+        }
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        """Substitui o histórico pelo de um snapshot() (os tokens são recontados)."""
+        self.turns = deque(Turn.of(role, content) for role, content in state.get("turns", []))
+        self.tokens = sum(turn.tokens for turn in self.turns)
+        self.summary = Turn.of("summary", state["summary"]) if state.get("summary") else None
+        self.trimmed = state.get("trimmed", 0)
+        self.lineage = state.get("lineage", "")
+
+
+class AgentMemories:
+    """Memórias dos agentes de uma execução de workflow, por id de agente."""
+
+    def __init__(self):
+        self.agents: Dict[str, ConversationMemory] = {}
+
+    def activate(self):
+        """Torna este conjunto o ativo no contexto atual. Retorna o token para deactivate()."""
+        return _current_memories.set(self)
+
+    @staticmethod
+    def deactivate(token) -> None:
+        _current_memories.reset(token)
+
+    def get(self, agent_id: str, window: int, strategy: str = "trim") -> ConversationMemory:
+        memory = self.agents.get(agent_id)
+        if memory is None:
+            memory = self.agents[agent_id] = ConversationMemory(window, strategy)
+        return memory
+
+    def restore(self, agent_id: str, state: Dict[str, Any]) -> ConversationMemory:
+        """Memória de 'agent_id' a partir de um snapshot() (ex: recebido do coordenador)."""
+        memory = self.agents[agent_id] = ConversationMemory(state["window"], state.get("strategy", "trim"))
+        memory.restore(state)
+        return memory
+
+
+_current_memories: ContextVar[Optional[AgentMemories]] = ContextVar("synai_memories", default=None)
+
+
+def current_memories() -> Optional[AgentMemories]:
+    """Retorna as memórias da execução em andamento (ou None fora de um workflow)."""
+    return _current_memories.get()
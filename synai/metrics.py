@@ -0,0 +1,369 @@
+"""
+SynAI — Registro de Métricas
+============================
+
+Agrega o que os eventos de roteamento apenas anunciam: contadores de
+tentativas, sucessos, skips e falhas por motivo; histogramas de latência por
+(provider, slug) no estilo HDR; e gauges de requisições em voo.
+
+A gravação é feita no próprio event loop, sem locks: cada série é uma
+entrada de dicionário indexada pela tupla de labels, e o histograma usa
+buckets log-lineares (precisão relativa de ~1,6%) em um dicionário esparso.
+O lock do registro só é usado ao criar métricas e ao tirar snapshots.
+
+Uso:
+    rt.metrics.snapshot()                  # dict com contadores, gauges e percentis
+    rt.metrics.to_prometheus()             # text exposition format (0.0.4)
+    curl localhost:8765/metrics            # via synai serve
+"""
+import math
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Buckets exportados no formato Prometheus (segundos). Os percentis do
+# snapshot Python usam a resolução completa do histograma.
+PROMETHEUS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+
+    def _series(self) -> Dict[LabelValues, Any]:
+        raise NotImplementedError
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Counter / Gauge
+# ─────────────────────────────────────────────────────────────────────────────
+class Counter(_Metric):
+    """Contador monotônico com labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        values = self._values
+        values[labels] = values.get(labels, 0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def _series(self) -> Dict[LabelValues, float]:
+        return dict(self._values)
+
+    def expose(self) -> List[str]:
+        lines = self._header()
+        for labels, value in sorted(self._series().items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """Valor instantâneo (ex: requisições em voo)."""
+
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        values = self._values
+        values[labels] = values.get(labels, 0) - amount
+
+    def set(self, *labels: str, value: float) -> None:
+        self._values[labels] = value
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Histograma HDR (log-linear)
+# ─────────────────────────────────────────────────────────────────────────────
+class _HdrSeries:
+    """
+    Histograma de uma série, em microssegundos inteiros.
+
+    Valores abaixo de 2**SUB_BITS caem em buckets exatos; acima disso cada
+    potência de dois é dividida em 2**(SUB_BITS-1) sub-buckets lineares.
+    """
+
+    SUB_BITS = 7
+    SUB_COUNT = 1 << SUB_BITS
+    HALF = SUB_BITS - 1
+
+    __slots__ = ("counts", "count", "sum_us", "min_us", "max_us")
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.sum_us = 0
+        self.min_us = 0
+        self.max_us = 0
+
+    @classmethod
+    def index_of(cls, value: int) -> int:
+        if value < cls.SUB_COUNT:
+            return value
+        shift = value.bit_length() - cls.SUB_BITS
+        return (shift << cls.HALF) + (value >> shift)
+
+    @classmethod
+    def upper_bound(cls, index: int) -> int:
+        """Maior valor (µs) representado pelo bucket."""
+        if index < cls.SUB_COUNT:
+            return index
+        shift = (index >> cls.HALF) - 1
+        sub = index - (shift << cls.HALF)
+        return ((sub + 1) << shift) - 1
+
+    def record(self, value_us: int) -> None:
+        idx = self.index_of(value_us)
+        counts = self.counts
+        counts[idx] = counts.get(idx, 0) + 1
+        if not self.count or value_us < self.min_us:
+            self.min_us = value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+        self.count += 1
+        self.sum_us += value_us
+
+    def percentiles(self, quantiles: Iterable[float]) -> Dict[float, int]:
+        items = sorted(self.counts.items())
+        result: Dict[float, int] = {}
+        for q in sorted(quantiles):
+            target = max(1, math.ceil(q * self.count))
+            seen = 0
+            value = self.max_us
+            for idx, n in items:
+                seen += n
+                if seen >= target:
+                    value = min(self.upper_bound(idx), self.max_us)
+                    break
+            result[q] = value
+        return result
+
+    def cumulative(self, bounds_us: Iterable[int]) -> List[int]:
+        items = sorted(self.counts.items())
+        out: List[int] = []
+        pos = 0
+        seen = 0
+        for bound in bounds_us:
+            while pos < len(items) and self.upper_bound(items[pos][0]) <= bound:
+                seen += items[pos][1]
+                pos += 1
+            out.append(seen)
+        return out
+
+
+class Histogram(_Metric):
+    """Histograma de latência (segundos) com labels, resolução HDR."""
+
+    kind = "histogram"
+    QUANTILES = (0.5, 0.9, 0.95, 0.99, 0.999)
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = PROMETHEUS_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+        self._values: Dict[LabelValues, _HdrSeries] = {}
+
+    def observe(self, *labels: str, seconds: float) -> None:
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = _HdrSeries()
+        series.record(int(seconds * 1_000_000))
+
+    def _series(self) -> Dict[LabelValues, _HdrSeries]:
+        return dict(self._values)
+
+    def summary(self, *labels: str) -> Optional[Dict[str, Any]]:
+        """Contagem, média, min/max e percentis (em ms) de uma série."""
+        series = self._values.get(labels)
+        if series is None or not series.count:
+            return None
+        pcts = series.percentiles(self.QUANTILES)
+        out = {
+            "count": series.count,
+            "mean_ms": round(series.sum_us / series.count / 1000.0, 3),
+            "min_ms": series.min_us / 1000.0,
+            "max_ms": series.max_us / 1000.0,
+        }
+        for q, value in pcts.items():
+            out[f"p{q * 100:g}".replace(".", "")] = value / 1000.0
+        return out
+
+    def expose(self) -> List[str]:
+        lines = self._header()
+        bounds_us = [int(b * 1_000_000) for b in self.buckets]
+        for labels, series in sorted(self._series().items()):
+            cumulative = series.cumulative(bounds_us)
+            for bound, n in zip(self.buckets, cumulative):
+                le = 'le="%g"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {n}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {series.count}")
+            plain = _format_labels(self.labels, labels)
+            lines.append(f"{self.name}_sum{plain} {_format_value(series.sum_us / 1e6)}")
+            lines.append(f"{self.name}_count{plain} {series.count}")
+        return lines
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Registro
+# ─────────────────────────────────────────────────────────────────────────────
+class MetricsRegistry:
+    """Conjunto nomeado de métricas com snapshot e exposição Prometheus."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self.created = time.time()
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labels != metric.labels:
+                    raise ValueError(f"Métrica '{metric.name}' já registrada com outro tipo/labels.")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = PROMETHEUS_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Retorna {nome: [{"labels": {...}, "value" | "summary": ...}]}.
+        Histogramas trazem count/mean/min/max/p50/p90/p95/p99/p999 em ms.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        snap: Dict[str, Any] = {"uptime_s": round(time.time() - self.created, 3)}
+        for metric in metrics:
+            entries = []
+            for labels in sorted(metric._series()):
+                entry: Dict[str, Any] = {"labels": dict(zip(metric.labels, labels))}
+                if isinstance(metric, Histogram):
+                    entry["summary"] = metric.summary(*labels)
+                else:
+                    entry["value"] = metric.get(*labels)
+                entries.append(entry)
+            snap[metric.name] = entries
+        return snap
+
+    def to_prometheus(self) -> str:
+        """Serializa todas as métricas no text exposition format do Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Métricas do runtime
+# ─────────────────────────────────────────────────────────────────────────────
+class RoutingMetrics(MetricsRegistry):
+    """Registro com as métricas de roteamento alimentadas pelo SynRuntime."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = self.counter(
+            "synai_routing_calls_total",
+            "Chamadas a call_model por tipo e resultado (first_try, fallback, failed).",
+            ("kind", "outcome"),
+        )
+        self.attempts = self.counter(
+            "synai_provider_attempts_total", "Tentativas de geração por provider e slug.", ("provider", "slug"))
+        self.successes = self.counter(
+            "synai_provider_successes_total", "Gerações bem-sucedidas por provider e slug.", ("provider", "slug"))
+        self.failures = self.counter(
+            "synai_provider_failures_total", "Falhas de geração por provider, slug e motivo.",
+            ("provider", "slug", "reason"))
+        self.skips = self.counter(
+            "synai_provider_skips_total", "Candidatos pulados sem tentativa, por motivo.", ("provider", "reason"))
+        self.latency = self.histogram(
+            "synai_provider_latency_seconds", "Latência de cada tentativa de geração.", ("provider", "slug"))
+        self.tokens = self.counter(
+            "synai_tokens_total", "Tokens consumidos por provider, slug e tipo (prompt/completion/cached).",
+            ("provider", "slug", "kind"))
+        self.cost = self.counter(
+            "synai_cost_usd_total", "Custo estimado (USD) por provider e slug, via MODEL_PRICING.",
+            ("provider", "slug"))
+        self.in_flight = self.gauge(
+            "synai_provider_in_flight", "Gerações em andamento por provider.", ("provider",))
+        self.cache = self.counter(
+            "synai_cache_lookups_total", "Consultas ao cache de respostas por tipo e resultado (hit/miss).",
+            ("kind", "outcome"))
+
+    @staticmethod
+    def failure_reason(exc: BaseException) -> str:
+        """Motivo de baixa cardinalidade: http_<status> ou o nome da exceção."""
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+        if isinstance(status, int):
+            return f"http_{status}"
+        return type(exc).__name__
+
+    def routing_summary(self) -> Dict[str, Any]:
+        """Visão agregada por (provider, slug): tentativas, taxa de sucesso e percentis."""
+        out: Dict[str, Any] = {}
+        for (provider, slug) in sorted(self.attempts._series()):
+            attempts = self.attempts.get(provider, slug)
+            successes = self.successes.get(provider, slug)
+            out[f"{provider}:{slug}"] = {
+                "attempts": attempts,
+                "successes": successes,
+                "success_ratio": round(successes / attempts, 4) if attempts else None,
+                "latency_ms": self.latency.summary(provider, slug),
+            }
+        calls = self.calls._series()
+        total = sum(calls.values())
+        fallbacks = sum(v for (kind, outcome), v in calls.items() if outcome == "fallback")
+        failed = sum(v for (kind, outcome), v in calls.items() if outcome == "failed")
+        return {
+            "calls": total,
+            "fallback_rate": round(fallbacks / total, 4) if total else None,
+            "failure_rate": round(failed / total, 4) if total else None,
+            "providers": out,
+        }
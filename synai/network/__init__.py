@@ -1,2 +1,7 @@
 from .mesh import MeshNode
 from .discovery import MeshDiscovery
+from .transport import ConnectionPool, MeshServer, MeshTransportError
+from .distributed import DistributedExecutor, RemoteIntentError, WorkerService
+from .providers import MeshProviderDriver, ProviderService
+from .cache import ClusterCache, HashRing
+from .quota import QuotaClient, QuotaCoordinator, QuotaLimit
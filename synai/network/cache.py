@@ -0,0 +1,202 @@
+"""
+SynAI Mesh — Cache Distribuído de Respostas
+===========================================
+
+Resultados de call_model (e embeddings) idênticos deixam de ser pagos uma vez
+por nó: o espaço de chaves é dividido entre os peers da malha por um anel de
+hash consistente com nós virtuais, e cada chave tem um dono. Antes de chamar
+um provider, o runtime consulta o dono; depois de uma geração bem-sucedida,
+grava o resultado nele.
+
+Quando um nó entra, só as chaves que passam a ser dele mudam de lugar (~1/N
+do total) — o nó que as tinha as entrega ao novo dono. Quando um nó sai, suas
+chaves somem com ele (é um cache: a próxima chamada repopula).
+
+O cache é best-effort: peer lento ou fora do ar = miss, nunca erro.
+
+Uso:
+    rt.cache = ClusterCache(node, capacity=50_000, ttl=3600)
+    await node.start(discovery=True)
+
+Sem peers, ClusterCache funciona como um LRU local.
+"""
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .mesh import MeshNode
+from .transport import MeshTransportError
+
+logger = logging.getLogger("SynAI.Cache")
+
+CACHE_GET = "cache_get"
+CACHE_SET = "cache_set"
+
+
+def cache_key(kind: str, *parts: Any) -> str:
+    """Chave estável (sha256) para uma chamada: tipo + parâmetros que afetam o resultado."""
+    raw = json.dumps([kind, *parts], ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Anel de hash consistente com 'vnodes' pontos por nó."""
+
+    def __init__(self, vnodes: int = 64):
+        self.vnodes = vnodes
+        self._points: List[Tuple[int, str]] = []
+        self._hashes: List[int] = []
+        self.members: set = set()
+
+    def add(self, member: str) -> None:
+        if member in self.members:
+            return
+        self.members.add(member)
+        for i in range(self.vnodes):
+            bisect.insort(self._points, (_hash(f"{member}#{i}"), member))
+        self._hashes = [h for h, _ in self._points]
+
+    def remove(self, member: str) -> None:
+        if member not in self.members:
+            return
+        self.members.discard(member)
+        self._points = [p for p in self._points if p[1] != member]
+        self._hashes = [h for h, _ in self._points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._points:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._points)
+        return self._points[index][1]
+
+
+class ClusterCache:
+    """
+    Cache de respostas fragmentado entre os peers com cache ativo.
+
+    Cada nó guarda em um LRU local (capacity entradas, ttl opcional) as chaves
+    que o anel atribui a ele e atende cache_get/cache_set dos demais.
+    """
+
+    def __init__(self, node: MeshNode, capacity: int = 10_000, ttl: Optional[float] = None,
+                 vnodes: int = 64, timeout: float = 0.5):
+        self.node = node
+        self.capacity = capacity
+        self.ttl = ttl
+        self.timeout = timeout
+        self.ring = HashRing(vnodes)
+        self.ring.add(node.node_id)
+        self.store: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "remote_errors": 0, "handed_off": 0}
+        node.on_message(CACHE_GET, self._on_get)
+        node.on_message(CACHE_SET, self._on_set)
+        node.load_sources.append(lambda: {"cache": True})
+        node.on_peer_change(self._on_peer_change)
+
+    # ── Anel ─────────────────────────────────────────────────────────────────
+    def _sync_ring(self) -> None:
+        """Mantém no anel este nó + os peers que anunciaram cache na carga."""
+        members = {self.node.node_id}
+        for peer in self.node.peers.values():
+            if (peer.get("load") or {}).get("cache") and peer["status"] != "unreachable":
+                members.add(peer["id"])
+        if members == self.ring.members:
+            return
+        joined = members - self.ring.members
+        for member in self.ring.members - members:
+            self.ring.remove(member)
+        for member in joined:
+            self.ring.add(member)
+        if joined and self.store:
+            asyncio.get_running_loop().create_task(self._hand_off())
+
+    def _on_peer_change(self, event: str, peer: Dict) -> None:
+        if event == "left":
+            self.ring.remove(peer["id"])
+
+    async def _hand_off(self) -> None:
+        """Entrega aos novos donos as chaves locais que o anel passou para eles."""
+        moved: Dict[str, List[Tuple[str, Any, Optional[float]]]] = {}
+        for key, (value, expires) in list(self.store.items()):
+            owner = self.ring.owner(key)
+            if owner != self.node.node_id:
+                moved.setdefault(owner, []).append((key, value, expires))
+                del self.store[key]
+        for owner, entries in moved.items():
+            try:
+                await self.node.send(owner, CACHE_SET, {"entries": [
+                    {"key": k, "value": v, "ttl": None if e is None else max(0.0, e - time.monotonic())}
+                    for k, v, e in entries
+                ]}, timeout=max(self.timeout, 5.0))
+                self.stats["handed_off"] += len(entries)
+            except (MeshTransportError, asyncio.TimeoutError, KeyError) as e:
+                logger.debug("Hand-off de %d chaves para %s falhou: %s", len(entries), owner, e)
+
+    # ── LRU local ────────────────────────────────────────────────────────────
+    def _local_get(self, key: str) -> Any:
+        entry = self.store.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires < time.monotonic():
+            del self.store[key]
+            return None
+        self.store.move_to_end(key)
+        return value
+
+    def _local_set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        self.store[key] = (value, None if ttl is None else time.monotonic() + ttl)
+        self.store.move_to_end(key)
+        while len(self.store) > self.capacity:
+            self.store.popitem(last=False)
+
+    async def _on_get(self, sender_id: str, content: Dict[str, Any]) -> Dict[str, Any]:
+        return {"value": self._local_get(content["key"])}
+
+    async def _on_set(self, sender_id: str, content: Dict[str, Any]) -> Dict[str, Any]:
+        entries = content.get("entries") or [content]
+        for entry in entries:
+            self._local_set(entry["key"], entry["value"], entry.get("ttl"))
+        return {"stored": len(entries)}
+
+    # ── API ──────────────────────────────────────────────────────────────────
+    def owner(self, key: str) -> str:
+        self._sync_ring()
+        return self.ring.owner(key)
+
+    async def get(self, key: str) -> Any:
+        """Valor da chave no nó dono, ou None (miss, expirado ou dono inalcançável)."""
+        owner = self.owner(key)
+        if owner == self.node.node_id:
+            value = self._local_get(key)
+        else:
+            try:
+                response = await self.node.send(owner, CACHE_GET, {"key": key}, timeout=self.timeout)
+                value = (response.get("data") or {}).get("value")
+            except (MeshTransportError, asyncio.TimeoutError, KeyError) as e:
+                self.stats["remote_errors"] += 1
+                logger.debug("cache_get em %s falhou: %s", owner, e)
+                value = None
+        self.stats["hits" if value is not None else "misses"] += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        owner = self.owner(key)
+        if owner == self.node.node_id:
+            self._local_set(key, value, ttl)
+            return
+        try:
+            await self.node.send(owner, CACHE_SET, {"key": key, "value": value, "ttl": ttl}, timeout=self.timeout)
+        except (MeshTransportError, asyncio.TimeoutError, KeyError) as e:
+            self.stats["remote_errors"] += 1
+            logger.debug("cache_set em %s falhou: %s", owner, e)
@@ -1,66 +1,187 @@
-import socket
 import json
+import time
+import random
+import socket
 import logging
 import asyncio
-from typing import List, Dict
+from typing import Any, Callable, Dict, List, Optional
+
+from .transport import SECRET_ENV, mesh_secret, sign, verify
+
+
+class _DiscoveryProtocol(asyncio.DatagramProtocol):
+    def __init__(self, discovery: "MeshDiscovery"):
+        self.discovery = discovery
+
+    def datagram_received(self, data: bytes, addr):
+        self.discovery._on_datagram(data, addr)
+
+    def error_received(self, exc: Exception):
+        self.discovery.logger.debug("Erro UDP: %s", exc)
+
 
 class MeshDiscovery:
     """
     Componente responsável por encontrar outros nós SynAI na rede local
     via UDP Broadcast (Porta 54321).
+
+    Roda sobre asyncio.DatagramProtocol: start() escuta a porta de descoberta
+    (SO_REUSEPORT, vários nós por máquina) e anuncia o nó periodicamente com
+    jitter, para que nós iniciados juntos não anunciem em rajada. Cada HELLO
+    recebido de outro nó é entregue a 'on_peer' — nada aqui bloqueia o loop.
+    Ao ouvir um nó pela primeira vez, o anúncio é antecipado, então quem acabou
+    de entrar descobre os demais sem esperar um ciclo inteiro.
+
+    HELLOs levam "ts" e "mac" (HMAC do segredo da malha sobre o HELLO
+    canônico); os sem assinatura válida ou com ts fora de max_skew segundos
+    são descartados. Sem segredo a descoberta não inicia.
     """
     BROADCAST_PORT = 54321
-    
-    def __init__(self, node_id: str, http_port: int = 8000):
+
+    def __init__(self, node_id: str, http_port: int = 8000, role: str = "worker",
+                 interval: float = 5.0, jitter: float = 0.2,
+                 broadcast_addr: str = "<broadcast>", port: Optional[int] = None,
+                 secret: Optional[str] = None, max_skew: float = 30.0):
         self.node_id = node_id
+        self.secret = mesh_secret(secret)
+        self.max_skew = max_skew
         self.http_port = http_port
+        self.role = role
+        self.interval = interval
+        self.jitter = jitter
+        self.broadcast_addr = broadcast_addr
+        self.port = port or self.BROADCAST_PORT
+        self.advertise_host: Optional[str] = None
+        # Campos extras do HELLO: dict ou callable que o devolve (ex: carga atual)
+        self.metadata: Any = {}
+        self.on_peer: Optional[Callable[[Dict[str, Any]], None]] = None
         self.logger = logging.getLogger(f"SynAI.Discovery.{node_id}")
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-        self.sock.settimeout(0.5)
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._announce_task: Optional[asyncio.Task] = None
+        self._heard: Optional[Dict[str, Dict[str, Any]]] = None
+        self._known: set = set()
+
+    @property
+    def running(self) -> bool:
+        return self._transport is not None
+
+    async def start(self):
+        """Passa a escutar HELLOs e a anunciar o nó a cada ~interval segundos."""
+        if self._transport is not None:
+            return
+        if self.secret is None:
+            raise ValueError(f"a descoberta UDP exige o segredo da malha (secret ou {SECRET_ENV})")
+        loop = asyncio.get_running_loop()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        sock.bind(('', self.port))
+        sock.setblocking(False)
+        self._transport, _ = await loop.create_datagram_endpoint(lambda: _DiscoveryProtocol(self), sock=sock)
+        self._announce_task = asyncio.create_task(self._announce_loop())
+        self.logger.info(f"Descoberta ativa na porta UDP {self.port} (intervalo ~{self.interval}s)")
+
+    async def stop(self):
+        if self._announce_task is not None:
+            self._announce_task.cancel()
+            try:
+                await self._announce_task
+            except asyncio.CancelledError:
+                pass
+            self._announce_task = None
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    async def _announce_loop(self):
+        while True:
+            self.announce()
+            spread = self.interval * self.jitter
+            await asyncio.sleep(self.interval + random.uniform(-spread, spread))
+
+    def _hello(self) -> bytes:
+        metadata = self.metadata() if callable(self.metadata) else self.metadata
+        hello = {**metadata, "type": "HELLO", "id": self.node_id, "port": self.http_port, "role": self.role,
+                 "ts": time.time()}
+        if self.advertise_host:
+            hello["host"] = self.advertise_host
+        hello["mac"] = sign(self.secret, _canonical(hello))
+        return json.dumps(hello).encode('utf-8')
 
     def announce(self):
         """Grita na rede: 'EU ESTOU AQUI!'"""
-        message = json.dumps({
-            "type": "HELLO",
-            "id": self.node_id,
-            "port": self.http_port
-        }).encode('utf-8')
-        
+        target = (self.broadcast_addr, self.port)
         try:
-            self.sock.sendto(message, ('<broadcast>', self.BROADCAST_PORT))
-            self.logger.info(f"Ping UDP enviado para porta {self.BROADCAST_PORT}")
+            if self._transport is not None:
+                self._transport.sendto(self._hello(), target)
+            else:
+                with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+                    sock.setblocking(False)
+                    sock.sendto(self._hello(), target)
+            self.logger.debug("Ping UDP enviado para porta %s", self.port)
         except Exception as e:
             self.logger.error(f"Erro ao anunciar presença: {e}")
 
-    def scan(self, duration: int = 2) -> List[Dict]:
-        """Escuta a rede por 'duration' segundos procurando outros nós."""
-        found_peers = []
+    def _on_datagram(self, data: bytes, addr):
+        try:
+            payload = json.loads(data.decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            return
+        if not isinstance(payload, dict) or payload.get("type") != "HELLO":
+            return
+        mac = payload.pop("mac", None)
+        if not verify(self.secret, mac, _canonical(payload)):
+            self.logger.debug("HELLO sem assinatura válida de %s descartado", addr[0])
+            return
+        ts = payload.get("ts")
+        if not isinstance(ts, (int, float)) or abs(time.time() - ts) > self.max_skew:
+            self.logger.debug("HELLO expirado de %s descartado", addr[0])
+            return
+        peer_id = payload.get("id")
+        if not peer_id or peer_id == self.node_id or "port" not in payload:
+            return
+        peer = {
+            **{k: v for k, v in payload.items() if k not in ("type", "id", "host", "port", "role", "ts")},
+            "id": peer_id,
+            "url": f"tcp://{payload.get('host') or addr[0]}:{payload['port']}",
+            "role": payload.get("role") or "discovered",
+        }
+        if self._heard is not None:
+            self._heard[peer_id] = peer
+        if peer_id not in self._known:
+            # Nó novo: anuncia de volta para que ele não espere o próximo ciclo
+            self._known.add(peer_id)
+            if self._transport is not None:
+                self.announce()
+        if self.on_peer is not None:
+            try:
+                self.on_peer(peer)
+            except Exception as e:
+                self.logger.error(f"Erro no callback de descoberta: {e}")
+
+    def forget(self, peer_id: str):
+        """Esquece um nó (ex: expirado) — o próximo HELLO dele volta a ser 'novo'."""
+        self._known.discard(peer_id)
+
+    async def scan(self, duration: float = 2) -> List[Dict]:
+        """Escuta a rede por 'duration' segundos (sem bloquear o loop) procurando outros nós."""
+        started_here = self._transport is None
+        if started_here:
+            await self.start()
+        self._heard = {}
         self.logger.info(f"Escutando frequências UDP por {duration}s...")
-        
-        # Cria um socket temporário para escutar
-        listener = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        listener.bind(('', self.BROADCAST_PORT))
-        listener.settimeout(duration)
-        
         try:
-            while True:
-                data, addr = listener.recvfrom(1024)
-                payload = json.loads(data.decode('utf-8'))
-                
-                if payload.get("type") == "HELLO" and payload.get("id") != self.node_id:
-                    peer_url = f"http://{addr[0]}:{payload['port']}"
-                    found_peers.append({
-                        "id": payload["id"],
-                        "url": peer_url,
-                        "role": "discovered"
-                    })
-                    self.logger.info(f"Nó detectado via UDP: {payload['id']} em {peer_url}")
-        except socket.timeout:
-            pass
-        except Exception as e:
-            self.logger.error(f"Erro no scan: {e}")
+            self.announce()
+            await asyncio.sleep(duration)
+            return list(self._heard.values())
         finally:
-            listener.close()
-            
-        return found_peers
+            self._heard = None
+            if started_here:
+                await self.stop()
+
+
+def _canonical(hello: Dict[str, Any]) -> str:
+    return json.dumps(hello, sort_keys=True, separators=(",", ":"), default=str)
@@ -0,0 +1,325 @@
+"""
+SynAI Mesh — Execução Distribuída
+=================================
+
+Um coordenador despacha os intents prontos de um workflow para nós worker
+da malha, cada um com o seu próprio SynRuntime; as saídas voltam para o
+data_flow do coordenador, que segue executando o workflow normalmente.
+
+    coordenador (SynRuntime.executor = DistributedExecutor)
+        └─ run_intent ──► worker A (WorkerService + SynRuntime)
+                     └──► worker B  ← retry aqui se A cair ou estourar o timeout
+
+Tokens e custo gastos nos workers são registrados no CostLedger do
+coordenador (inclusive os de intents que falharam no worker), e o budget
+restante viaja junto com cada intent. O histórico de
+um agente com memory também: o worker o recebe, roda o intent com ele e
+devolve o histórico atualizado. Só falhas de transporte e timeouts levam o
+intent a outro worker; um erro do próprio intent no worker volta ao
+coordenador como RemoteIntentError. Sem nenhum worker alcançável, o intent
+roda localmente (local_fallback=True).
+
+Uso:
+    synai worker --port 9101 --real              # em cada máquina
+    synai run pipeline.synx --real --inputs itens.jsonl \\
+        --worker 10.0.0.5:9101 --worker 10.0.0.6:9101
+
+    rt.executor = DistributedExecutor(MeshNode("coord", role="coordinator"))
+    rt.executor.add_worker("w1", "tcp://127.0.0.1:9101")
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from ..accounting import BudgetExceededError, CostLedger, current_ledger, intent_scope
+from ..interfaces import Usage
+from ..memory import AgentMemories
+from ..tracing import STATUS_ERROR, SPAN_KIND_CLIENT, Tracer, current_traceparent, current_tracer, trace_span
+from .mesh import MeshNode
+from .providers import ProviderService
+from .transport import MeshTransportError
+
+logger = logging.getLogger("SynAI.Distributed")
+
+RUN_INTENT = "run_intent"
+STEAL = "steal_intents"
+
+
+class RemoteIntentError(RuntimeError):
+    """O intent falhou no worker (erro do intent, não do transporte): não é reenviado a outro worker."""
+
+    def __init__(self, intent: str, worker: str, reason: str):
+        super().__init__(f"Intent '{intent}' falhou no worker {worker}: {reason}")
+        self.intent = intent
+        self.worker = worker
+        self.reason = reason
+
+
+class WorkerService:
+    """
+    Expõe o SynRuntime local aos coordenadores via ação 'run_intent'.
+
+    No máximo 'concurrency' intents executam ao mesmo tempo; os demais esperam
+    em fila. Com start(), um worker ocioso rouba intents enfileirados do peer
+    com a maior fila: o dono delega o intent ao ladrão e, se a delegação
+    falhar, o devolve à frente da própria fila.
+    """
+
+    def __init__(self, node: MeshNode, runtime, concurrency: int = 4):
+        self.node = node
+        self.runtime = runtime
+        self.concurrency = concurrency
+        self.running = 0
+        self.completed = 0
+        self.stolen = 0
+        self.lent = 0
+        self.queue: Deque[Tuple[str, Dict[str, Any], asyncio.Future]] = deque()
+        self._steal_task: Optional[asyncio.Task] = None
+        node.on_message(RUN_INTENT, self.run_intent)
+        node.on_message(STEAL, self._on_steal)
+        node.load_sources.append(self.load)
+        # Os mesmos drivers também atendem chamadas avulsas (MeshProviderDriver)
+        self.provider_service = ProviderService(node, runtime)
+
+    @property
+    def providers(self) -> List[str]:
+        return self.provider_service.providers
+
+    def load(self) -> Dict[str, Any]:
+        return {"in_flight": self.running + self.provider_service.in_flight, "queue_depth": len(self.queue), "capacity": self.concurrency}
+
+    async def start(self, steal_interval: Optional[float] = 0.5) -> None:
+        await self.provider_service.refresh_capabilities()
+        if steal_interval and self._steal_task is None:
+            self._steal_task = asyncio.create_task(self._steal_loop(steal_interval))
+
+    async def stop(self) -> None:
+        if self._steal_task is not None:
+            self._steal_task.cancel()
+            try:
+                await self._steal_task
+            except asyncio.CancelledError:
+                pass
+            self._steal_task = None
+
+    # ── Fila ─────────────────────────────────────────────────────────────────
+    async def run_intent(self, sender_id: str, content: Dict[str, Any]) -> Dict[str, Any]:
+        future = asyncio.get_running_loop().create_future()
+        self.queue.append((sender_id, content, future))
+        self._pump()
+        return await future
+
+    def _pump(self) -> None:
+        while self.queue and self.running < self.concurrency:
+            sender_id, content, future = self.queue.popleft()
+            if future.done():
+                continue
+            self.running += 1
+            task = asyncio.create_task(self._execute(sender_id, content))
+            task.add_done_callback(lambda t, f=future: self._finish(t, f))
+
+    def _finish(self, task: asyncio.Task, future: asyncio.Future) -> None:
+        self.running -= 1
+        if not future.done():
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+        self._pump()
+
+    async def _execute(self, sender_id: str, content: Dict[str, Any]) -> Dict[str, Any]:
+        agent_cfg = content["agent"]
+        intent = content["intent"]
+        ledger = CostLedger(content.get("budget"))
+        ledger_token = ledger.activate()
+        memories = AgentMemories()
+        memories_token = memories.activate()
+        agent_id = agent_cfg.get("id")
+        if content.get("memory"):
+            memories.restore(agent_id, content["memory"])
+        tracer_token = None
+        if self.runtime.tracer is not None and current_tracer() is None:
+            tracer_token = self.runtime.tracer.activate(content.get("traceparent"))
+        logger.info(f"[{self.node.node_id}] Intent '{intent['name']}' recebido de {sender_id}")
+        try:
+            with intent_scope(intent['name']):
+                output = await self.runtime._dispatch_to_adapter(agent_cfg, intent, content.get("input", "N/A"))
+            self.completed += 1
+            result = {"output": output, "calls": ledger.calls}
+            if agent_id in memories.agents:
+                result["memory"] = memories.agents[agent_id].snapshot()
+            return result
+        except BudgetExceededError as e:
+            return {"budget_exceeded": {"model": e.model, "budget": e.budget, "spent": e.spent},
+                    "calls": ledger.calls}
+        except Exception as e:
+            # O que já foi gasto volta mesmo assim, para o ledger do coordenador
+            logger.error(f"[{self.node.node_id}] Intent '{intent['name']}' falhou: {type(e).__name__}: {e}")
+            return {"error": f"{type(e).__name__}: {e}", "calls": ledger.calls}
+        finally:
+            if tracer_token is not None:
+                Tracer.deactivate(tracer_token)
+            AgentMemories.deactivate(memories_token)
+            CostLedger.deactivate(ledger_token)
+
+    # ── Work stealing ────────────────────────────────────────────────────────
+    async def _steal_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            if self.running or self.queue:
+                continue
+            await self.node.heartbeat(timeout=interval)
+            victim, depth = None, 0
+            for peer in self.node.peers.values():
+                queued = (peer.get("load") or {}).get("queue_depth", 0)
+                if queued > depth and peer["status"] != "unreachable":
+                    victim, depth = peer, queued
+            if victim is None:
+                continue
+            try:
+                response = await self.node.send(victim["id"], STEAL, {"max": self.concurrency, "port": self.node.port},
+                                                timeout=interval)
+            except (MeshTransportError, asyncio.TimeoutError):
+                continue
+            granted = (response.get("data") or {}).get("granted", 0)
+            if granted:
+                self.stolen += granted
+                logger.info(f"[{self.node.node_id}] {granted} intents roubados de {victim['id']}")
+
+    async def _on_steal(self, thief_id: str, content: Dict[str, Any]) -> Dict[str, Any]:
+        content = content or {}
+        if not self.queue:
+            return {"granted": 0}
+        if self.node.get_peer(thief_id) is None:
+            # Ladrão conhecido só pelo endereço (--peer): registra pelo IP de origem
+            origin = self.node.origins.get(thief_id)
+            if not origin or not content.get("port"):
+                return {"granted": 0}
+            self.node.register_peer(thief_id, f"tcp://{origin}:{content['port']}", role="worker",
+                                    source="discovery")
+        # Cede no máximo metade da fila, a partir do fim (os mais recentes)
+        granted = min(int(content.get("max", 1)), (len(self.queue) + 1) // 2)
+        jobs = []
+        while self.queue and len(jobs) < granted:
+            job = self.queue.pop()
+            if not job[2].done():
+                jobs.append(job)
+        for job in jobs:
+            asyncio.create_task(self._delegate(thief_id, job))
+        self.lent += len(jobs)
+        return {"granted": len(jobs)}
+
+    async def _delegate(self, thief_id: str, job: Tuple[str, Dict[str, Any], asyncio.Future]) -> None:
+        _, content, future = job
+        try:
+            response = await self.node.send(thief_id, RUN_INTENT, content, timeout=None)
+            if response.get("status") == "success":
+                if not future.done():
+                    future.set_result(response["data"])
+                return
+        except (MeshTransportError, asyncio.TimeoutError):
+            pass
+        logger.warning(f"[{self.node.node_id}] Delegação para {thief_id} falhou — intent volta à fila")
+        self.lent -= 1
+        self.queue.appendleft(job)
+        self._pump()
+
+
+class DistributedExecutor:
+    """
+    Executor de intents remoto para SynRuntime.executor.
+
+    Escolhe o worker capaz menos ocupado (MeshNode.pick_peer, pela carga que
+    cada worker publica); se um worker cair ou não responder dentro de
+    'timeout', o intent é reenviado ao próximo. Se o intent falhar no worker,
+    levanta RemoteIntentError sem tentar outro.
+    """
+
+    def __init__(self, node: MeshNode, timeout: Optional[float] = 120.0, local_fallback: bool = True):
+        self.node = node
+        self.timeout = timeout
+        self.local_fallback = local_fallback
+        self.stats = {"dispatched": 0, "retries": 0, "local": 0}
+
+    def add_worker(self, worker_id: str, url: str) -> None:
+        self.node.register_peer(worker_id, url, role="worker")
+
+    @property
+    def workers(self) -> List[Dict]:
+        return [p for p in self.node.peers.values() if p.get("role") != "coordinator"]
+
+    def _pick(self, tried: Set[str], provider: Optional[str]) -> Optional[Dict]:
+        exclude = tried | {p["id"] for p in self.node.peers.values() if p["role"] == "coordinator"}
+        peer = self.node.pick_peer(provider=provider, exclude=exclude)
+        if peer is None and provider:
+            # Ninguém anunciou o provider: qualquer worker pode ter fallback útil
+            peer = self.node.pick_peer(exclude=exclude)
+        return peer
+
+    async def run_intent(self, runtime, agent_cfg: Dict[str, Any], intent: Dict[str, Any], input_data: str) -> str:
+        ledger = current_ledger()
+        content = {
+            "agent": agent_cfg,
+            "intent": intent,
+            "input": input_data,
+            "budget": ledger.remaining if ledger is not None else None,
+        }
+        memory = runtime._agent_memory(agent_cfg, str(agent_cfg.get('properties', {}).get('model', 'unknown')))
+        if memory is not None:
+            content["memory"] = memory.snapshot()
+        provider = str(agent_cfg.get('properties', {}).get('provider') or '').replace('"', '') or None
+        tried: Set[str] = set()
+        while True:
+            worker = self._pick(tried, provider)
+            if worker is None:
+                break
+            worker_id = worker["id"]
+            tried.add(worker_id)
+            if len(tried) > 1:
+                self.stats["retries"] += 1
+            with trace_span(f"intent {intent['name']}", SPAN_KIND_CLIENT, **{
+                "synai.intent": intent['name'], "synai.worker": worker_id,
+            }) as span:
+                content["traceparent"] = current_traceparent()
+                try:
+                    response = await self.node.send(worker_id, RUN_INTENT, content, timeout=self.timeout)
+                except (MeshTransportError, asyncio.TimeoutError) as e:
+                    span.set_status(STATUS_ERROR, f"{type(e).__name__}: {e}")
+                    logger.warning(f"Worker {worker_id} indisponível para '{intent['name']}': "
+                                   f"{type(e).__name__}: {e}")
+                    continue
+
+            if response.get("status") == "ignored":
+                # O peer não atende run_intent (não roda WorkerService): tenta outro
+                logger.warning(f"Worker {worker_id} recusou '{intent['name']}': {response.get('reason')}")
+                continue
+            if response.get("status") != "success":
+                raise RemoteIntentError(intent['name'], worker_id, str(response.get('reason')))
+            self.stats["dispatched"] += 1
+            data = response["data"]
+            if ledger is not None:
+                for call in data.get("calls", []):
+                    ledger.record(call["provider"], call["slug"], Usage(
+                        call["prompt_tokens"], call["completion_tokens"], call.get("estimated", False),
+                        call.get("cached_tokens", 0), call.get("cache_write_tokens", 0),
+                    ))
+            if memory is not None and data.get("memory"):
+                memory.restore(data["memory"])
+            if "budget_exceeded" in data:
+                exceeded = data["budget_exceeded"]
+                raise BudgetExceededError(exceeded["model"], exceeded["budget"], exceeded["spent"])
+            if "error" in data:
+                raise RemoteIntentError(intent['name'], worker_id, data["error"])
+            return data["output"]
+
+        if not self.local_fallback:
+            raise RuntimeError(f"Nenhum worker disponível para o intent '{intent['name']}'.")
+        logger.warning(f"Nenhum worker disponível — executando '{intent['name']}' localmente.")
+        self.stats["local"] += 1
+        return await runtime._dispatch_to_adapter(agent_cfg, intent, input_data)
+
+    async def aclose(self) -> None:
+        await self.node.stop()
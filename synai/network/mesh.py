@@ -1,64 +1,289 @@
 import json
+import time
 import logging
 import asyncio
-from typing import Dict, List, Optional, Callable
+from typing import Any, Dict, List, Optional, Callable, Tuple
+from urllib.parse import urlsplit
 
 from .discovery import MeshDiscovery
+from .transport import ConnectionPool, MeshServer, MeshTransportError, mesh_secret
 
 class MeshNode:
     """
     Representa um nó na Malha Cognitiva SynAI.
     Capaz de descobrir pares, enviar mensagens e processar comandos remotos.
     Agora com suporte a Descoberta Automática (UDP).
+
+    Mensagens trafegam pelo transporte asyncio (synai.network.transport):
+    start() sobe o servidor do nó, send() faz requisição/resposta com um peer
+    e broadcast() envia a todos os peers em paralelo.
+
+        node = MeshNode("alpha", port=0)       # 0 = porta livre
+        await node.start()
+        node.register_peer("beta", "tcp://127.0.0.1:9001")
+        await node.send("beta", "handshake", {})
+        await node.stop()
+
+    A tabela de peers é um dict por node id. Peers vindos da descoberta
+    guardam 'last_seen' e expiram após peer_ttl segundos sem HELLO nem
+    resposta; peers registrados à mão ficam até remove_peer().
+    on_peer_change(cb) recebe cb(evento, peer) com 'joined', 'updated' e 'left'.
+
+    Cada nó publica sua carga (load(): in_flight, queue_depth, capacity,
+    providers, models) no HELLO, nas respostas e no heartbeat; pick_peer()
+    usa esses dados para escolher o peer capaz menos ocupado.
+
+    'secret' (ou SYNAI_MESH_SECRET) é o segredo compartilhado da malha:
+    conexões e HELLOs só são aceitos de quem o conhece. Sem ele o nó só
+    escuta em loopback e não faz descoberta.
     """
-    def __init__(self, node_id: str, role: str = "worker", port: int = 8000):
+    def __init__(self, node_id: str, role: str = "worker", port: int = 8000,
+                 host: str = "127.0.0.1", codec: str = "json", peer_ttl: float = 15.0,
+                 secret: Optional[str] = None):
         self.node_id = node_id
+        self.secret = mesh_secret(secret)
         self.role = role
+        self.host = host
         self.port = port
-        self.peers: List[Dict] = []
+        self.peer_ttl = peer_ttl
+        self.peers: Dict[str, Dict] = {}
         self.handlers: Dict[str, Callable] = {}
         self.logger = logging.getLogger(f"SynAI.Mesh.{node_id}")
-        self.discovery = MeshDiscovery(node_id, port)
+        self.discovery = MeshDiscovery(node_id, port, role=role, secret=self.secret)
+        self.discovery.on_peer = self._on_discovered
+        self.discovery.metadata = lambda: {"load": self.load()}
+        self.in_flight = 0
+        # Callables que complementam load() (ex: fila e capacidades do WorkerService)
+        self.load_sources: List[Callable[[], Dict[str, Any]]] = []
+        self._outstanding: Dict[str, int] = {}
+        # Último IP de onde cada remetente falou conosco (para responder a quem não está na tabela)
+        self.origins: Dict[str, str] = {}
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self.pool = ConnectionPool(node_id, codec=codec, secret=self.secret)
+        self._server: Optional[MeshServer] = None
+        self._peer_listeners: List[Callable[[str, Dict], Any]] = []
+        self._evict_task: Optional[asyncio.Task] = None
+
+    async def start(self, discovery: bool = False):
+        """
+        Sobe o servidor do nó; com port=0 o sistema escolhe uma porta livre.
+        Com discovery=True também passa a anunciar e descobrir peers via UDP.
+        """
+        if self._server is None:
+            self._server = MeshServer(self.node_id, self.process_payload, self.host, self.port,
+                                      secret=self.secret)
+            await self._server.start()
+            self.port = self._server.port
+            self.discovery.http_port = self.port
+            if self.host not in ("0.0.0.0", "::", ""):
+                self.discovery.advertise_host = self.host
+        if discovery:
+            await self.start_discovery()
+        return self
+
+    async def start_discovery(self):
+        """Anúncios periódicos + expiração dos peers descobertos que sumirem."""
+        await self.discovery.start()
+        if self._evict_task is None:
+            self._evict_task = asyncio.create_task(self._evict_loop())
 
-    def scan_network(self):
-        """Busca ativa por pares na rede local."""
+    async def start_heartbeat(self, interval: float = 2.0):
+        """Consulta periodicamente a carga de todos os peers (útil sem descoberta)."""
+        async def _loop():
+            while True:
+                await self.heartbeat(timeout=interval)
+                await asyncio.sleep(interval)
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(_loop())
+
+    async def stop(self):
+        """Encerra descoberta, heartbeat, servidor e as conexões com os peers."""
+        for task in (self._evict_task, self._heartbeat_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._evict_task = self._heartbeat_task = None
+        await self.discovery.stop()
+        if self._server is not None:
+            await self._server.stop()
+            self._server = None
+        await self.pool.aclose()
+
+    async def scan_network(self, duration: float = 2.0) -> int:
+        """Busca ativa por pares na rede local (sem bloquear o event loop)."""
         self.logger.info("Iniciando varredura de rede...")
-        found = self.discovery.scan(duration=2)
-        for peer in found:
-            self.register_peer(peer["id"], peer["url"], peer["role"])
+        found = await self.discovery.scan(duration=duration)
         return len(found)
 
     def announce_presence(self):
         """Anuncia presença na rede."""
         self.discovery.announce()
 
-    def register_peer(self, peer_id: str, url: str, role: str = "unknown"):
-        """Registra um novo nó conhecido na malha."""
-        peer = {"id": peer_id, "url": url, "role": role, "status": "unknown"}
-        self.peers.append(peer)
-        self.logger.info(f"Peer registrado: {peer_id} ({role}) em {url}")
+    # ── Tabela de peers ──────────────────────────────────────────────────────
+    def on_peer_change(self, callback: Callable[[str, Dict], Any]):
+        """Registra cb(evento, peer) para 'joined', 'updated' e 'left'."""
+        self._peer_listeners.append(callback)
+
+    def _notify(self, event: str, peer: Dict):
+        for callback in self._peer_listeners:
+            try:
+                callback(event, peer)
+            except Exception as e:
+                self.logger.error(f"Erro no callback de peers ({event}): {e}")
+
+    def register_peer(self, peer_id: str, url: str, role: str = "unknown",
+                      source: str = "manual", **info) -> Dict:
+        """Registra (ou atualiza) um nó conhecido na malha."""
+        now = time.monotonic()
+        peer = self.peers.get(peer_id)
+        if peer is None:
+            peer = {"id": peer_id, "url": url, "role": role, "status": "unknown",
+                    "source": source, "last_seen": now, **info}
+            self.peers[peer_id] = peer
+            self.logger.info(f"Peer registrado: {peer_id} ({role}) em {url}")
+            self._notify("joined", peer)
+            return peer
+
+        changed = peer["url"] != url or peer["role"] != role
+        if peer["url"] != url:
+            self._drop_connection(peer)
+        peer.update(info, url=url, role=role, last_seen=now)
+        if source == "manual":
+            peer["source"] = "manual"
+        if changed:
+            self.logger.info(f"Peer atualizado: {peer_id} ({role}) em {url}")
+            self._notify("updated", peer)
+        return peer
+
+    def remove_peer(self, peer_id: str) -> Optional[Dict]:
+        peer = self.peers.pop(peer_id, None)
+        if peer is not None:
+            self._drop_connection(peer)
+            self.discovery.forget(peer_id)
+            self.logger.info(f"Peer removido: {peer_id}")
+            self._notify("left", peer)
+        return peer
+
+    def get_peer(self, peer_id: str) -> Optional[Dict]:
+        return self.peers.get(peer_id)
+
+    def _on_discovered(self, peer: Dict):
+        info = {k: v for k, v in peer.items() if k not in ("id", "url", "role")}
+        self.register_peer(peer["id"], peer["url"], peer["role"], source="discovery", **info)
+
+    def evict_stale(self, now: Optional[float] = None) -> List[str]:
+        """Remove os peers descobertos sem sinal há mais de peer_ttl segundos."""
+        now = time.monotonic() if now is None else now
+        stale = [peer_id for peer_id, peer in self.peers.items()
+                 if peer["source"] == "discovery" and now - peer["last_seen"] > self.peer_ttl]
+        for peer_id in stale:
+            self.remove_peer(peer_id)
+        return stale
+
+    async def _evict_loop(self):
+        while True:
+            await asyncio.sleep(min(self.peer_ttl / 3, self.discovery.interval))
+            self.evict_stale()
+
+    def _drop_connection(self, peer: Dict):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.create_task(self.pool.discard(*self._address(peer)))
+
+    # ── Carga e escolha de peers ─────────────────────────────────────────────
+    def load(self) -> Dict[str, Any]:
+        """Carga atual deste nó, como publicada aos peers."""
+        load: Dict[str, Any] = {"in_flight": self.in_flight, "queue_depth": 0, "capacity": 0,
+                                "providers": [], "models": []}
+        for source in self.load_sources:
+            load.update(source())
+        return load
+
+    def peer_score(self, peer: Dict) -> float:
+        """Ocupação estimada do peer: (em voo + fila + enviados por nós) / capacidade."""
+        load = peer.get("load") or {}
+        busy = load.get("in_flight", 0) + load.get("queue_depth", 0) + self._outstanding.get(peer["id"], 0)
+        return busy / max(1, load.get("capacity") or 1)
+
+    @staticmethod
+    def is_capable(peer: Dict, provider: Optional[str] = None, model: Optional[str] = None) -> bool:
+        """True se o peer anunciou o provider e/ou o modelo local pedidos."""
+        load = peer.get("load") or {}
+        if provider and provider not in load.get("providers", ()):
+            return False
+        if model:
+            models = load.get("models", ())
+            if model not in models and f"{model}:latest" not in models:
+                return False
+        return True
+
+    def pick_peer(self, provider: Optional[str] = None, model: Optional[str] = None,
+                  role: Optional[str] = None, exclude=()) -> Optional[Dict]:
+        """
+        Escolhe o peer capaz menos ocupado. Peers inalcançáveis ficam por
+        último; empates favorecem quem respondeu mais recentemente.
+        """
+        best, best_key = None, None
+        for peer in self.peers.values():
+            if peer["id"] in exclude or (role and peer["role"] != role):
+                continue
+            if not self.is_capable(peer, provider, model):
+                continue
+            key = (peer["status"] == "unreachable", self.peer_score(peer), -peer["last_seen"])
+            if best_key is None or key < best_key:
+                best, best_key = peer, key
+        return best
+
+    async def heartbeat(self, timeout: Optional[float] = 1.0) -> int:
+        """Atualiza a carga de todos os peers; retorna quantos responderam."""
+        peers = list(self.peers)
+        responses = await asyncio.gather(
+            *(self.send(peer_id, "heartbeat", None, timeout=timeout) for peer_id in peers),
+            return_exceptions=True,
+        )
+        return sum(1 for r in responses if not isinstance(r, BaseException))
+
+    @staticmethod
+    def _address(peer: Dict) -> Tuple[str, int]:
+        """Extrai (host, porta) da URL do peer (tcp://, http:// ou host:porta)."""
+        url = peer["url"] if "//" in peer["url"] else f"tcp://{peer['url']}"
+        parts = urlsplit(url)
+        return parts.hostname or "127.0.0.1", parts.port or 8000
 
     def on_message(self, action: str, handler: Callable):
         """Registra um callback para uma ação específica."""
         self.handlers[action] = handler
 
-    async def process_payload(self, sender_id: str, payload: dict) -> dict:
-        """Processa um pacote de dados recebido via rede."""
+    async def process_payload(self, sender_id: str, payload: dict, origin: Optional[str] = None) -> dict:
+        """Processa um pacote de dados recebido via rede (origin = IP do remetente)."""
         action = payload.get("action")
         content = payload.get("content")
+        if origin:
+            self.origins[sender_id] = origin
         
         self.logger.info(f"Recebido '{action}' de {sender_id}")
 
         if action == "handshake":
             return self._handle_handshake(sender_id, content)
+
+        if action == "heartbeat":
+            return {"status": "success", "node_id": self.node_id, "role": self.role, "load": self.load()}
         
         if action in self.handlers:
+            self.in_flight += 1
             try:
                 result = await self.handlers[action](sender_id, content)
-                return {"status": "success", "data": result}
+                return {"status": "success", "data": result, "load": self.load()}
             except Exception as e:
                 self.logger.error(f"Erro ao processar {action}: {e}")
-                return {"status": "error", "reason": str(e)}
+                return {"status": "error", "reason": str(e), "load": self.load()}
+            finally:
+                self.in_flight -= 1
 
         return {"status": "ignored", "reason": "action_unknown"}
 
@@ -67,11 +292,55 @@ class MeshNode:
             "status": "accepted",
             "node_id": self.node_id,
             "role": self.role,
-            "message": "SynAI Mesh Connection Established"
+            "message": "SynAI Mesh Connection Established",
+            "load": self.load(),
         }
 
-    async def broadcast(self, action: str, content: dict):
-        """Envia uma mensagem para todos os peers conhecidos (Simulação por enquanto)."""
-        # Futuro: Implementar HTTP requests reais aqui usando requests ou aiohttp
-        for peer in self.peers:
-            self.logger.info(f"Broadcasting {action} to {peer['id']}...")
+    async def send(self, peer_id: str, action: str, content: Any = None,
+                   timeout: Optional[float] = 5.0) -> dict:
+        """Envia uma ação a um peer e aguarda a resposta (process_payload remoto)."""
+        peer = self.get_peer(peer_id)
+        if peer is None:
+            raise KeyError(f"Peer desconhecido: {peer_id}")
+        host, port = self._address(peer)
+        self._outstanding[peer_id] = self._outstanding.get(peer_id, 0) + 1
+        try:
+            response = await self.pool.request(
+                host, port, {"action": action, "content": content}, timeout=timeout
+            )
+        except (MeshTransportError, asyncio.TimeoutError):
+            peer["status"] = "unreachable"
+            raise
+        finally:
+            self._outstanding[peer_id] -= 1
+        peer["status"] = "online"
+        peer["last_seen"] = time.monotonic()
+        if isinstance(response.get("load"), dict):
+            peer["load"] = response["load"]
+        return response
+
+    async def broadcast(self, action: str, content: Any = None,
+                        timeout: Optional[float] = 2.0) -> Dict[str, dict]:
+        """
+        Envia uma mensagem a todos os peers conhecidos em paralelo. Cada peer
+        tem seu próprio timeout: um nó lento ou fora do ar não atrasa os demais.
+        Retorna {peer_id: resposta}; falhas viram {"status": "error", ...}.
+        """
+        peers = list(self.peers.values())
+        if not peers:
+            return {}
+        self.logger.debug("Broadcast '%s' para %d peers", action, len(peers))
+        responses = await asyncio.gather(
+            *(self.send(peer["id"], action, content, timeout=timeout) for peer in peers),
+            return_exceptions=True,
+        )
+        results: Dict[str, dict] = {}
+        for peer, response in zip(peers, responses):
+            if isinstance(response, asyncio.TimeoutError):
+                results[peer["id"]] = {"status": "error", "reason": "timeout"}
+            elif isinstance(response, BaseException):
+                self.logger.warning(f"Broadcast '{action}' falhou para {peer['id']}: {response}")
+                results[peer["id"]] = {"status": "error", "reason": str(response)}
+            else:
+                results[peer["id"]] = response
+        return results
@@ -0,0 +1,200 @@
+"""
+SynAI Mesh — Providers Remotos
+==============================
+
+Só algumas máquinas rodam Ollama ou têm certas API keys. ProviderService
+publica os drivers locais de um nó na malha; MeshProviderDriver implementa
+LLMProvider encaminhando generate/get_embedding a um peer que anunciou o
+provider — e entra nas cadeias de policy e fallback como um driver local:
+
+    # na máquina com Ollama
+    ProviderService(node, runtime)
+
+    # em qualquer outro nó
+    rt.register_llm_provider("ollama", MeshProviderDriver(node, "ollama"))
+
+Entre os peers capazes, cada chamada vai para o menos ocupado que ainda tem
+vaga (max_per_peer chamadas simultâneas por peer, sobre as conexões
+persistentes do ConnectionPool). Se o peer cair ou o provider remoto falhar,
+o próximo peer capaz é tentado antes de o erro voltar ao call_model.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+from ..interfaces import GenerationResult, Usage
+from ..tracing import Tracer, current_traceparent, current_tracer
+from .mesh import MeshNode
+from .transport import MeshTransportError
+
+logger = logging.getLogger("SynAI.MeshProvider")
+
+GENERATE = "llm_generate"
+EMBED = "llm_embed"
+
+
+class ProviderService:
+    """Atende chamadas de provider vindas da malha com os drivers do runtime local."""
+
+    def __init__(self, node: MeshNode, runtime):
+        self.node = node
+        self.runtime = runtime
+        self.providers: List[str] = []
+        self.models: List[str] = []
+        self.calls = 0
+        self.in_flight = 0
+        node.on_message(GENERATE, self._on_generate)
+        node.on_message(EMBED, self._on_embed)
+        node.load_sources.append(self.load)
+        self._refresh_providers()
+
+    def load(self) -> Dict[str, Any]:
+        return {"providers": self.providers, "models": self.models}
+
+    def _local_drivers(self) -> Dict[str, Any]:
+        # Drivers remotos não são republicados (evita ciclos entre nós)
+        return {alias: driver for alias, driver in self.runtime.llm_providers.items()
+                if not isinstance(driver, MeshProviderDriver)}
+
+    def _refresh_providers(self) -> None:
+        self.providers = [alias for alias, driver in self._local_drivers().items() if driver.is_available()]
+
+    async def refresh_capabilities(self) -> None:
+        """Atualiza providers disponíveis e modelos locais (ex: Ollama /api/tags)."""
+        self._refresh_providers()
+        models: List[str] = []
+        for alias, driver in self._local_drivers().items():
+            if alias in self.providers and hasattr(driver, "list_models"):
+                installed = await driver.list_models()
+                if installed:
+                    models.extend(installed)
+                else:
+                    # list_models vazio = servidor local fora do ar ou sem modelos
+                    self.providers.remove(alias)
+        self.models = models
+
+    def _driver(self, alias: str):
+        driver = self._local_drivers().get(alias)
+        if driver is None or alias not in self.providers:
+            raise LookupError(f"Provider '{alias}' não disponível em {self.node.node_id}")
+        return driver
+
+    def _activate_tracer(self, content: Dict[str, Any]):
+        if self.runtime.tracer is not None and current_tracer() is None:
+            return self.runtime.tracer.activate(content.get("traceparent"))
+        return None
+
+    async def _on_generate(self, sender_id: str, content: Dict[str, Any]) -> Dict[str, Any]:
+        driver = self._driver(content["provider"])
+        tracer_token = self._activate_tracer(content)
+        self.calls += 1
+        self.in_flight += 1
+        try:
+            result = await driver.generate(prompt=content["prompt"], model=content["model"],
+                                           **content.get("kwargs", {}))
+        finally:
+            self.in_flight -= 1
+            if tracer_token is not None:
+                Tracer.deactivate(tracer_token)
+        usage = getattr(result, "usage", None)
+        return {"text": str(result), "usage": usage.to_dict() if usage else None}
+
+    async def _on_embed(self, sender_id: str, content: Dict[str, Any]) -> Dict[str, Any]:
+        driver = self._driver(content["provider"])
+        if not hasattr(driver, "get_embedding"):
+            return {"embedding": None}
+        kwargs = {"model": content["model"]} if content.get("model") else {}
+        return {"embedding": await driver.get_embedding(content["text"], **kwargs)}
+
+
+class MeshProviderDriver:
+    """
+    LLMProvider que executa as chamadas em um peer da malha com o provider
+    'provider' disponível (anunciado na carga do peer).
+    """
+
+    def __init__(self, node: MeshNode, provider: str, max_per_peer: int = 4,
+                 timeout: Optional[float] = 180.0):
+        self.node = node
+        self.provider = provider
+        self.provider_name = provider
+        self.max_per_peer = max_per_peer
+        self.timeout = timeout
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._pending: Dict[str, int] = {}
+
+    def is_available(self) -> bool:
+        """True se algum peer alcançável anunciou o provider."""
+        return any(peer["status"] != "unreachable" and self.node.is_capable(peer, self.provider)
+                   for peer in self.node.peers.values())
+
+    def _slot(self, peer_id: str) -> asyncio.Semaphore:
+        slot = self._slots.get(peer_id)
+        if slot is None:
+            slot = self._slots[peer_id] = asyncio.Semaphore(self.max_per_peer)
+        return slot
+
+    def _pick(self, tried: Set[str], model: Optional[str]) -> Optional[Dict]:
+        """
+        Peer capaz menos ocupado: primeiro os que têm vaga (menos de max_per_peer
+        chamadas deste driver, em voo ou aguardando), depois pela carga do peer.
+        Com 'model', peers que têm o modelo instalado vêm antes.
+        """
+        best, best_key = None, None
+        for peer in self.node.peers.values():
+            if peer["id"] in tried or not self.node.is_capable(peer, self.provider):
+                continue
+            pending = self._pending.get(peer["id"], 0)
+            key = (peer["status"] == "unreachable",
+                   bool(model) and not self.node.is_capable(peer, self.provider, model),
+                   pending >= self.max_per_peer,
+                   pending / self.max_per_peer + self.node.peer_score(peer))
+            if best_key is None or key < best_key:
+                best, best_key = peer, key
+        return best
+
+    async def _call(self, action: str, content: Dict[str, Any], model: Optional[str]) -> Dict[str, Any]:
+        tried: Set[str] = set()
+        last_error: Optional[Exception] = None
+        while True:
+            peer = self._pick(tried, model)
+            if peer is None:
+                break
+            peer_id = peer["id"]
+            tried.add(peer_id)
+            content["traceparent"] = current_traceparent()
+            self._pending[peer_id] = self._pending.get(peer_id, 0) + 1
+            try:
+                async with self._slot(peer_id):
+                    response = await self.node.send(peer_id, action, content, timeout=self.timeout)
+            except (MeshTransportError, asyncio.TimeoutError) as e:
+                last_error = e
+                logger.warning(f"Peer {peer_id} indisponível para '{self.provider}': {type(e).__name__}: {e}")
+                continue
+            finally:
+                self._pending[peer_id] -= 1
+            if response.get("status") == "success":
+                return response["data"]
+            last_error = RuntimeError(f"{peer_id}: {response.get('reason')}")
+            logger.info(f"Peer {peer_id} falhou em '{self.provider}': {response.get('reason')}")
+        if last_error is not None:
+            raise last_error
+        raise RuntimeError(f"Nenhum peer da malha oferece o provider '{self.provider}'.")
+
+    async def generate(self, prompt: str, model: str, **kwargs) -> str:
+        content = {"provider": self.provider, "prompt": prompt, "model": model, "kwargs": kwargs}
+        data = await self._call(GENERATE, content, model if self.provider == "ollama" else None)
+        usage = data.get("usage")
+        return GenerationResult(data["text"], Usage(
+            usage["prompt_tokens"], usage["completion_tokens"], usage.get("estimated", False),
+            usage.get("cached_tokens", 0), usage.get("cache_write_tokens", 0),
+        ) if usage else None)
+
+    async def get_embedding(self, text: str, model: Optional[str] = None) -> Optional[list[float]]:
+        content = {"provider": self.provider, "text": text, "model": model}
+        try:
+            data = await self._call(EMBED, content, None)
+        except Exception as e:
+            logger.warning(f"Embedding remoto via '{self.provider}' falhou: {e}")
+            return None
+        return data.get("embedding")
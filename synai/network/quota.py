@@ -0,0 +1,297 @@
+"""
+SynAI Mesh — Quotas Compartilhadas de Provider
+==============================================
+
+Vários nós usando a mesma chave de OpenRouter ou Groq estouram juntos o
+limite do provider se cada um limitar só a si mesmo. Aqui um nó coordenador
+guarda os limites reais de cada chave (requisições/min, tokens/min,
+requisições/dia) em token buckets e empresta fatias deles (leases) aos nós:
+
+    nó ──quota_lease(want)──► coordenador: concede até a fatia justa do que
+    ◄── {requests, tokens, ttl} ───        há no bucket (ou retry_after)
+
+Cada nó consome a fatia localmente, sem ida à rede por chamada, e devolve o
+que sobrou ao pedir o próximo lease. Um 429 do provider esvazia o bucket da
+chave no coordenador, pausando todo o cluster até o limite se recompor.
+
+Os limites são aplicados com 'safety' (padrão 90%) para o cluster ficar
+logo abaixo do limite real. Se o coordenador estiver inalcançável, o nó
+segue sem limitar (fail-open) e registra um aviso.
+
+Uso:
+    # no coordenador
+    QuotaCoordinator(node, {"groq": QuotaLimit(rpm=30, tpm=6000),
+                            "openrouter": QuotaLimit(rpm=20, rpd=50)})
+    # em cada nó (inclusive no coordenador)
+    rt.quota = QuotaClient(node, "coordinator-id")
+"""
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Union
+
+from .mesh import MeshNode
+from .transport import MeshTransportError
+
+logger = logging.getLogger("SynAI.Quota")
+
+QUOTA_LEASE = "quota_lease"
+QUOTA_THROTTLED = "quota_throttled"
+
+
+@dataclass
+class QuotaLimit:
+    """Limites reais de uma chave de provider (None = sem limite)."""
+
+    rpm: Optional[float] = None
+    """Requisições por minuto."""
+    tpm: Optional[float] = None
+    """Tokens (prompt + resposta) por minuto."""
+    rpd: Optional[int] = None
+    """Requisições por dia (UTC) — ex: cota diária do free tier."""
+
+    @classmethod
+    def parse(cls, spec: str) -> "QuotaLimit":
+        """'rpm=30,tpm=6000,rpd=1000' → QuotaLimit."""
+        values: Dict[str, float] = {}
+        for part in filter(None, (p.strip() for p in spec.split(","))):
+            name, _, value = part.partition("=")
+            if name not in ("rpm", "tpm", "rpd") or not value:
+                raise ValueError(f"limite inválido: '{part}' (use rpm=, tpm= ou rpd=)")
+            values[name] = float(value)
+        if "rpd" in values:
+            values["rpd"] = int(values["rpd"])
+        return cls(**values)
+
+
+class _Bucket:
+    """Token bucket: 'capacity' unidades recompostas ao longo de 'period' segundos."""
+
+    __slots__ = ("capacity", "rate", "level", "updated")
+
+    def __init__(self, capacity: float, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> float:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        return self.level
+
+    def wait_time(self, amount: float) -> float:
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+
+class _KeyState:
+    def __init__(self, limit: QuotaLimit, safety: float):
+        self.limit = limit
+        self.requests = _Bucket(limit.rpm * safety, 60.0) if limit.rpm else None
+        self.tokens = _Bucket(limit.tpm * safety, 60.0) if limit.tpm else None
+        self.daily_limit = int(limit.rpd * safety) if limit.rpd else None
+        self.daily_used = 0
+        self.day = datetime.now(timezone.utc).date()
+        self.clients: Dict[str, float] = {}
+
+
+class QuotaCoordinator:
+    """Guarda os buckets de cada chave e concede leases aos nós da malha."""
+
+    def __init__(self, node: MeshNode, limits: Dict[str, QuotaLimit], safety: float = 0.9,
+                 lease_ttl: float = 5.0):
+        self.node = node
+        self.safety = safety
+        self.lease_ttl = lease_ttl
+        self.keys: Dict[str, _KeyState] = {alias: _KeyState(limit, safety) for alias, limit in limits.items()}
+        node.on_message(QUOTA_LEASE, self._on_lease)
+        node.on_message(QUOTA_THROTTLED, self._on_throttled)
+
+    async def _on_lease(self, sender_id: str, content: Dict[str, Any]) -> Dict[str, Any]:
+        return self.lease(sender_id, content["key"], content.get("want", 1),
+                          content.get("tokens_per_request", 0), content.get("release"))
+
+    async def _on_throttled(self, sender_id: str, content: Dict[str, Any]) -> Dict[str, Any]:
+        self.throttled(content["key"])
+        return {}
+
+    def lease(self, client_id: str, key: str, want: int, tokens_per_request: float = 0,
+              release: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """
+        Concede até 'want' requisições (com tokens_per_request tokens cada) a
+        client_id, limitadas ao bucket e à fatia justa entre os clientes ativos.
+        """
+        state = self.keys.get(key)
+        if state is None:
+            return {"unlimited": True}
+        now = time.monotonic()
+        today = datetime.now(timezone.utc).date()
+        if today != state.day:
+            state.day, state.daily_used = today, 0
+
+        if state.requests:
+            state.requests.refill(now)
+        if state.tokens:
+            state.tokens.refill(now)
+        if release:
+            # Sobra do lease anterior volta ao bucket (tokens podem vir negativos: estimativa baixa)
+            if state.requests:
+                state.requests.level = min(state.requests.capacity,
+                                           state.requests.level + release.get("requests", 0))
+            if state.tokens:
+                state.tokens.level = min(state.tokens.capacity, state.tokens.level + release.get("tokens", 0))
+            state.daily_used = max(0, state.daily_used - int(release.get("requests", 0)))
+
+        state.clients[client_id] = now
+        for other, seen in list(state.clients.items()):
+            if now - seen > 60:
+                del state.clients[other]
+        active = len(state.clients)
+
+        grant = max(1, int(want))
+        if state.requests:
+            share = max(1, math.ceil(state.requests.capacity / active))
+            grant = min(grant, share, int(state.requests.level))
+        if state.tokens and tokens_per_request > 0:
+            grant = min(grant, int(state.tokens.level // tokens_per_request))
+        if state.daily_limit is not None:
+            grant = min(grant, state.daily_limit - state.daily_used)
+
+        if grant <= 0:
+            waits = [0.05]
+            if state.requests:
+                waits.append(state.requests.wait_time(1))
+            if state.tokens and tokens_per_request > 0:
+                waits.append(state.tokens.wait_time(tokens_per_request))
+            if state.daily_limit is not None and state.daily_used >= state.daily_limit:
+                midnight = datetime.combine(today + timedelta(days=1), datetime.min.time(), timezone.utc)
+                waits.append((midnight - datetime.now(timezone.utc)).total_seconds())
+            return {"requests": 0, "tokens": 0, "retry_after": max(waits)}
+
+        tokens = grant * tokens_per_request
+        if state.requests:
+            state.requests.level -= grant
+        if state.tokens:
+            state.tokens.level -= tokens
+        state.daily_used += grant
+        return {"requests": grant, "tokens": tokens, "ttl": self.lease_ttl}
+
+    def throttled(self, key: str) -> None:
+        """O provider respondeu 429: esvazia o bucket para o cluster inteiro recuar."""
+        state = self.keys.get(key)
+        if state is not None and state.requests:
+            state.requests.level = min(state.requests.level, 0.0)
+            logger.info(f"429 reportado para '{key}' — bucket esvaziado")
+
+
+class _Lease:
+    __slots__ = ("requests", "tokens", "expires", "unlimited")
+
+    def __init__(self):
+        self.requests = 0
+        self.tokens = 0.0
+        self.expires = 0.0
+        self.unlimited = False
+
+
+class QuotaClient:
+    """
+    Lado do nó: consome o lease local e pede um novo ao coordenador quando
+    ele acaba ou expira. Usado por SynRuntime.quota antes de cada tentativa.
+    """
+
+    def __init__(self, node: MeshNode, coordinator: Union[str, QuotaCoordinator], max_wait: float = 30.0,
+                 timeout: float = 2.0):
+        self.node = node
+        self.coordinator = coordinator
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.leases: Dict[str, _Lease] = {}
+        self._waiting: Dict[str, int] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._warned = 0.0
+
+    async def _request_lease(self, key: str, lease: _Lease, want: int, tokens: float) -> Dict[str, Any]:
+        release = None
+        if lease.requests or lease.tokens:
+            release = {"requests": lease.requests, "tokens": lease.tokens}
+            lease.requests, lease.tokens = 0, 0.0
+        if isinstance(self.coordinator, QuotaCoordinator):
+            return self.coordinator.lease(self.node.node_id, key, want, tokens, release)
+        response = await self.node.send(self.coordinator, QUOTA_LEASE, {
+            "key": key, "want": want, "tokens_per_request": tokens, "release": release,
+        }, timeout=self.timeout)
+        if response.get("status") != "success":
+            raise MeshTransportError(response.get("reason") or "lease recusado")
+        return response["data"]
+
+    async def acquire(self, key: str, tokens: float = 0, max_wait: Optional[float] = None) -> bool:
+        """
+        Reserva uma requisição (e 'tokens' tokens) da chave. Espera por um
+        lease até max_wait segundos; False = sem cota nesse prazo (pular o candidato).
+        """
+        lease = self.leases.get(key)
+        now = time.monotonic()
+        if lease is not None and (lease.unlimited or
+                                  (lease.requests >= 1 and lease.tokens >= tokens and lease.expires > now)):
+            if not lease.unlimited:
+                lease.requests -= 1
+                lease.tokens -= tokens
+            return True
+
+        deadline = now + (self.max_wait if max_wait is None else max_wait)
+        lease = self.leases.setdefault(key, _Lease())
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._waiting[key] = self._waiting.get(key, 0) + 1
+        try:
+            while True:
+                async with lock:
+                    now = time.monotonic()
+                    if lease.unlimited or (lease.requests >= 1 and lease.tokens >= tokens and lease.expires > now):
+                        if not lease.unlimited:
+                            lease.requests -= 1
+                            lease.tokens -= tokens
+                        return True
+                    try:
+                        grant = await self._request_lease(key, lease, self._waiting[key], tokens)
+                    except (MeshTransportError, asyncio.TimeoutError, KeyError) as e:
+                        if now - self._warned > 60:
+                            self._warned = now
+                            logger.warning(f"Coordenador de quotas indisponível ({e}) — seguindo sem limite")
+                        return True
+                    if grant.get("unlimited"):
+                        lease.unlimited = True
+                        return True
+                    if grant["requests"] > 0:
+                        lease.requests = grant["requests"] - 1
+                        lease.tokens = grant["tokens"] - tokens
+                        lease.expires = now + grant["ttl"]
+                        return True
+                    retry_after = grant.get("retry_after", 0.05)
+                if now + retry_after > deadline:
+                    return False
+                await asyncio.sleep(retry_after)
+        finally:
+            self._waiting[key] -= 1
+
+    def record(self, key: str, reserved: float, used: float) -> None:
+        """Ajusta o lease com os tokens reais de uma geração (reservou 'reserved', usou 'used')."""
+        lease = self.leases.get(key)
+        if lease is not None and not lease.unlimited:
+            lease.tokens += reserved - used
+
+    async def throttled(self, key: str) -> None:
+        """Repassa um 429 do provider ao coordenador e descarta o lease local."""
+        lease = self.leases.get(key)
+        if lease is not None and not lease.unlimited:
+            lease.requests, lease.tokens = 0, 0.0
+        if isinstance(self.coordinator, QuotaCoordinator):
+            self.coordinator.throttled(key)
+            return
+        try:
+            await self.node.send(self.coordinator, QUOTA_THROTTLED, {"key": key}, timeout=self.timeout)
+        except (MeshTransportError, asyncio.TimeoutError, KeyError):
+            pass
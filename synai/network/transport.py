@@ -0,0 +1,386 @@
+"""
+SynAI Mesh — Transporte asyncio
+===============================
+
+Mensagens entre nós trafegam em conexões TCP persistentes com framing
+binário prefixado pelo tamanho:
+
+    +----------------+---------+-------------------------+
+    | tamanho (u32)  | codec   | corpo (JSON | MessagePack) |
+    +----------------+---------+-------------------------+
+
+Cada frame é um envelope {"id", "kind", "sender", "payload"}. Requisições
+levam um id de correlação; a resposta volta com o mesmo id, então várias
+requisições podem estar em voo na mesma conexão e as respostas chegam fora
+de ordem sem problema.
+
+MessagePack é opcional (pip install msgpack): o receptor decodifica pelo byte
+de codec de cada frame, e as respostas usam o codec da requisição.
+
+Toda conexão começa com um handshake desafio/resposta sobre o segredo
+compartilhado da malha (parâmetro secret ou SYNAI_MESH_SECRET):
+
+    servidor → {"kind": "challenge", "nonce": Ns}
+    cliente  → {"kind": "auth", "nonce": Nc, "mac": HMAC(segredo, "client|Ns|Nc")}
+    servidor → {"kind": "welcome", "mac": HMAC(segredo, "server|Nc|Ns")}
+
+O servidor só despacha requisições depois de validar o "auth", e o cliente só
+envia requisições depois de validar o "welcome" — os dois lados provam que
+conhecem o segredo. Sem segredo o servidor só aceita escutar em loopback.
+"""
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import itertools
+import json
+import logging
+import os
+import secrets
+import struct
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:  # opcional
+    msgpack = None
+
+logger = logging.getLogger("SynAI.Mesh.Transport")
+
+HEADER = struct.Struct("!IB")
+CODEC_JSON = 0
+CODEC_MSGPACK = 1
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+AUTH_TIMEOUT = 5.0
+SECRET_ENV = "SYNAI_MESH_SECRET"
+
+# handler(sender_id, payload, origin) — origin é o IP de onde veio a conexão
+RequestHandler = Callable[[str, Dict[str, Any], Optional[str]], Awaitable[Dict[str, Any]]]
+
+
+class MeshTransportError(ConnectionError):
+    """Falha de transporte com um peer (conexão perdida, frame inválido)."""
+
+
+def resolve_codec(codec: str) -> int:
+    """'json' | 'msgpack' | 'auto' (msgpack se instalado) → byte de codec."""
+    if codec == "msgpack" or (codec == "auto" and msgpack is not None):
+        if msgpack is None:
+            raise ValueError("codec 'msgpack' requer o pacote msgpack (pip install msgpack)")
+        return CODEC_MSGPACK
+    if codec in ("json", "auto"):
+        return CODEC_JSON
+    raise ValueError(f"codec desconhecido: {codec}")
+
+
+def mesh_secret(secret: Optional[str] = None) -> Optional[str]:
+    """Segredo compartilhado da malha: o informado ou o de SYNAI_MESH_SECRET (None se nenhum)."""
+    return secret or os.environ.get(SECRET_ENV) or None
+
+
+def sign(secret: Optional[str], *parts: Any) -> str:
+    """HMAC-SHA256 (hex) das partes unidas por '|', com o segredo da malha como chave."""
+    message = "|".join(str(part) for part in parts).encode("utf-8")
+    return hmac.new((secret or "").encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def verify(secret: Optional[str], mac: Any, *parts: Any) -> bool:
+    return isinstance(mac, str) and hmac.compare_digest(mac, sign(secret, *parts))
+
+
+def is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def encode_frame(message: Dict[str, Any], codec: int = CODEC_JSON) -> bytes:
+    if codec == CODEC_MSGPACK:
+        body = msgpack.packb(message, use_bin_type=True, default=str)
+    else:
+        body = json.dumps(message, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+    if len(body) > MAX_FRAME_BYTES:
+        raise ValueError(f"frame de {len(body)} bytes excede o limite de {MAX_FRAME_BYTES}")
+    return HEADER.pack(len(body), codec) + body
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[Tuple[Dict[str, Any], int]]:
+    """Lê um frame; None se a conexão foi fechada de forma limpa."""
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise MeshTransportError("conexão encerrada no meio de um frame")
+        return None
+    length, codec = HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise MeshTransportError(f"frame de {length} bytes excede o limite")
+    body = await reader.readexactly(length)
+    if codec == CODEC_MSGPACK:
+        if msgpack is None:
+            raise MeshTransportError("frame MessagePack recebido, mas msgpack não está instalado")
+        return msgpack.unpackb(body, raw=False), codec
+    if codec == CODEC_JSON:
+        return json.loads(body), codec
+    raise MeshTransportError(f"codec desconhecido: {codec}")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Servidor
+# ─────────────────────────────────────────────────────────────────────────────
+class MeshServer:
+    """
+    Aceita conexões de peers e despacha cada requisição para 'handler'
+    (tipicamente MeshNode.process_payload) em uma task própria.
+    Conexões que não completam o handshake com o segredo são fechadas.
+    """
+
+    def __init__(self, node_id: str, handler: RequestHandler, host: str = "127.0.0.1", port: int = 8000,
+                 secret: Optional[str] = None):
+        self.node_id = node_id
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.secret = mesh_secret(secret)
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._connections: set = set()
+
+    async def start(self) -> None:
+        if self.secret is None and not is_loopback(self.host):
+            raise ValueError(f"a malha só escuta em {self.host} com um segredo compartilhado "
+                             f"(secret ou {SECRET_ENV})")
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"[{self.node_id}] Mesh escutando em {self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _authenticate(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        nonce = secrets.token_hex(16)
+        writer.write(encode_frame({"kind": "challenge", "sender": self.node_id, "nonce": nonce}))
+        await writer.drain()
+        item = await asyncio.wait_for(read_frame(reader), AUTH_TIMEOUT)
+        message = item[0] if item is not None else {}
+        client_nonce = message.get("nonce")
+        if message.get("kind") != "auth" or not isinstance(client_nonce, str) \
+                or not verify(self.secret, message.get("mac"), "client", nonce, client_nonce):
+            return False
+        writer.write(encode_frame({"kind": "welcome", "sender": self.node_id,
+                                   "mac": sign(self.secret, "server", client_nonce, nonce)}))
+        await writer.drain()
+        return True
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections.add(writer)
+        peername = writer.get_extra_info("peername")
+        origin = peername[0] if peername else None
+        try:
+            authenticated = await self._authenticate(reader, writer)
+        except Exception:
+            authenticated = False
+        if not authenticated:
+            logger.warning(f"[{self.node_id}] Conexão de {origin} recusada: handshake da malha falhou")
+            self._connections.discard(writer)
+            writer.close()
+            return
+        write_lock = asyncio.Lock()
+        tasks: set = set()
+
+        async def _respond(message: Dict[str, Any], codec: int) -> None:
+            sender = str(message.get("sender", "?"))
+            try:
+                result = await self.handler(sender, message.get("payload") or {}, origin)
+            except Exception as e:
+                logger.error(f"[{self.node_id}] Erro ao processar requisição de {sender}: {e}")
+                result = {"status": "error", "reason": f"{type(e).__name__}: {e}"}
+            frame = encode_frame({"id": message.get("id"), "kind": "response",
+                                  "sender": self.node_id, "payload": result}, codec)
+            async with write_lock:
+                writer.write(frame)
+                await writer.drain()
+
+        try:
+            while True:
+                item = await read_frame(reader)
+                if item is None:
+                    break
+                message, codec = item
+                if message.get("kind") != "request":
+                    continue
+                task = asyncio.create_task(_respond(message, codec))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        except Exception as e:
+            logger.warning(f"[{self.node_id}] Conexão de peer encerrada: {type(e).__name__}: {e}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._connections.discard(writer)
+            writer.close()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Cliente
+# ─────────────────────────────────────────────────────────────────────────────
+class PeerConnection:
+    """Conexão persistente e multiplexada com um peer."""
+
+    def __init__(self, node_id: str, host: str, port: int, codec: int = CODEC_JSON,
+                 connect_timeout: float = 5.0, secret: Optional[str] = None):
+        self.node_id = node_id
+        self.host = host
+        self.port = port
+        self.codec = codec
+        self.connect_timeout = connect_timeout
+        self.secret = mesh_secret(secret)
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._connect_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def _ensure_connected(self) -> None:
+        if self.connected:
+            return
+        async with self._connect_lock:
+            if self.connected:
+                return
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.connect_timeout
+                )
+            except (OSError, asyncio.TimeoutError) as e:
+                raise MeshTransportError(f"não foi possível conectar a {self.host}:{self.port}: {e}") from e
+            try:
+                await asyncio.wait_for(self._authenticate(reader, writer), self.connect_timeout)
+            except (OSError, ValueError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                writer.close()
+                raise MeshTransportError(f"handshake com {self.host}:{self.port} falhou: {e}") from e
+            self._reader, self._writer = reader, writer
+            self._reader_task = asyncio.create_task(self._read_loop(self._reader))
+
+    async def _authenticate(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        item = await read_frame(reader)
+        challenge = item[0] if item is not None else {}
+        server_nonce = challenge.get("nonce")
+        if challenge.get("kind") != "challenge" or not isinstance(server_nonce, str):
+            raise MeshTransportError("o peer não enviou o desafio da malha")
+        nonce = secrets.token_hex(16)
+        writer.write(encode_frame({"kind": "auth", "sender": self.node_id, "nonce": nonce,
+                                   "mac": sign(self.secret, "client", server_nonce, nonce)}))
+        await writer.drain()
+        item = await read_frame(reader)
+        welcome = item[0] if item is not None else {}
+        if welcome.get("kind") != "welcome" or not verify(self.secret, welcome.get("mac"), "server", nonce, server_nonce):
+            raise MeshTransportError("o peer recusou o segredo da malha (ou não o conhece)")
+
+    async def _read_loop(self, reader: asyncio.StreamReader) -> None:
+        error: Exception = MeshTransportError(f"conexão com {self.host}:{self.port} encerrada")
+        try:
+            while True:
+                item = await read_frame(reader)
+                if item is None:
+                    break
+                message, _ = item
+                future = self._pending.pop(message.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(message.get("payload") or {})
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            error = MeshTransportError(f"erro lendo de {self.host}:{self.port}: {e}")
+        finally:
+            self._fail_pending(error)
+            if self._writer is not None:
+                self._writer.close()
+            self._writer = None
+
+    def _fail_pending(self, error: Exception) -> None:
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def request(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Envia uma requisição e aguarda a resposta correlacionada."""
+        await self._ensure_connected()
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        frame = encode_frame({"id": request_id, "kind": "request",
+                              "sender": self.node_id, "payload": payload}, self.codec)
+        try:
+            async with self._write_lock:
+                self._writer.write(frame)
+                await self._writer.drain()
+            return await asyncio.wait_for(future, timeout)
+        except MeshTransportError:
+            raise
+        except (ConnectionError, AttributeError) as e:
+            raise MeshTransportError(f"falha ao enviar para {self.host}:{self.port}: {e}") from e
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def aclose(self) -> None:
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class ConnectionPool:
+    """Uma PeerConnection persistente por endereço (host, port), criada sob demanda."""
+
+    def __init__(self, node_id: str, codec: str = "json", connect_timeout: float = 5.0,
+                 secret: Optional[str] = None):
+        self.node_id = node_id
+        self.codec = resolve_codec(codec)
+        self.connect_timeout = connect_timeout
+        self.secret = mesh_secret(secret)
+        self._connections: Dict[Tuple[str, int], PeerConnection] = {}
+
+    def get(self, host: str, port: int) -> PeerConnection:
+        key = (host, port)
+        conn = self._connections.get(key)
+        if conn is None:
+            conn = self._connections[key] = PeerConnection(
+                self.node_id, host, port, self.codec, self.connect_timeout, self.secret
+            )
+        return conn
+
+    async def request(self, host: str, port: int, payload: Dict[str, Any],
+                      timeout: Optional[float] = None) -> Dict[str, Any]:
+        return await self.get(host, port).request(payload, timeout)
+
+    async def discard(self, host: str, port: int) -> None:
+        conn = self._connections.pop((host, port), None)
+        if conn is not None:
+            await conn.aclose()
+
+    async def aclose(self) -> None:
+        connections, self._connections = self._connections, {}
+        for conn in connections.values():
+            await conn.aclose()
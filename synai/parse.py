@@ -17,10 +17,13 @@ property: ID ":" prop_value
 prop_value: STRING | array
 workflow_block: "workflow" STRING "{" statements "}"
 statements: workflow_stmt+
-workflow_stmt: start_stmt | step_stmt | connect_stmt | end_stmt
+workflow_stmt: start_stmt | step_stmt | connect_stmt | end_stmt | parallel_stmt | map_stmt
 start_stmt: "start:" intent_stmt
 step_stmt: "step:" intent_stmt
 end_stmt: "end:" intent_stmt
+parallel_stmt: "parallel" "{" statements "}"
+map_stmt: "map:" intent_stmt ("{" map_opt* "}")?
+map_opt: "max_concurrency:" INT
 intent_stmt: agent_id "." "intent" "(" arg_list ")"
 arg_list: intent_name ("," input_arg)? ("," output_arg)?
 intent_name: STRING
@@ -138,6 +141,22 @@ class SynTransformer(Transformer):
     def step_stmt(self, c): return self.transform_children(c)[0]
     def end_stmt(self, c): return self.transform_children(c)[0]
 
+    def parallel_stmt(self, c):
+        n = self.transform_children(c)
+        return {'type': 'Parallel', 'id': str(uuid.uuid4()), 'branches': n[0]}
+
+    def map_stmt(self, c):
+        n = self.transform_children(c)
+        stmt = {**n[0], 'type': 'Map', 'max_concurrency': None}
+        for opt in n[1:]:
+            if isinstance(opt, dict):
+                stmt.update(opt)
+        return stmt
+
+    def map_opt(self, c):
+        n = self.transform_children(c)
+        return {'max_concurrency': n[0]}
+
     def intent_stmt(self, c):
         n = self.transform_children(c)
         agent = n[0]
@@ -179,7 +198,7 @@ class SynTransformer(Transformer):
 
     def async_opt(self, c):
         n = self.transform_children(c)
-        return {'async': n[0] == 'true'}  # Convert string to bool
+        return {'async': bool(n[0])}  # BOOL já chega convertido
 
     def timeout_opt(self, c):
         n = self.transform_children(c)
@@ -0,0 +1,256 @@
+"""
+SynAI — Profiler de Workflows
+=============================
+
+Registra spans de tempo para cada intent, cada tentativa de provider dentro
+de call_model/_call_profile, cada ferramenta e cada connect, e exporta em
+formato Chrome Trace (abre em chrome://tracing ou ui.perfetto.dev), além de
+um resumo em texto do caminho crítico. Candidatos pulados no roteamento
+(sem chave, budget, quota, policy) e hits de cache entram como eventos
+instantâneos.
+
+O profiler ativo vive em um ContextVar: herdado por tasks asyncio criadas
+dentro do workflow e sem nenhum parâmetro extra a propagar. Quando nenhum
+profiler está ativo, span() devolve um context manager no-op compartilhado —
+o custo fica em uma leitura de ContextVar por ponto instrumentado.
+
+Uso:
+    result = await rt.execute_workflow(ast, run_decl, profile=True)
+    prof = result["profile"]
+    prof.write_chrome_trace("trace.json")
+    print(prof.summary())
+
+    synai run pipeline.synx --profile trace.json
+"""
+import asyncio
+import json
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+
+class _NoopSpan:
+    """Context manager vazio usado quando não há profiler ativo."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """Intervalo de tempo medido dentro de um Profiler."""
+
+    __slots__ = ("profiler", "name", "cat", "args", "start_ns", "end_ns", "parent", "lane", "index", "_token")
+
+    def __init__(self, profiler: "Profiler", name: str, cat: str, args: Dict[str, Any]):
+        self.profiler = profiler
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start_ns = 0
+        self.end_ns = 0
+        self.parent: Optional[int] = None
+        self.lane = 0
+        self.index = -1
+        self._token = None
+
+    def set(self, **args) -> None:
+        """Adiciona atributos ao span (ex: outcome, bytes)."""
+        self.args.update(args)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def __enter__(self) -> "Span":
+        prof = self.profiler
+        parent = _current_span.get()
+        self.parent = parent.index if parent is not None and parent.profiler is prof else None
+        self.lane = prof._lane()
+        self.index = len(prof.spans)
+        prof.spans.append(self)
+        self._token = _current_span.set(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.perf_counter_ns()
+        _current_span.reset(self._token)
+        if exc_type is not None and "outcome" not in self.args:
+            self.args["outcome"] = "cancelled" if exc_type is asyncio.CancelledError else "fail"
+            self.args["error"] = f"{exc_type.__name__}: {exc}"
+        return False
+
+
+_current_profiler: ContextVar[Optional["Profiler"]] = ContextVar("synai_profiler", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("synai_profiler_span", default=None)
+
+
+def current_profiler() -> Optional["Profiler"]:
+    """Retorna o profiler ativo no contexto atual (ou None)."""
+    return _current_profiler.get()
+
+
+def span(name: str, cat: str, **args):
+    """Abre um span no profiler ativo; no-op se não houver profiler."""
+    prof = _current_profiler.get()
+    if prof is None:
+        return NOOP_SPAN
+    return Span(prof, name, cat, args)
+
+
+def instant(name: str, cat: str, **args) -> None:
+    """Registra um evento instantâneo (ex: provider pulado) no profiler ativo."""
+    prof = _current_profiler.get()
+    if prof is not None:
+        prof.instants.append((time.perf_counter_ns(), prof._lane(), name, cat, args))
+
+
+class Profiler:
+    """Coletor de spans de um ou mais workflows."""
+
+    def __init__(self, name: str = "synai"):
+        self.name = name
+        self.spans: List[Span] = []
+        self.instants: List[tuple] = []
+        self.origin_ns = time.perf_counter_ns()
+        self._lanes: Dict[int, int] = {}
+
+    def _lane(self) -> int:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        key = id(task) if task is not None else 0
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = len(self._lanes) + 1
+        return lane
+
+    def activate(self):
+        """Torna este profiler o ativo no contexto atual. Retorna o token para deactivate()."""
+        return _current_profiler.set(self)
+
+    @staticmethod
+    def deactivate(token) -> None:
+        _current_profiler.reset(token)
+
+    # ── Exportação ───────────────────────────────────────────────────────────
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Converte os spans para o formato JSON do Chrome Trace / Perfetto."""
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = [
+            {"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": f"SynAI {self.name}"}},
+        ]
+        for lane in sorted(set(self._lanes.values())):
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": lane,
+                           "args": {"name": f"task-{lane}"}})
+        for s in self.spans:
+            end_ns = s.end_ns or time.perf_counter_ns()
+            events.append({
+                "name": s.name,
+                "cat": s.cat,
+                "ph": "X",
+                "ts": (s.start_ns - self.origin_ns) / 1000.0,
+                "dur": (end_ns - s.start_ns) / 1000.0,
+                "pid": pid,
+                "tid": s.lane,
+                "args": {k: v if isinstance(v, (str, int, float, bool)) or v is None else str(v)
+                         for k, v in s.args.items()},
+            })
+        for ts_ns, lane, name, cat, args in self.instants:
+            events.append({"name": name, "cat": cat, "ph": "i", "s": "t",
+                           "ts": (ts_ns - self.origin_ns) / 1000.0, "pid": pid, "tid": lane,
+                           "args": {k: str(v) for k, v in args.items()}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False)
+
+    # ── Caminho crítico ──────────────────────────────────────────────────────
+    def _children(self) -> Dict[Optional[int], List[Span]]:
+        children: Dict[Optional[int], List[Span]] = {}
+        for s in self.spans:
+            if s.end_ns:
+                children.setdefault(s.parent, []).append(s)
+        return children
+
+    @staticmethod
+    def _critical_chain(spans: List[Span], end_ns: int) -> List[Span]:
+        """Percorre de trás para frente o encadeamento que termina mais tarde."""
+        chain: List[Span] = []
+        cursor = end_ns
+        candidates = sorted(spans, key=lambda s: s.end_ns, reverse=True)
+        for s in candidates:
+            if s.end_ns <= cursor:
+                chain.append(s)
+                cursor = s.start_ns
+        chain.reverse()
+        return chain
+
+    def critical_path(self) -> List[tuple]:
+        """Retorna [(profundidade, span)] ao longo do caminho crítico."""
+        children = self._children()
+        roots = children.get(None, [])
+        if not roots:
+            return []
+        path: List[tuple] = []
+
+        def _walk(span_: Span, depth: int) -> None:
+            path.append((depth, span_))
+            kids = children.get(span_.index, [])
+            for child in self._critical_chain(kids, span_.end_ns):
+                _walk(child, depth + 1)
+
+        for root in self._critical_chain(roots, max(r.end_ns for r in roots)):
+            _walk(root, 0)
+        return path
+
+    def summary(self) -> str:
+        """Resumo em texto: caminho crítico e tempo total por categoria."""
+        path = self.critical_path()
+        if not path:
+            return "Profiler: nenhum span registrado."
+        total_ns = sum(s.end_ns - s.start_ns for depth, s in path if depth == 0) or 1
+        children = self._children()
+        lines = [f"Caminho crítico ({total_ns / 1e6:.1f} ms):"]
+        for depth, s in path:
+            label = s.name
+            outcome = s.args.get("outcome")
+            if outcome:
+                label += f" [{outcome}]"
+            share = ""
+            if depth <= 1:
+                share = f"  ({100.0 * (s.end_ns - s.start_ns) / total_ns:5.1f}%)"
+            lines.append(f"  {'  ' * depth}{s.cat:<9} {label:<44} {s.duration_ms:9.2f} ms{share}")
+            kids = children.get(s.index, [])
+            if kids and s.cat in ("intent", "workflow"):
+                covered = sum(k.end_ns - k.start_ns for k in self._critical_chain(kids, s.end_ns))
+                own = (s.end_ns - s.start_ns - covered) / 1e6
+                lines.append(f"  {'  ' * (depth + 1)}{'self':<9} {'(roteamento / espera)':<44} {own:9.2f} ms")
+
+        totals: Dict[str, float] = {}
+        for s in self.spans:
+            if not s.end_ns:
+                continue
+            key = s.cat
+            if s.cat == "provider":
+                key = f"provider:{s.args.get('outcome', 'ok')}"
+            totals[key] = totals.get(key, 0.0) + s.duration_ms
+        lines.append("Tempo total por categoria (soma de todos os spans):")
+        for key, ms in sorted(totals.items(), key=lambda kv: -kv[1]):
+            lines.append(f"  {key:<18} {ms:10.2f} ms")
+        return "\n".join(lines)
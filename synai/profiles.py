@@ -5,6 +5,15 @@ MODEL_REGISTRY: mapeia nomes amigáveis para (provider_alias, api_slug).
     Permite usar "deepseek-coder" no DSL em vez de "deepseek-coder-v2-instruct".
     Modelos com sufixo -free usam o tier gratuito do OpenRouter (:free).
 
+MODEL_PRICING: preço de referência (USD por 1M tokens de entrada/saída) dos
+    modelos do registry. Usado na contabilidade de custo e nos budgets.
+
+CACHE_PRICING: multiplicadores do preço de entrada para tokens lidos do e
+    gravados no cache de prompt, por provider.
+
+MODEL_CONTEXT_WINDOWS: janela de contexto (tokens) dos modelos do registry.
+    Limita o histórico da memória de conversa dos agentes (synai.memory).
+
 MODEL_PROFILES: agrupa modelos por capacidade/objetivo.
     Usado quando o agente DSL define model: "best-coder" ou model: "auto".
     O SynAI tenta cada modelo na lista em ordem até obter resposta.
@@ -104,6 +113,115 @@ MODEL_REGISTRY: dict[str, Tuple[str, str]] = {
 }
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# MODEL PRICING — nome amigável → (USD / 1M tokens de entrada, USD / 1M de saída)
+# Valores de referência das tabelas públicas dos providers; ajuste conforme o
+# seu contrato (MODEL_PRICING["gpt-4o"] = (2.0, 8.0)). Modelos :free e locais
+# custam zero; slugs fora da tabela ficam sem preço (custo não contabilizado).
+# ─────────────────────────────────────────────────────────────────────────────
+MODEL_PRICING: dict[str, Tuple[float, float]] = {
+    "deepseek-chat":       (0.27,  1.10),
+    "deepseek-coder":      (0.27,  1.10),
+    "deepseek-reasoner":   (0.55,  2.19),
+
+    "qwen-72b":            (0.35,  0.40),
+    "qwen-coder":          (0.07,  0.16),
+    "qwen-reasoner":       (0.15,  0.20),
+    "codestral":           (0.30,  0.90),
+    "mistral-7b":          (0.03,  0.05),
+    "mistral-nemo":        (0.02,  0.04),
+    "llama-70b-or":        (0.13,  0.40),
+
+    "llama-70b":           (0.59,  0.79),
+    "llama-8b":            (0.05,  0.08),
+    "mixtral":             (0.24,  0.24),
+    "gemma2":              (0.20,  0.20),
+
+    "claude-sonnet":       (3.00, 15.00),
+    "claude-haiku":        (0.80,  4.00),
+    "claude-opus":         (5.00, 25.00),
+
+    "gpt-4o":              (2.50, 10.00),
+    "gpt-4o-mini":         (0.15,  0.60),
+    "gpt-5":               (1.25, 10.00),
+    "gpt-5-mini":          (0.25,  2.00),
+
+    "gemini-flash":        (0.10,  0.40),
+    "gemini-pro":          (1.25, 10.00),
+    "gemini-flash-2.5":    (0.30,  2.50),
+
+    "grok-3":              (3.00, 15.00),
+    "grok-mini":           (0.30,  0.50),
+    "grok-2":              (2.00, 10.00),
+}
+
+ZERO_COST_PROVIDERS = {"ollama"}
+
+# Cache de prompt — provider → (multiplicador de leitura, de gravação) sobre o
+# preço de entrada. Providers fora da tabela (ex: openrouter, cujo preço depende
+# do upstream) cobram tokens de cache como entrada comum.
+CACHE_PRICING: dict[str, Tuple[float, float]] = {
+    "anthropic": (0.10, 1.25),
+    "openai":    (0.50, 1.00),
+    "deepseek":  (0.26, 1.00),
+    "google":    (0.25, 1.00),
+    "grok":      (0.25, 1.00),
+    "groq":      (0.50, 1.00),
+}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# MODEL CONTEXT WINDOWS — nome amigável → janela de contexto (tokens)
+# Modelos locais usam o num_ctx padrão do Ollama, não o máximo do modelo: o
+# que passa disso é truncado em silêncio pelo servidor.
+# ─────────────────────────────────────────────────────────────────────────────
+MODEL_CONTEXT_WINDOWS: dict[str, int] = {
+    "deepseek-chat":       64_000,
+    "deepseek-coder":      64_000,
+    "deepseek-reasoner":   64_000,
+
+    "qwen-72b":            32_768,
+    "qwen-coder":          32_768,
+    "qwen-reasoner":       32_768,
+    "codestral":          256_000,
+    "mistral-7b":          32_768,
+    "mistral-nemo":       128_000,
+    "llama-70b-or":       128_000,
+
+    "llama-70b":          128_000,
+    "llama-8b":           128_000,
+    "mixtral":             32_768,
+    "gemma2":               8_192,
+
+    "claude-sonnet":      200_000,
+    "claude-haiku":       200_000,
+    "claude-opus":        200_000,
+
+    "gpt-4o":             128_000,
+    "gpt-4o-mini":        128_000,
+    "gpt-5":              400_000,
+    "gpt-5-mini":         400_000,
+
+    "gemini-flash":     1_048_576,
+    "gemini-pro":       1_048_576,
+    "gemini-flash-2.5": 1_048_576,
+
+    "grok-3":             131_072,
+    "grok-mini":          131_072,
+    "grok-2":             131_072,
+
+    "llama3-local":         4_096,
+    "codellama-local":      4_096,
+    "mistral-local":        4_096,
+    "phi3-local":           4_096,
+    "qwen2-local":          4_096,
+    "deepseek-local":       4_096,
+}
+
+DEFAULT_CONTEXT_WINDOW = 8_192
+"""Janela assumida para modelos fora da tabela (free tier, slugs diretos)."""
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # MODEL PROFILES — perfis semânticos com fallback em cascata
 # ─────────────────────────────────────────────────────────────────────────────
@@ -251,3 +369,44 @@ def get_profile_models(profile: str) -> list[str]:
     Retorna lista com o próprio nome se não for um perfil.
     """
     return MODEL_PROFILES.get(profile, [profile])
+
+
+def get_context_window(model: str) -> int:
+    """
+    Janela de contexto (tokens) de um modelo, nome amigável ou slug real.
+    Para um perfil, a menor janela entre seus modelos — o histórico precisa
+    caber em qualquer um que o fallback escolher.
+    """
+    if is_profile(model):
+        return min(get_context_window(name) for name in get_profile_models(model))
+    if model in MODEL_CONTEXT_WINDOWS:
+        return MODEL_CONTEXT_WINDOWS[model]
+    for name, (_, slug) in MODEL_REGISTRY.items():
+        if slug == model and name in MODEL_CONTEXT_WINDOWS:
+            return MODEL_CONTEXT_WINDOWS[name]
+    return DEFAULT_CONTEXT_WINDOW
+
+
+def get_cache_pricing(provider: str) -> Tuple[float, float]:
+    """(multiplicador de leitura, de gravação) do cache de prompt de 'provider'; (1.0, 1.0) se desconhecido."""
+    return CACHE_PRICING.get(provider, (1.0, 1.0))
+
+
+def get_model_price(provider: str, slug: str) -> Optional[Tuple[float, float]]:
+    """
+    Preço (USD / 1M tokens de entrada, de saída) de um (provider, slug).
+
+    Aceita tanto o slug real da API quanto o nome amigável. Modelos locais e
+    do free tier custam (0.0, 0.0).
+
+    Returns:
+        Tuple de preços, ou None se o modelo não tem preço conhecido.
+    """
+    if provider in ZERO_COST_PROVIDERS or slug.endswith(":free") or slug == "openrouter/free":
+        return (0.0, 0.0)
+    if slug in MODEL_PRICING:
+        return MODEL_PRICING[slug]
+    for name, entry in MODEL_REGISTRY.items():
+        if entry == (provider, slug) and name in MODEL_PRICING:
+            return MODEL_PRICING[name]
+    return None
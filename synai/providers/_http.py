@@ -0,0 +1,75 @@
+"""
+SynAI — Cliente HTTP compartilhado pelos drivers httpx.
+
+Cada driver mantém um único httpx.AsyncClient por event loop, reaproveitando
+conexões (keep-alive / TLS) entre chamadas em vez de abrir um cliente novo
+a cada requisição. Se o loop mudar (ex: vários asyncio.run), o cliente é
+recriado automaticamente.
+
+Com um tracer ativo (synai.tracing), cada requisição vira um span CLIENT
+filho da tentativa de roteamento e leva o header W3C 'traceparent'.
+"""
+import asyncio
+from typing import Optional
+
+import httpx
+
+from ..tracing import SPAN_KIND_CLIENT, STATUS_ERROR, current_tracer, current_traceparent, trace_span
+
+
+class TracingTransport(httpx.AsyncBaseTransport):
+    """Transporte httpx que abre um span por requisição quando há tracer ativo."""
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if current_tracer() is None:
+            return await self._transport.handle_async_request(request)
+        url = request.url
+        with trace_span(f"HTTP {request.method}", SPAN_KIND_CLIENT, **{
+            "http.request.method": request.method,
+            "url.full": str(url.copy_with(query=None)),
+            "server.address": url.host,
+            "server.port": url.port,
+        }) as span:
+            request.headers["traceparent"] = current_traceparent()
+            response = await self._transport.handle_async_request(request)
+            span.set(**{"http.response.status_code": response.status_code})
+            if response.status_code >= 400:
+                span.set_status(STATUS_ERROR, f"HTTP {response.status_code}")
+            return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class SharedAsyncClient:
+    """httpx.AsyncClient preguiçoso, vinculado ao event loop em execução."""
+
+    def __init__(self, timeout: float = 90.0, **client_kwargs):
+        self.timeout = timeout
+        self.client_kwargs = client_kwargs
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get(self) -> httpx.AsyncClient:
+        """Retorna o cliente do loop atual, criando-o se necessário."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout, transport=TracingTransport(), **self.client_kwargs
+            )
+            self._loop = loop
+        return self._client
+
+    async def aclose(self) -> None:
+        """Fecha o cliente se ele pertence ao loop atual."""
+        client, self._client = self._client, None
+        if client is not None and not client.is_closed:
+            try:
+                if self._loop is asyncio.get_running_loop():
+                    await client.aclose()
+            except RuntimeError:
+                pass
+        self._loop = None
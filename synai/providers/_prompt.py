@@ -0,0 +1,33 @@
+"""
+SynAI — Layout de prompt com prefixo estável (cache de prompt dos providers).
+
+O 'system' de um agente (instruções + contexto estável declarados no DSL) vai
+sempre primeiro e idêntico entre chamadas, separado da parte variável. É o
+que os providers com cache de prefixo (OpenAI, DeepSeek, Anthropic via
+cache_control) precisam para reaproveitar tokens já processados.
+"""
+from typing import Any, Dict, List, Optional
+
+
+def chat_messages(prompt: str, system: Optional[str] = None) -> List[Dict[str, str]]:
+    """Mensagens de chat: system estável (se houver) antes da parte variável."""
+    if system:
+        return [{"role": "system", "content": system}, {"role": "user", "content": prompt}]
+    return [{"role": "user", "content": prompt}]
+
+
+def cached_prompt_tokens(usage: Any) -> int:
+    """
+    Tokens do prompt servidos do cache, no formato OpenAI-compatível
+    (prompt_tokens_details.cached_tokens) ou DeepSeek (prompt_cache_hit_tokens).
+    Aceita o dict do JSON ou o objeto de usage dos SDKs.
+    """
+    if usage is None:
+        return 0
+    get = usage.get if isinstance(usage, dict) else lambda name, default=None: getattr(usage, name, default)
+    details = get("prompt_tokens_details")
+    if details:
+        cached = details.get("cached_tokens") if isinstance(details, dict) else getattr(details, "cached_tokens", 0)
+        if cached:
+            return cached
+    return get("prompt_cache_hit_tokens", 0) or 0
@@ -1,21 +1,26 @@
 """
 SynAI Driver — Anthropic Claude
 Acesso direto à API do Anthropic usando httpx para evitar dependências extras.
-Env: ANTHROPIC_API_KEY
+Env: ANTHROPIC_API_KEY, ANTHROPIC_BASE_URL (opcional)
 """
 import os
-import httpx
 from typing import Optional
 
+from ..interfaces import GenerationResult, Usage
+from ._http import SharedAsyncClient
+
 
 class AnthropicDriver:
     """Driver para Anthropic Claude API — httpx-based."""
 
     provider_name = "anthropic"
+    BASE_URL = "https://api.anthropic.com/v1"
     DEFAULT_MODEL = "claude-haiku-3-5"
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
         self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY", "")
+        self.base_url = (base_url or os.getenv("ANTHROPIC_BASE_URL", self.BASE_URL)).rstrip("/")
+        self._http = SharedAsyncClient(timeout=90.0)
 
     def is_available(self) -> bool:
         """Retorna True se a API key da Anthropic está configurada."""
@@ -34,10 +39,15 @@ class AnthropicDriver:
         model: str = DEFAULT_MODEL,
         max_tokens: int = 1024,
         temperature: float = 0.7,
+        system: Optional[str] = None,
         **kwargs,
     ) -> str:
-        """Gera resposta usando a API do Anthropic."""
-        url = "https://api.anthropic.com/v1/messages"
+        """
+        Gera resposta usando a API do Anthropic. O 'system' vai como bloco
+        separado com cache_control: leituras seguintes do mesmo prefixo saem
+        do cache (cache_read_input_tokens).
+        """
+        url = f"{self.base_url}/messages"
         
         payload = {
             "model": model,
@@ -45,16 +55,32 @@ class AnthropicDriver:
             "max_tokens": max_tokens,
             "temperature": temperature
         }
+        if system:
+            payload["system"] = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+        
+        client = self._http.get()
+        resp = await client.post(url, headers=self._headers(), json=payload)
+        resp.raise_for_status()
+        data = resp.json()
         
-        async with httpx.AsyncClient(timeout=90.0) as client:
-            resp = await client.post(url, headers=self._headers(), json=payload)
-            resp.raise_for_status()
-            data = resp.json()
-            
-            try:
-                return data["content"][0]["text"] or ""
-            except (KeyError, IndexError) as e:
-                raise RuntimeError(f"Unexpected response format from Anthropic: {data}. Error: {e}")
+        try:
+            text = data["content"][0]["text"] or ""
+        except (KeyError, IndexError) as e:
+            raise RuntimeError(f"Unexpected response format from Anthropic: {data}. Error: {e}")
+        usage = data.get("usage") or {}
+        # input_tokens exclui o que foi lido/gravado no cache; o total do prompt soma os três
+        cached = usage.get("cache_read_input_tokens") or 0
+        written = usage.get("cache_creation_input_tokens") or 0
+        return GenerationResult(text, Usage(
+            prompt_tokens=usage.get("input_tokens", 0) + cached + written,
+            completion_tokens=usage.get("output_tokens", 0),
+            cached_tokens=cached,
+            cache_write_tokens=written,
+        ))
+
+    async def aclose(self) -> None:
+        """Fecha o pool de conexões HTTP do driver."""
+        await self._http.aclose()
 
     async def get_embedding(self, text: str) -> Optional[list[float]]:
         """Anthropic não possui API de embeddings."""
@@ -1,21 +1,26 @@
 """
 SynAI Driver — Google Gemini
 Acesso direto à API do Gemini (v1beta) usando httpx para evitar dependências extras.
-Env: GOOGLE_API_KEY
+Env: GOOGLE_API_KEY, GOOGLE_BASE_URL (opcional)
 """
 import os
-import httpx
 from typing import Optional
 
+from ..interfaces import GenerationResult, Usage
+from ._http import SharedAsyncClient
+
 
 class GoogleDriver:
     """Driver para Google Gemini API — httpx-based."""
 
     provider_name = "google"
+    BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
     DEFAULT_MODEL = "gemini-2.5-flash"
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
         self.api_key = api_key or os.getenv("GOOGLE_API_KEY", "")
+        self.base_url = (base_url or os.getenv("GOOGLE_BASE_URL", self.BASE_URL)).rstrip("/")
+        self._http = SharedAsyncClient(timeout=90.0)
 
     def is_available(self) -> bool:
         """Retorna True se a API key do Google está configurada."""
@@ -27,10 +32,11 @@ class GoogleDriver:
         model: str = DEFAULT_MODEL,
         max_tokens: int = 1024,
         temperature: float = 0.7,
+        system: Optional[str] = None,
         **kwargs,
     ) -> str:
-        """Gera resposta usando a API do Gemini."""
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={self.api_key}"
+        """Gera resposta usando a API do Gemini ('system' vai em systemInstruction)."""
+        url = f"{self.base_url}/models/{model}:generateContent?key={self.api_key}"
         
         payload = {
             "contents": [{
@@ -41,24 +47,33 @@ class GoogleDriver:
                 "temperature": temperature
             }
         }
+        if system:
+            payload["systemInstruction"] = {"parts": [{"text": system}]}
+        
+        client = self._http.get()
+        resp = await client.post(url, json=payload)
+        resp.raise_for_status()
+        data = resp.json()
         
-        async with httpx.AsyncClient(timeout=90.0) as client:
-            resp = await client.post(url, json=payload)
-            resp.raise_for_status()
-            data = resp.json()
-            
-            if "candidates" in data and len(data["candidates"]) > 0:
-                content = data["candidates"][0].get("content", {})
-                parts = content.get("parts", [])
-                if len(parts) > 0:
-                    return parts[0].get("text", "")
-                return ""
-            
-            raise RuntimeError(f"Unexpected response format from Gemini: {data}")
+        if "candidates" in data and len(data["candidates"]) > 0:
+            content = data["candidates"][0].get("content", {})
+            parts = content.get("parts", [])
+            usage = data.get("usageMetadata") or {}
+            return GenerationResult(parts[0].get("text", "") if parts else "", Usage(
+                prompt_tokens=usage.get("promptTokenCount", 0),
+                completion_tokens=usage.get("candidatesTokenCount", 0),
+                cached_tokens=usage.get("cachedContentTokenCount", 0),
+            ))
+        
+        raise RuntimeError(f"Unexpected response format from Gemini: {data}")
+
+    async def aclose(self) -> None:
+        """Fecha o pool de conexões HTTP do driver."""
+        await self._http.aclose()
 
     async def get_embedding(self, text: str) -> Optional[list[float]]:
         """Gera embeddings usando o modelo de embedding padrão do Google."""
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/text-embedding-004:embedContent?key={self.api_key}"
+        url = f"{self.base_url}/models/text-embedding-004:embedContent?key={self.api_key}"
         
         payload = {
             "content": {
@@ -66,11 +81,11 @@ class GoogleDriver:
             }
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            resp = await client.post(url, json=payload)
-            resp.raise_for_status()
-            data = resp.json()
-            try:
-                return data["embedding"]["values"]
-            except KeyError:
-                return None
+        client = self._http.get()
+        resp = await client.post(url, json=payload, timeout=30.0)
+        resp.raise_for_status()
+        data = resp.json()
+        try:
+            return data["embedding"]["values"]
+        except KeyError:
+            return None
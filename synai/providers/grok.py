@@ -8,6 +8,9 @@ import os
 from typing import Optional
 from openai import AsyncOpenAI
 
+from ..interfaces import GenerationResult, Usage
+from ._prompt import cached_prompt_tokens, chat_messages
+
 
 class GrokDriver:
     """Driver para xAI Grok (API compatível com OpenAI)."""
@@ -44,18 +47,30 @@ class GrokDriver:
         model: str = DEFAULT_MODEL,
         max_tokens: int = 1024,
         temperature: float = 0.7,
+        system: Optional[str] = None,
         **kwargs,
     ) -> str:
         """Gera resposta via xAI Grok."""
         client = self._get_client()
         resp = await client.chat.completions.create(
             model=model,
-            messages=[{"role": "user", "content": prompt}],
+            messages=chat_messages(prompt, system),
             max_tokens=max_tokens,
             temperature=temperature,
             **kwargs,
         )
-        return resp.choices[0].message.content or ""
+        usage = resp.usage
+        return GenerationResult(resp.choices[0].message.content or "", Usage(
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            cached_tokens=cached_prompt_tokens(usage),
+        ))
+
+    async def aclose(self) -> None:
+        """Fecha o cliente do SDK, se já foi criado."""
+        if self._client:
+            await self._client.close()
+            self._client = None
 
     async def get_embedding(self, text: str) -> Optional[list[float]]:
         """xAI não possui API pública de embeddings."""
@@ -7,6 +7,9 @@ Env: GROQ_API_KEY
 import os
 from typing import Optional
 
+from ..interfaces import GenerationResult, Usage
+from ._prompt import cached_prompt_tokens, chat_messages
+
 
 class GroqDriver:
     """Driver para Groq Cloud — inferência open-source ultra-rápida."""
@@ -48,17 +51,29 @@ class GroqDriver:
         model: str = DEFAULT_MODEL,
         max_tokens: int = 1024,
         temperature: float = 0.7,
+        system: Optional[str] = None,
         **kwargs,
     ) -> str:
         """Gera resposta via Groq Cloud."""
         client = self._get_client()
         resp = await client.chat.completions.create(
             model=model,
-            messages=[{"role": "user", "content": prompt}],
+            messages=chat_messages(prompt, system),
             max_tokens=max_tokens,
             temperature=temperature,
         )
-        return resp.choices[0].message.content or ""
+        usage = resp.usage
+        return GenerationResult(resp.choices[0].message.content or "", Usage(
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            cached_tokens=cached_prompt_tokens(usage),
+        ))
+
+    async def aclose(self) -> None:
+        """Fecha o cliente do SDK, se já foi criado."""
+        if self._client:
+            await self._client.close()
+            self._client = None
 
     async def get_embedding(self, text: str) -> Optional[list[float]]:
         """Groq não possui API de embeddings."""
@@ -3,11 +3,17 @@ SynAI Driver — Ollama (Local Soberano)
 Executa qualquer modelo instalado localmente via Ollama.
 Zero custo, zero dependência de rede, zero censura.
 Env: OLLAMA_BASE_URL (default: http://localhost:11434)
+     OLLAMA_KEEP_ALIVE (opcional, ex: "30m") — tempo que o modelo fica carregado
 """
+import logging
 import os
-import httpx
 from typing import Optional
 
+from ..interfaces import GenerationResult, Usage
+from ._http import SharedAsyncClient
+
+logger = logging.getLogger("SynAI.Ollama")
+
 
 class OllamaDriver:
     """Driver local para Ollama — o fallback soberano do SynAI."""
@@ -20,9 +26,12 @@ class OllamaDriver:
         self,
         base_url: Optional[str] = None,
         default_model: Optional[str] = None,
+        keep_alive: Optional[str] = None,
     ):
         self.base_url = (base_url or os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")).rstrip("/")
         self.default_model = default_model or self.DEFAULT_MODEL
+        self.keep_alive = keep_alive or os.getenv("OLLAMA_KEEP_ALIVE") or None
+        self._http = SharedAsyncClient(timeout=180.0)
 
     def is_available(self) -> bool:
         """Ollama é sempre considerado 'disponível' se base_url estiver configurado.
@@ -35,9 +44,14 @@ class OllamaDriver:
         model: Optional[str] = None,
         max_tokens: int = 1024,
         temperature: float = 0.7,
+        system: Optional[str] = None,
         **kwargs,
     ) -> str:
-        """Gera resposta via Ollama local (API /api/generate)."""
+        """
+        Gera resposta via Ollama local (API /api/generate). O 'system' vai no
+        campo próprio e keep_alive mantém o modelo (e o KV cache do prefixo)
+        carregado entre chamadas.
+        """
         target_model = model or self.default_model
         payload = {
             "model": target_model,
@@ -48,30 +62,84 @@ class OllamaDriver:
                 "temperature": temperature,
             },
         }
-        async with httpx.AsyncClient(timeout=180.0) as client:
-            resp = await client.post(f"{self.base_url}/api/generate", json=payload)
-            resp.raise_for_status()
-            return resp.json().get("response", "")
+        if system:
+            payload["system"] = system
+        if self.keep_alive:
+            payload["keep_alive"] = self.keep_alive
+        client = self._http.get()
+        resp = await client.post(f"{self.base_url}/api/generate", json=payload, timeout=180.0)
+        resp.raise_for_status()
+        data = resp.json()
+        return GenerationResult(data.get("response", ""), Usage(
+            prompt_tokens=data.get("prompt_eval_count", 0),
+            completion_tokens=data.get("eval_count", 0),
+        ))
+
+    async def aclose(self) -> None:
+        """Fecha o pool de conexões HTTP do driver."""
+        await self._http.aclose()
 
     async def get_embedding(self, text: str, model: Optional[str] = None) -> Optional[list[float]]:
         """Gera embedding via Ollama (requer modelo de embedding instalado)."""
         embed_model = model or self.DEFAULT_EMBED_MODEL
         payload = {"model": embed_model, "prompt": text}
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            try:
-                resp = await client.post(f"{self.base_url}/api/embeddings", json=payload)
-                resp.raise_for_status()
-                return resp.json().get("embedding")
-            except Exception as e:
-                print(f"⚠️ [Ollama] Falha ao gerar embedding: {e}")
-                return None
+        client = self._http.get()
+        try:
+            resp = await client.post(f"{self.base_url}/api/embeddings", json=payload, timeout=60.0)
+            resp.raise_for_status()
+            return resp.json().get("embedding")
+        except Exception as e:
+            logger.warning(f"Falha ao gerar embedding: {e}")
+            return None
+
+    async def load(self, model: str, keep_alive: Optional[str] = None) -> bool:
+        """
+        Carrega o modelo na memória sem gerar nada (/api/generate sem prompt)
+        e o mantém residente por keep_alive. Retorna False em falha.
+        """
+        payload = {"model": model, "keep_alive": keep_alive or self.keep_alive or "5m"}
+        client = self._http.get()
+        try:
+            resp = await client.post(f"{self.base_url}/api/generate", json=payload, timeout=180.0)
+            resp.raise_for_status()
+            return True
+        except Exception as e:
+            logger.warning(f"Falha ao pré-carregar '{model}': {e}")
+            return False
+
+    async def unload(self, model: str) -> bool:
+        """Descarrega o modelo da memória (keep_alive 0). Retorna False em falha."""
+        client = self._http.get()
+        try:
+            resp = await client.post(f"{self.base_url}/api/generate", json={"model": model, "keep_alive": 0},
+                                     timeout=30.0)
+            resp.raise_for_status()
+            return True
+        except Exception as e:
+            logger.warning(f"Falha ao descarregar '{model}': {e}")
+            return False
+
+    async def running_models(self) -> list[str]:
+        """Modelos carregados na memória agora (/api/ps)."""
+        client = self._http.get()
+        try:
+            resp = await client.get(f"{self.base_url}/api/ps", timeout=10.0)
+            resp.raise_for_status()
+            return [m["name"] for m in resp.json().get("models", [])]
+        except Exception:
+            return []
 
     async def list_models(self) -> list[str]:
         """Lista os modelos instalados localmente no Ollama."""
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            try:
-                resp = await client.get(f"{self.base_url}/api/tags")
-                resp.raise_for_status()
-                return [m["name"] for m in resp.json().get("models", [])]
-            except Exception:
-                return []
+        client = self._http.get()
+        try:
+            resp = await client.get(f"{self.base_url}/api/tags", timeout=10.0)
+            resp.raise_for_status()
+            return [m["name"] for m in resp.json().get("models", [])]
+        except Exception:
+            return []
+
+
+def model_tag(name: str) -> str:
+    """Nome completo de um modelo Ollama ('llama3' → 'llama3:latest')."""
+    return name if ":" in name else f"{name}:latest"
@@ -1,21 +1,27 @@
 """
 SynAI Driver — OpenAI GPT
 Acesso direto à API do OpenAI usando httpx para evitar dependências extras.
-Env: OPENAI_API_KEY
+Env: OPENAI_API_KEY, OPENAI_BASE_URL (opcional)
 """
 import os
-import httpx
 from typing import Optional
 
+from ..interfaces import GenerationResult, Usage
+from ._http import SharedAsyncClient
+from ._prompt import cached_prompt_tokens, chat_messages
+
 
 class OpenAIDriver:
     """Driver para OpenAI GPT API — httpx-based."""
 
     provider_name = "openai"
+    BASE_URL = "https://api.openai.com/v1"
     DEFAULT_MODEL = "gpt-4o-mini"
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY", "")
+        self.base_url = (base_url or os.getenv("OPENAI_BASE_URL", self.BASE_URL)).rstrip("/")
+        self._http = SharedAsyncClient(timeout=90.0)
 
     def is_available(self) -> bool:
         """Retorna True se a API key da OpenAI está configurada."""
@@ -33,42 +39,56 @@ class OpenAIDriver:
         model: str = DEFAULT_MODEL,
         max_tokens: int = 1024,
         temperature: float = 0.7,
+        system: Optional[str] = None,
         **kwargs,
     ) -> str:
-        """Gera resposta usando a API do OpenAI."""
-        url = "https://api.openai.com/v1/chat/completions"
+        """
+        Gera resposta usando a API do OpenAI. O 'system' vai como primeira
+        mensagem, prefixo estável para o cache automático de prompt.
+        """
+        url = f"{self.base_url}/chat/completions"
         
         payload = {
             "model": model,
-            "messages": [{"role": "user", "content": prompt}],
+            "messages": chat_messages(prompt, system),
             "max_tokens": max_tokens,
             "temperature": temperature
         }
         
-        async with httpx.AsyncClient(timeout=90.0) as client:
-            resp = await client.post(url, headers=self._headers(), json=payload)
-            resp.raise_for_status()
-            data = resp.json()
-            
-            try:
-                return data["choices"][0]["message"]["content"] or ""
-            except (KeyError, IndexError) as e:
-                raise RuntimeError(f"Unexpected response format from OpenAI: {data}. Error: {e}")
+        client = self._http.get()
+        resp = await client.post(url, headers=self._headers(), json=payload)
+        resp.raise_for_status()
+        data = resp.json()
+        
+        try:
+            text = data["choices"][0]["message"]["content"] or ""
+        except (KeyError, IndexError) as e:
+            raise RuntimeError(f"Unexpected response format from OpenAI: {data}. Error: {e}")
+        usage = data.get("usage") or {}
+        return GenerationResult(text, Usage(
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+            cached_tokens=cached_prompt_tokens(usage),
+        ))
+
+    async def aclose(self) -> None:
+        """Fecha o pool de conexões HTTP do driver."""
+        await self._http.aclose()
 
     async def get_embedding(self, text: str) -> Optional[list[float]]:
         """Gera embeddings usando a API do OpenAI."""
-        url = "https://api.openai.com/v1/embeddings"
+        url = f"{self.base_url}/embeddings"
         
         payload = {
             "model": "text-embedding-3-small",
             "input": text
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            resp = await client.post(url, headers=self._headers(), json=payload)
-            resp.raise_for_status()
-            data = resp.json()
-            try:
-                return data["data"][0]["embedding"]
-            except (KeyError, IndexError):
-                return None
+        client = self._http.get()
+        resp = await client.post(url, headers=self._headers(), json=payload, timeout=30.0)
+        resp.raise_for_status()
+        data = resp.json()
+        try:
+            return data["data"][0]["embedding"]
+        except (KeyError, IndexError):
+            return None
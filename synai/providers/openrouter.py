@@ -6,12 +6,20 @@ Um único API key dá acesso a praticamente todo o ecossistema open-source.
 FreeTier: modelos com sufixo ':free' não consomem crédito (rate-limitados).
     Ative prefer_free=True para usar automaticamente o free tier quando disponível.
 
-Env: OPENROUTER_API_KEY
+Env: OPENROUTER_API_KEY, OPENROUTER_BASE_URL (opcional)
 """
+import logging
 import os
-import httpx
 from typing import Optional
 
+import httpx
+
+from ..interfaces import GenerationResult, Usage
+from ._http import SharedAsyncClient
+from ._prompt import cached_prompt_tokens, chat_messages
+
+logger = logging.getLogger("SynAI.OpenRouter")
+
 
 class OpenRouterDriver:
     """Driver para OpenRouter — gateway para +300 modelos com um único API key."""
@@ -64,11 +72,14 @@ class OpenRouterDriver:
         site_url: str = "https://synai.dev",
         site_name: str = "SynAI",
         prefer_free: bool = False,
+        base_url: Optional[str] = None,
     ):
         self.api_key = api_key or os.getenv("OPENROUTER_API_KEY", "")
+        self.base_url = (base_url or os.getenv("OPENROUTER_BASE_URL", self.BASE_URL)).rstrip("/")
         self.site_url = site_url    # Exigido pela política da OpenRouter
         self.site_name = site_name  # Exibido no dashboard da OpenRouter
         self.prefer_free = prefer_free  # Se True, prefere modelos :free quando disponível
+        self._http = SharedAsyncClient(timeout=90.0)
 
     def is_available(self) -> bool:
         """Retorna True se a API key está configurada."""
@@ -88,6 +99,7 @@ class OpenRouterDriver:
         model: str = DEFAULT_MODEL,
         max_tokens: int = 1024,
         temperature: float = 0.7,
+        system: Optional[str] = None,
         **kwargs,
     ) -> str:
         """Gera resposta via OpenRouter (qualquer modelo disponível no gateway)."""
@@ -97,35 +109,46 @@ class OpenRouterDriver:
             free_candidate = model + ":free"
             if free_candidate in self.FREE_MODELS:
                 resolved_model = free_candidate
-                print(f"   [OpenRouter] prefer_free: usando '{resolved_model}' em vez de '{model}'")
+                logger.debug("prefer_free: usando '%s' em vez de '%s'", resolved_model, model)
 
         payload = {
             "model": resolved_model,
-            "messages": [{"role": "user", "content": prompt}],
+            "messages": chat_messages(prompt, system),
             "max_tokens": max_tokens,
             "temperature": temperature,
         }
-        async with httpx.AsyncClient(timeout=90.0) as client:
-            resp = await client.post(
-                f"{self.BASE_URL}/chat/completions",
-                headers=self._headers(),
-                json=payload,
-            )
-            if resp.status_code >= 400:
-                try:
-                    error_data = resp.json()
-                    error_msg = error_data.get("error", {}).get("message", resp.text)
-                except Exception:
-                    error_msg = resp.text
-                raise RuntimeError(f"OpenRouter HTTP {resp.status_code}: {error_msg}")
-            
-            data = resp.json()
-
-            # Tratar erros retornados no corpo (OpenRouter usa HTTP 200 com erro no JSON)
-            if "error" in data:
-                raise RuntimeError(f"OpenRouter error: {data['error']}")
-
-            return data["choices"][0]["message"]["content"] or ""
+        client = self._http.get()
+        resp = await client.post(
+            f"{self.base_url}/chat/completions",
+            headers=self._headers(),
+            json=payload,
+        )
+        if resp.status_code >= 400:
+            try:
+                error_data = resp.json()
+                error_msg = error_data.get("error", {}).get("message", resp.text)
+            except Exception:
+                error_msg = resp.text
+            # HTTPStatusError leva a resposta: o runtime reconhece o 429 (quota) pelo status
+            raise httpx.HTTPStatusError(f"OpenRouter HTTP {resp.status_code}: {error_msg}",
+                                        request=resp.request, response=resp)
+        
+        data = resp.json()
+
+        # Tratar erros retornados no corpo (OpenRouter usa HTTP 200 com erro no JSON)
+        if "error" in data:
+            raise RuntimeError(f"OpenRouter error: {data['error']}")
+
+        usage = data.get("usage") or {}
+        return GenerationResult(data["choices"][0]["message"]["content"] or "", Usage(
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+            cached_tokens=cached_prompt_tokens(usage),
+        ))
+
+    async def aclose(self) -> None:
+        """Fecha o pool de conexões HTTP do driver."""
+        await self._http.aclose()
 
     async def get_embedding(self, text: str) -> Optional[list[float]]:
         """OpenRouter não expõe API de embeddings diretamente."""
@@ -142,4 +165,4 @@ class OpenRouterDriver:
     def enable_free_mode(self) -> None:
         """Ativa o modo prefer_free para esta instância."""
         self.prefer_free = True
-        print("[OpenRouter] Modo prefer_free ativado — priorizando modelos :free")
+        logger.info("Modo prefer_free ativado — priorizando modelos :free")
@@ -1,14 +1,110 @@
 import asyncio
-from typing import Dict, Any, Optional, List, Callable
+from typing import Dict, Any, Optional, List, Callable, Tuple
 import os
 import json
+import logging
+import time
+import uuid
+import hashlib
+import marshal
 from dotenv import load_dotenv
-from .interfaces import LLMProvider
-from .profiles import is_profile, resolve_model, get_profile_models, MODEL_PROFILES
+from .interfaces import LLMProvider, GenerationResult, Usage
+from .profiles import is_profile, resolve_model, get_profile_models, get_model_price, MODEL_PROFILES
 from .router import RouterEngine, ZERO_COST_POLICIES, FREE_BLOCKED_PROVIDERS
+from .profiler import Profiler, current_profiler, instant as profile_instant, span as profile_span
+from .telemetry import ListenerList, TelemetryBus
+from .metrics import RoutingMetrics
+from .tracing import STATUS_ERROR, Tracer, current_tracer, trace_span
+from .checkpoint import RunCheckpoint, current_checkpoint
+from .memory import AgentMemories, ConversationMemory, current_memories, memory_window
+from .connect import IntentFailedError, IntentTimeoutError, apply_option, run_with_options
+from .tools import ToolExecutor, ToolOptions
+from .blobs import BLOB_THRESHOLD, BlobRef, BlobStore, current_blobs, materialize
+from .lifecycle import LookaheadPlan, OllamaState, current_plan
+from .providers.ollama import model_tag
+from .weave import iter_statements
+from .network.cache import cache_key
+from .accounting import (
+    BudgetExceededError, CostLedger, current_ledger, estimate_tokens, intent_scope, usage_cost,
+)
 
 load_dotenv()
 
+logger = logging.getLogger("SynAI.Runtime")
+
+
+def _clip(text: str, limit: int = 150) -> str:
+    """Trecho curto de prompt/resposta para payloads de telemetria."""
+    return text[:limit] + "..." if len(text) > limit else text
+
+
+def _system_prompt(props: Dict[str, Any]) -> Optional[str]:
+    """Prefixo estável de um agente LLM: 'system' seguido do 'context' (texto ou lista de textos)."""
+    context = props.get('context')
+    if isinstance(context, (list, tuple)):
+        context = "\n\n".join(str(part) for part in context)
+    parts = [part for part in (props.get('system'), context) if part]
+    return "\n\n".join(parts) if parts else None
+
+
+def _task_prompt(intent: Dict[str, Any], input_data: Any) -> str:
+    """Parte variável do prompt de um intent LLM (a que entra no histórico da memória)."""
+    # Único ponto em que um blob vira texto: o prompt precisa do conteúdo
+    return (
+        f"Tarefa: {intent['name']}\n"
+        f"Input: {materialize(input_data)}\n"
+        f"Formato de saída: {intent.get('output', 'texto')}."
+    )
+
+
+def _map_items(value: Any) -> List[Any]:
+    """Itens de um map: lista, texto JSON de lista, ou uma linha não vazia por item."""
+    value = materialize(value)
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    if isinstance(value, str):
+        stripped = value.strip()
+        if stripped.startswith('['):
+            try:
+                parsed = json.loads(stripped)
+                if isinstance(parsed, list):
+                    return parsed
+            except json.JSONDecodeError:
+                pass
+        return [line for line in stripped.splitlines() if line.strip()]
+    return [value]
+
+
+_HISTORY_OVERHEAD = 8
+"""Tokens do cabeçalho 'Histórico:' e separadores em volta do histórico."""
+
+_TOOL_ERROR = "Erro na ferramenta"
+_TOOL_MISSING = "Aviso: Ferramenta"
+_ALL_FAILED = "Todos os providers falharam"
+_PROFILE_FAILED = "Todos os modelos do perfil"
+_FAILURES = (_TOOL_ERROR, _TOOL_MISSING, _ALL_FAILED, _PROFILE_FAILED)
+"""Prefixos das falhas que os adapters devolvem como texto em vez de levantar."""
+
+
+def _code_signature(func: Any) -> Optional[str]:
+    """Hash do bytecode de uma ferramenta: editar a função invalida seus resultados incrementais."""
+    code = getattr(func, '__code__', None)
+    if code is None:
+        return getattr(func, '__qualname__', None) or (type(func).__name__ if func is not None else None)
+    return hashlib.sha256(marshal.dumps(code)).hexdigest()
+
+
+async def _gather_or_cancel(coros: List[Any]) -> List[Any]:
+    """gather() que cancela as tasks restantes quando uma falha (sem deixar órfãs)."""
+    tasks = [asyncio.ensure_future(c) for c in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
 # FALLBACK_CHAIN legado mantido para compatibilidade retroativa.
 # Internamente o SynRuntime usa RouterEngine.get_chain(policy) agora.
 # Equivale à política "balanced" (OpenRouter como hub central).
@@ -44,7 +140,13 @@ class SynRuntime:
     a execução de workflows DSL e o dispatcher de ferramentas.
     """
 
-    def __init__(self, real: bool = False, policy: str = "balanced"):
+    MAP_CONCURRENCY = 4
+    """Itens de um map executados ao mesmo tempo quando o DSL não define max_concurrency."""
+
+    LLM_MAX_TOKENS = 1024
+    """Limite de resposta dos intents LLM (reservado na janela da memória de conversa)."""
+
+    def __init__(self, real: bool = False, policy: str = "balanced", tracer: Optional[Tracer] = None):
         self.real = real
         self.policy = RouterEngine.validate_policy(policy) or "balanced"
         self.adapters = {
@@ -52,11 +154,31 @@ class SynRuntime:
             'TOOL': self._tool_adapter,
         }
         self.tools: Dict[str, Any] = {}
+        self.tool_options: Dict[str, ToolOptions] = {}
+        # Onde as ferramentas síncronas rodam (threads / processos quentes), com limites e prazos
+        self.tool_executor = ToolExecutor()
+        self.transforms: Dict[str, Callable[[Any], Any]] = {}
         self.llm_providers: Dict[str, LLMProvider] = {}
         self.default_provider: Optional[str] = None
-        self.event_listeners: List[Callable[[str, Dict[str, Any]], None]] = []
-
-        print(f"[SynAI] Politica de roteamento: '{self.policy}' - {RouterEngine.describe_policy(self.policy)}")
+        self.telemetry = TelemetryBus()
+        self.metrics = RoutingMetrics()
+        self.tracer = tracer
+        # Executor remoto de intents (ex: synai.network.DistributedExecutor); None = local
+        self.executor = None
+        # Cache de respostas (ex: synai.network.ClusterCache); None = sem cache
+        self.cache = None
+        # Store de checkpoints (synai.checkpoint.CheckpointStore); None = execuções não retomáveis
+        self.checkpoints = None
+        # Quotas compartilhadas por chave de provider (ex: synai.network.QuotaClient); None = sem limite
+        self.quota = None
+        # Saídas de ferramentas e inputs a partir deste tamanho viram BlobRef (mmap); None = desligado
+        self.blob_threshold: Optional[int] = BLOB_THRESHOLD
+        # Pré-carga de modelos locais (synai.lifecycle.OllamaLifecycle); None = carga sob demanda
+        self.lifecycle = None
+        # Modelos carregados/instalados no Ollama, com TTL (synai.lifecycle.OllamaState); criado no primeiro perfil local
+        self.ollama_state: Optional[OllamaState] = None
+
+        logger.info(f"Politica de roteamento: '{self.policy}' - {RouterEngine.describe_policy(self.policy)}")
 
         if real:
             # Auto-registra todos os 8 drivers padrão do SynAI v1.6
@@ -75,17 +197,32 @@ class SynRuntime:
             self.register_llm_provider("openai", OpenAIDriver())
             self.register_llm_provider("anthropic", AnthropicDriver())
 
-    def add_event_listener(self, callback: Callable[[str, Dict[str, Any]], None]):
-        """Registra um callback para telemetria de roteamento."""
-        self.event_listeners.append(callback)
+    def add_event_listener(self, callback: Callable[..., Any], batch: bool = False):
+        """
+        Registra um callback para telemetria de roteamento.
+
+        O callback recebe (event_name, payload) — ou uma lista de TelemetryEvent
+        se batch=True — fora do caminho da chamada, via TelemetryBus.
+        Coroutine functions também são aceitas.
+        """
+        self.telemetry.subscribe(callback, batch=batch)
+
+    @property
+    def event_listeners(self) -> ListenerList:
+        """Callbacks registrados; append/remove nesta lista assinam/desassinam no TelemetryBus."""
+        return ListenerList(self.telemetry)
+
+    @event_listeners.setter
+    def event_listeners(self, callbacks: List[Callable[..., Any]]) -> None:
+        ListenerList(self.telemetry)[:] = list(callbacks)
 
     def _dispatch_event(self, event_name: str, payload: Dict[str, Any]):
-        """Dispara um evento de telemetria para todos os listeners."""
-        for listener in self.event_listeners:
-            try:
-                listener(event_name, payload)
-            except Exception as e:
-                print(f"[SynAI][Telemetry] Erro ao disparar evento '{event_name}': {e}")
+        """Enfileira um evento de telemetria para os listeners (não bloqueia)."""
+        self.telemetry.emit(event_name, payload)
+
+    async def flush_events(self):
+        """Aguarda a entrega de todos os eventos de telemetria pendentes."""
+        await self.telemetry.flush()
 
     def set_policy(self, policy: str) -> bool:
         """
@@ -99,10 +236,10 @@ class SynRuntime:
         """
         validated = RouterEngine.validate_policy(policy)
         if not validated:
-            print(f"[SynAI] Politica '{policy}' invalida. Mantendo '{self.policy}'.")
+            logger.warning(f"Politica '{policy}' invalida. Mantendo '{self.policy}'.")
             return False
         self.policy = validated
-        print(f"[SynAI] Politica alterada para '{self.policy}' - {RouterEngine.describe_policy(self.policy)}")
+        logger.info(f"Politica alterada para '{self.policy}' - {RouterEngine.describe_policy(self.policy)}")
         # Atualizar prefer_free no driver OpenRouter se registrado
         or_driver = self.llm_providers.get("openrouter")
         if or_driver and hasattr(or_driver, 'prefer_free'):
@@ -162,26 +299,106 @@ class SynRuntime:
         self.llm_providers[alias] = provider
         if set_default or not self.default_provider:
             self.default_provider = alias
-        print(f"[SynAI][LLM] Driver registrado: {alias}")
+        logger.debug(f"Driver registrado: {alias}")
+
+    async def aclose(self):
+        """Entrega telemetria e spans pendentes e fecha os pools de conexão dos drivers."""
+        await self.telemetry.aclose()
+        if self.tracer is not None:
+            self.tracer.flush()
+        if self.executor is not None:
+            await self.executor.aclose()
+        if self.lifecycle is not None:
+            await self.lifecycle.aclose()
+        self.tool_executor.close()
+        for alias, driver in self.llm_providers.items():
+            if hasattr(driver, 'aclose'):
+                try:
+                    await driver.aclose()
+                except Exception as e:
+                    logger.warning(f"Erro ao fechar driver '{alias}': {e}")
 
     # ─────────────────────────────────────────────────────────────────────────
     # REGISTRO DE FERRAMENTAS
     # ─────────────────────────────────────────────────────────────────────────
-    def register_tool(self, name: str, func: Any):
-        """Registra uma função Python como ferramenta executável."""
+    def register_tool(self, name: str, func: Any, executor: Optional[str] = None,
+                      max_concurrency: Optional[int] = None, timeout: Optional[float] = None,
+                      buffers: Optional[bool] = None):
+        """
+        Registra uma função Python como ferramenta executável.
+
+        Args:
+            executor:        'inline' (no event loop), 'thread' (padrão para
+                             funções síncronas) ou 'process' (workers quentes).
+            max_concurrency: Execuções simultâneas desta ferramenta.
+            timeout:         Prazo em segundos (em 'process', o worker é morto).
+            buffers:         Se True, dados grandes (BlobRef) chegam como
+                             memoryview, sem cópia; senão, como texto.
+
+        Propriedades do agente TOOL no DSL (executor, max_concurrency,
+        timeout, buffers) têm precedência sobre estas opções.
+        """
+        options = ToolOptions(executor, max_concurrency, timeout, buffers)
+        self.tool_executor.prepare(name, func, options)
         self.tools[name] = func
-        print(f"[SynAI][TOOL] Ferramenta registrada: {name}")
+        self.tool_options[name] = options
+        logger.debug(f"Ferramenta registrada: {name}")
 
-    def register_toolkit(self, toolkit: Dict[str, Any]):
-        """Registra um dicionário inteiro de ferramentas de uma vez."""
+    def register_toolkit(self, toolkit: Dict[str, Any], **options: Any):
+        """Registra um dicionário inteiro de ferramentas de uma vez (mesmas opções de register_tool)."""
         for name, func in toolkit.items():
-            self.register_tool(name, func)
+            self.register_tool(name, func, **options)
+
+    def register_transform(self, name: str, func: Callable[[Any], Any]):
+        """Registra uma função (sync ou async) usável em 'transform'/'filter' de connects."""
+        self.transforms[name] = func
+        logger.debug(f"Transform registrado: {name}")
 
     # ─────────────────────────────────────────────────────────────────────────
     # EXECUÇÃO DE WORKFLOW DSL
     # ─────────────────────────────────────────────────────────────────────────
-    async def execute_workflow(self, ast: Dict[str, Any], run_decl: Dict[str, Any], mock: bool = True) -> Dict[str, Any]:
-        """Executa um workflow SynAI completo a partir do AST parseado."""
+    async def execute_workflow(
+        self,
+        ast: Dict[str, Any],
+        run_decl: Dict[str, Any],
+        mock: bool = True,
+        inputs: Optional[Dict[str, Any]] = None,
+        on_result: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        profile: bool = False,
+        budget: Optional[float] = None,
+        traceparent: Optional[str] = None,
+        run_id: Optional[str] = None,
+        incremental: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Executa um workflow SynAI completo a partir do AST parseado.
+
+        Args:
+            ast:       AST validado (validated_ast do arquivo linked).
+            run_decl:  Declaração 'Run' que aponta orchestrator/workflow.
+            mock:      Mantido por compatibilidade.
+            inputs:    Valores semeados no data_flow antes do primeiro intent.
+                       Um intent cujo 'input' é uma dessas chaves recebe o valor.
+            on_result: Callback (sync ou async) chamado com cada resultado de
+                       intent assim que ele termina — usado para streaming.
+            profile:   Se True, registra spans de intents, tentativas de provider
+                       e ferramentas; o Profiler volta em result['profile'].
+            budget:    Limite de custo (USD) do workflow. Candidatos que o
+                       estourariam são pulados; sem alternativa, o workflow
+                       para com status 'budget_exceeded'.
+            traceparent: Header W3C do chamador; com self.tracer definido, os
+                       spans do workflow entram nesse trace.
+            run_id:    Identificador da execução no store de checkpoints
+                       (self.checkpoints); gerado se omitido.
+            incremental: Se True (requer self.checkpoints), intents cuja
+                       fingerprint (agente, intent, modelo resolvido, input)
+                       já tem resultado gravado são pulados.
+
+        Returns:
+            {'status', 'results', 'flow', 'usage'} — 'usage' traz tokens e
+            custo totais, por intent e por chamada. Com checkpoints, também
+            'run_id', para retomar com resume().
+        """
         orch_name = run_decl['orchestrator']
         wf_name = run_decl['workflow']
 
@@ -195,62 +412,341 @@ class SynRuntime:
         if not wf:
             raise ValueError(f"❌ Workflow '{wf_name}' não encontrado no Orchestrator '{orch_name}'.")
 
-        data_flow: Dict[str, Any] = {}
+        blobs = BlobStore(self.blob_threshold) if self.blob_threshold is not None else None
+        blobs_token = blobs.activate() if blobs is not None else None
+        data_flow: Dict[str, Any] = {key: blobs.maybe_put(value) if blobs is not None else value
+                                     for key, value in (inputs or {}).items()}
         results = []
-        print(f"🚀 Iniciando workflow '{wf_name}' [{orch_name}] (real={self.real})")
+        logger.info(f"Iniciando workflow '{wf_name}' [{orch_name}] (real={self.real})")
+
+        if incremental and self.checkpoints is None:
+            raise ValueError("Execução incremental requer rt.checkpoints (CheckpointStore).")
+        checkpoint_token = None
+        checkpoint = current_checkpoint()
+        if checkpoint is None and self.checkpoints is not None:
+            checkpoint = RunCheckpoint(self.checkpoints, run_id or uuid.uuid4().hex, incremental=incremental)
+            checkpoint_token = checkpoint.activate()
+        if checkpoint is not None:
+            checkpoint.incremental = checkpoint.incremental or incremental
+            checkpoint.store.start_run(checkpoint.run_id, ast, run_decl, inputs, budget)
+
+        # O gasto vai para o checkpoint a cada registro (local ou de worker), para o resume
+        ledger = CostLedger(budget, on_record=checkpoint.charge if checkpoint is not None else None)
+        ledger_token = ledger.activate()
+        memories_token = AgentMemories().activate()
+        profiler_token = None
+        if profile and current_profiler() is None:
+            profiler_token = Profiler(wf_name).activate()
+        tracer_token = None
+        if self.tracer is not None and current_tracer() is None:
+            tracer_token = self.tracer.activate(traceparent)
+        plan = plan_token = None
+        if self.lifecycle is not None and current_plan() is None:
+            plan = self.lifecycle.begin(self._local_model_plan(orch, wf['statements']))
+            plan_token = plan.activate()
+        status, error = 'completed', None
+        try:
+            with trace_span(f"workflow {wf_name}", **{"synai.workflow": wf_name,
+                                                      "synai.orchestrator": orch_name,
+                                                      "synai.policy": self.policy}) as traced:
+                try:
+                    with profile_span(f"workflow {wf_name}", "workflow", orchestrator=orch_name):
+                        await self._run_statements(orch, wf['statements'], data_flow, results, on_result)
+                except BudgetExceededError as e:
+                    status, error = 'budget_exceeded', str(e)
+                    traced.set_status(STATUS_ERROR, error)
+                    logger.warning(f"Workflow '{wf_name}' interrompido: {e}")
+                except IntentTimeoutError as e:
+                    status, error = 'timeout', str(e)
+                    traced.set_status(STATUS_ERROR, error)
+                    logger.warning(f"Workflow '{wf_name}' interrompido: {e}")
+                if checkpoint is not None:
+                    traced.set(**{"synai.run_id": checkpoint.run_id})
+                traced.set(**{"synai.status": status, "synai.cost_usd": round(ledger.cost_usd, 8),
+                              "gen_ai.usage.input_tokens": ledger.prompt_tokens,
+                              "gen_ai.usage.output_tokens": ledger.completion_tokens})
+        except BaseException:
+            status = 'failed'
+            raise
+        finally:
+            if checkpoint is not None:
+                checkpoint.store.finish_run(checkpoint.run_id, status)
+                if checkpoint_token is not None:
+                    RunCheckpoint.deactivate(checkpoint_token)
+            profiler = current_profiler()
+            if profiler_token is not None:
+                Profiler.deactivate(profiler_token)
+            if tracer_token is not None:
+                Tracer.deactivate(tracer_token)
+            if plan is not None:
+                LookaheadPlan.deactivate(plan_token)
+                self.lifecycle.finish(plan)
+            AgentMemories.deactivate(memories_token)
+            CostLedger.deactivate(ledger_token)
+            if blobs is not None:
+                BlobStore.deactivate(blobs_token)
+                blobs.close()
+
+        logger.info(f"Workflow '{wf_name}' {status} — {ledger.prompt_tokens + ledger.completion_tokens} tokens, "
+                    f"US$ {ledger.cost_usd:.6f}")
+        outcome = {'status': status, 'results': results, 'flow': data_flow, 'usage': ledger.summary()}
+        if checkpoint is not None:
+            await checkpoint.store.flush()
+            outcome['run_id'] = checkpoint.run_id
+            if checkpoint.restored:
+                logger.info(f"{checkpoint.restored} passo(s) restaurados do checkpoint '{checkpoint.run_id}'")
+            if checkpoint.incremental:
+                outcome['reused'] = checkpoint.reused
+        if error:
+            outcome['error'] = error
+        if profile:
+            outcome['profile'] = profiler
+        return outcome
+
+    async def resume(
+        self,
+        run_id: str,
+        on_result: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        profile: bool = False,
+        traceparent: Optional[str] = None,
+        incremental: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Retoma uma execução gravada em self.checkpoints: o workflow é refeito
+        a partir do AST gravado, e cada intent (ou item de map) já concluído
+        volta do checkpoint sem ser executado de novo. Com incremental=True,
+        os intents restantes também reaproveitam resultados pela fingerprint.
+        """
+        if self.checkpoints is None:
+            raise ValueError("resume() requer rt.checkpoints (CheckpointStore).")
+        run, steps, data_flow = self.checkpoints.load(run_id)
+        logger.info(f"Retomando execução '{run_id}' ({run['status']}, {len(steps)} passo(s) gravados, "
+                    f"US$ {run['spent']:.6f} já gastos)")
+        # O budget vale para a execução inteira: as sessões anteriores já consumiram parte dele
+        budget = None if run['budget'] is None else max(0.0, run['budget'] - run['spent'])
+        token = RunCheckpoint(self.checkpoints, run_id, steps, spent=run['spent']).activate()
+        try:
+            return await self.execute_workflow(run['ast'], run['run_decl'], inputs={**run['inputs'], **data_flow},
+                                               on_result=on_result, profile=profile, budget=budget,
+                                               traceparent=traceparent, run_id=run_id, incremental=incremental)
+        finally:
+            RunCheckpoint.deactivate(token)
 
-        for stmt in wf['statements']:
+    async def _run_statements(
+        self,
+        orch: Dict[str, Any],
+        statements: List[Dict[str, Any]],
+        data_flow: Dict[str, Any],
+        results: List[Dict[str, Any]],
+        on_result: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        links: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> None:
+        """Executa em ordem as instruções de um workflow sobre o data_flow."""
+        # Opções do último connect para cada agente: valem para o próximo intent dele
+        links = {} if links is None else links
+        for stmt in statements:
             stmt_type = stmt['type']
 
-            # ── INTENT: execução de um agente ────────────────────────────────
-            if stmt_type == 'Intent':
-                agent_id = stmt['agent']
-                agent_cfg = self._get_agent_config(orch, agent_id)
-                if not agent_cfg:
-                    print(f"⚠️  Agente '{agent_id}' não encontrado — pulando intent '{stmt['name']}'")
-                    continue
-
-                # Resolver input: prioridade fluxo > literal DSL > conexão prévia
-                dsl_input = stmt.get('input', 'N/A')
-                connected_input = data_flow.get(f"{agent_id}_input")
-
-                if dsl_input in data_flow:
-                    input_data = data_flow[dsl_input]
-                elif dsl_input != 'N/A' and dsl_input != agent_id:
-                    input_data = dsl_input
-                elif connected_input:
-                    input_data = connected_input
-                else:
-                    input_data = dsl_input
-
-                print(f"⚡ Intent: {stmt['name']} → agente '{agent_id}'")
-                result = await self._dispatch_to_adapter(agent_cfg, stmt, input_data)
-
-                data_flow[f"{agent_id}_output"] = result
-                if stmt.get('output'):
-                    data_flow[stmt['output']] = result
+            # ── INTENT / MAP: execução de um agente (map: uma vez por item) ──
+            if stmt_type in ('Intent', 'Map'):
+                await self._run_intent(orch, stmt, data_flow, results, on_result, link=links.pop(stmt['agent'], None))
 
-                results.append({'intent': stmt['name'], 'agent': agent_id, 'output': result})
+            # ── PARALLEL: ramos concorrentes, resultados na ordem do bloco ───
+            elif stmt_type == 'Parallel':
+                await self._run_parallel(orch, stmt, data_flow, results, on_result, links)
 
             # ── CONNECT: ligação entre agentes ───────────────────────────────
             elif stmt_type == 'Connect':
                 from_agent = stmt['from']
                 to_agent = stmt['to']
                 opts = stmt.get('options', {})
-                from_data = data_flow.get(f"{from_agent}_output", 'N/A')
-                data_flow[f"{to_agent}_input"] = from_data
-                print(f"🔗 {from_agent}.output → {to_agent}.input  opts={opts}")
-
-                if opts.get('async'):
-                    await asyncio.sleep(0.05)
-                if opts.get('timeout'):
-                    await asyncio.sleep(min(0.1, opts['timeout'] / 100))
+                with profile_span(f"connect {from_agent}->{to_agent}", "connect"):
+                    from_data = data_flow.get(f"{from_agent}_output", 'N/A')
+                    logger.debug(f"{from_agent}.output → {to_agent}.input  opts={opts}")
+                    if opts.get('filter') and not await apply_option(opts['filter'], from_data, self.transforms):
+                        logger.info(f"Filtro '{opts['filter']}' barrou {from_agent}.output → {to_agent}.input")
+                        links[to_agent] = {**opts, 'blocked': True}
+                        continue
+                    if opts.get('transform'):
+                        from_data = await apply_option(opts['transform'], from_data, self.transforms)
+                        blobs = current_blobs()
+                        if blobs is not None and not isinstance(from_data, BlobRef):
+                            from_data = blobs.maybe_put(from_data)
+                    data_flow[f"{to_agent}_input"] = from_data
+                    links[to_agent] = opts
 
             else:
-                print(f"⚠️ Instrução '{stmt_type}' desconhecida — ignorada.")
+                logger.warning(f"Instrução '{stmt_type}' desconhecida — ignorada.")
+
+    async def _run_intent(
+        self,
+        orch: Dict[str, Any],
+        stmt: Dict[str, Any],
+        data_flow: Dict[str, Any],
+        results: List[Dict[str, Any]],
+        on_result: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        link: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Executa um intent, grava sua saída no data_flow e notifica on_result.
+        'link' são as opções do connect que alimenta o agente (timeout, retry,
+        ou 'blocked' quando o filtro barrou o dado).
+
+        Um 'Map' executa o intent uma vez por item do input (lista, JSON de
+        lista ou texto com um item por linha), até max_concurrency ao mesmo
+        tempo, e grava a lista de saídas na ordem dos itens.
+        """
+        agent_id = stmt['agent']
+        agent_cfg = self._get_agent_config(orch, agent_id)
+        if not agent_cfg:
+            logger.warning(f"Agente '{agent_id}' não encontrado — pulando intent '{stmt['name']}'")
+            return
+        link = link or {}
+        if link.get('blocked'):
+            logger.info(f"Intent '{stmt['name']}' pulado: filtro do connect barrou a entrada de '{agent_id}'")
+            return
+
+        # Resolver input: prioridade fluxo > literal DSL > conexão prévia
+        dsl_input = stmt.get('input') or 'N/A'
+        connected_input = data_flow.get(f"{agent_id}_input")
+
+        if dsl_input in data_flow:
+            input_data = data_flow[dsl_input]
+        elif dsl_input != 'N/A' and dsl_input != agent_id:
+            input_data = dsl_input
+        elif connected_input:
+            input_data = connected_input
+        else:
+            input_data = dsl_input
+
+        checkpoint = current_checkpoint()
+        saved = checkpoint.get(stmt['id']) if checkpoint is not None else None
+        fingerprint = reused = None
+        # Map: a fingerprint vale por item (só os itens novos ou alterados rodam)
+        if saved is None and checkpoint is not None and checkpoint.incremental and stmt['type'] == 'Intent':
+            fingerprint = self._intent_fingerprint(agent_cfg, stmt, input_data)
+            reused = await checkpoint.reuse(fingerprint)
+        plan = current_plan()
+        if plan is not None and saved is None and reused is None:
+            plan.advance(stmt['id'])
+        if saved is not None or reused is not None:
+            origin = "checkpoint" if saved is not None else "resultado anterior"
+            logger.info(f"Intent: {stmt['name']} → agente '{agent_id}' ({origin})")
+            result = (saved or reused)['output']
+            self._replay_memory(agent_cfg, stmt, input_data, result)
+            blobs = current_blobs()
+            if blobs is not None:
+                result = blobs.maybe_put(result)
+        elif stmt['type'] == 'Map':
+            if self._agent_memory(agent_cfg, str(agent_cfg['properties'].get('model', 'unknown'))) is not None:
+                raise ValueError(f"Map '{stmt['name']}': o agente '{agent_id}' usa memory, que não vale em map.")
+            items = _map_items(input_data)
+            limit = asyncio.Semaphore(stmt.get('max_concurrency') or self.MAP_CONCURRENCY)
+
+            async def run_item(index: int, item: Any) -> Any:
+                key = f"{stmt['id']}#{index}"
+                done = checkpoint.get(key) if checkpoint is not None else None
+                if done is not None:
+                    return done['output']
+                if not isinstance(item, str):
+                    item = json.dumps(item, ensure_ascii=False)
+                item_fingerprint = None
+                if checkpoint is not None and checkpoint.incremental:
+                    item_fingerprint = self._intent_fingerprint(agent_cfg, stmt, item)
+                    done = await checkpoint.reuse(item_fingerprint)
+                if done is not None:
+                    output = done['output']
+                else:
+                    async with limit:
+                        output = await self._invoke_intent(agent_cfg, stmt, item, link)
+                    if item_fingerprint is not None and self._reusable(agent_cfg, output):
+                        checkpoint.store.record_result(item_fingerprint, output)
+                if checkpoint is not None:
+                    checkpoint.record(key, {'output': output})
+                return output
+
+            logger.info(f"Map: {stmt['name']} → agente '{agent_id}' sobre {len(items)} itens")
+            with profile_span(f"map {stmt['name']}", "intent", agent=agent_id, items=len(items)), \
+                    intent_scope(stmt['name']):
+                result = await _gather_or_cancel([run_item(i, item) for i, item in enumerate(items)])
+        else:
+            logger.info(f"Intent: {stmt['name']} → agente '{agent_id}'")
+            with profile_span(f"intent {stmt['name']}", "intent", agent=agent_id), intent_scope(stmt['name']):
+                result = await self._invoke_intent(agent_cfg, stmt, input_data, link)
+
+        data_flow[f"{agent_id}_output"] = result
+        if stmt.get('output'):
+            data_flow[stmt['output']] = result
+
+        entry = {'intent': stmt['name'], 'agent': agent_id, 'output': result}
+        results.append(entry)
+        if checkpoint is not None and saved is None:
+            checkpoint.record(stmt['id'], entry, data_flow)
+            if fingerprint is not None and reused is None and self._reusable(agent_cfg, result):
+                checkpoint.store.record_result(fingerprint, result)
+        if on_result:
+            ret = on_result(entry)
+            if asyncio.iscoroutine(ret):
+                await ret
+
+    async def _invoke_intent(self, agent_cfg: Dict[str, Any], stmt: Dict[str, Any], input_data: Any,
+                             link: Dict[str, Any]) -> Any:
+        """Uma execução do intent (local ou via self.executor), com timeout/retry do connect."""
+        if self.executor is not None:
+            call = lambda: self.executor.run_intent(self, agent_cfg, stmt, input_data)
+        else:
+            call = lambda: self._dispatch_to_adapter(agent_cfg, stmt, input_data)
+        if not (link.get('timeout') or link.get('retry')):
+            return await call()
 
-        print("✅ Workflow concluído.")
-        return {'status': 'completed', 'results': results, 'flow': data_flow}
+        async def checked() -> Any:
+            # Adapters devolvem falhas como texto: para o retry, elas precisam levantar
+            output = await call()
+            if not isinstance(output, (GenerationResult, BlobRef)) and str(output).startswith(_FAILURES):
+                raise IntentFailedError(stmt['name'], output)
+            return output
+
+        try:
+            return await run_with_options(stmt['name'], checked, link.get('timeout'), link.get('retry', 0))
+        except IntentFailedError as e:
+            # Tentativas esgotadas: a falha segue como saída do intent, como sem retry
+            return e.output
+
+    async def _run_parallel(
+        self,
+        orch: Dict[str, Any],
+        stmt: Dict[str, Any],
+        data_flow: Dict[str, Any],
+        results: List[Dict[str, Any]],
+        on_result: Optional[Callable[[Dict[str, Any]], Any]],
+        links: Dict[str, Dict[str, Any]],
+    ) -> None:
+        """
+        Executa os ramos de um bloco parallel ao mesmo tempo. Cada instrução é
+        um ramo; um connect acompanha a instrução seguinte. Se um ramo falhar,
+        os demais são cancelados.
+        """
+        branches: List[List[Dict[str, Any]]] = []
+        pending: List[Dict[str, Any]] = []
+        for branch_stmt in stmt['branches']:
+            pending.append(branch_stmt)
+            if branch_stmt['type'] != 'Connect':
+                branches.append(pending)
+                pending = []
+        if pending:
+            branches.append(pending)
+
+        branch_results: List[List[Dict[str, Any]]] = [[] for _ in branches]
+        with profile_span(f"parallel ({len(branches)} ramos)", "parallel"):
+            await _gather_or_cancel([
+                self._run_statements(orch, branch, data_flow, branch_results[i], on_result, dict(links))
+                for i, branch in enumerate(branches)
+            ])
+        for branch in branches:
+            for branch_stmt in branch:
+                links.pop(branch_stmt.get('agent'), None)
+        for entries in branch_results:
+            results.extend(entries)
 
     # ─────────────────────────────────────────────────────────────────────────
     # HELPERS INTERNOS
@@ -271,15 +767,100 @@ class SynRuntime:
             return data_flow.get(target, f"(resultado de {target} não encontrado)")
         return str(raw_input)
 
+    def _local_model_plan(self, orch: Dict[str, Any], statements: List[Dict[str, Any]]) -> List[Tuple[str, Optional[str]]]:
+        """(id, modelo local previsto ou None) de cada intent do workflow, na ordem de execução."""
+        steps = []
+        for stmt in iter_statements(statements):
+            if stmt['type'] in ('Intent', 'Map'):
+                agent_cfg = self._get_agent_config(orch, stmt['agent'])
+                steps.append((stmt['id'], self._predicted_local_model(agent_cfg) if agent_cfg else None))
+        return steps
+
+    def _predicted_local_model(self, agent_cfg: Dict[str, Any]) -> Optional[str]:
+        """
+        Slug do modelo Ollama que o agente vai usar, previsto com as mesmas
+        regras de call_model (registry, policy, perfil e drivers disponíveis),
+        sem chamar nenhum provider. None se a primeira opção viável é remota.
+        """
+        if self._agent_type(agent_cfg) != 'LLM':
+            return None
+        props = agent_cfg['properties']
+        model = str(props.get('model', ''))
+
+        def ready(alias: Optional[str]) -> bool:
+            driver = self.llm_providers.get(alias) if alias else None
+            return driver is not None and not (hasattr(driver, 'is_available') and not driver.is_available())
+
+        if is_profile(model):
+            for friendly_name in get_profile_models(model):
+                alias, slug = resolve_model(friendly_name) or (_infer_provider(friendly_name), friendly_name)
+                if alias and self._is_allowed_by_policy(alias) and ready(alias):
+                    return slug if alias == "ollama" else None
+            return None
+
+        alias, slug = resolve_model(model) or (_infer_provider(model), model)
+        if alias and not self._is_allowed_by_policy(alias):
+            if self.policy in {"local", "sovereign"}:
+                alias, slug = "ollama", "llama3"
+            else:
+                alias, slug = "openrouter", RouterEngine.get_free_model("geral")
+        for candidate in self._build_candidate_chain(props.get('provider'), alias):
+            if ready(candidate):
+                return slug if candidate == "ollama" else None
+        return None
+
+    @staticmethod
+    def _agent_type(agent_cfg: Dict[str, Any]) -> str:
+        res_type = agent_cfg['properties'].get('agent_type', agent_cfg.get('agent_type', 'LLM'))
+        return str(res_type).replace('"', '').upper()
+
+    def _intent_fingerprint(self, agent_cfg: Dict[str, Any], stmt: Dict[str, Any], input_data: Any) -> str:
+        """
+        Identidade de uma execução de intent: configuração do agente, intent,
+        modelo resolvido (ou código da ferramenta) e o input vindo dos intents
+        anteriores. Mesma fingerprint = mesmo resultado esperado.
+        """
+        props = agent_cfg.get('properties', {})
+        agent_type = self._agent_type(agent_cfg)
+        if agent_type == 'LLM':
+            model = str(props.get('model', 'unknown'))
+            resolved = get_profile_models(model) if is_profile(model) else (resolve_model(model) or model)
+            target = [self.policy, resolved]
+            # Com memória, a resposta depende também das trocas anteriores do agente
+            memory = self._agent_memory(agent_cfg, model)
+            if memory is not None:
+                target.append(memory.lineage)
+        elif agent_type == 'TOOL':
+            tool_name = str(props.get('function', stmt['name'])).replace('"', '')
+            target = [tool_name, _code_signature(self.tools.get(tool_name))]
+        else:
+            target = None
+        # Um blob entra pela digest: o conteúdo não é materializado para a fingerprint
+        if isinstance(input_data, BlobRef):
+            input_data = {"blob": input_data.digest}
+        return cache_key("intent", agent_type, props, stmt['type'], stmt['name'], stmt.get('output'),
+                         target, input_data)
+
+    def _reusable(self, agent_cfg: Dict[str, Any], output: Any) -> bool:
+        """Só saídas bem-sucedidas entram no store incremental (falhas voltam como texto)."""
+        agent_type = self._agent_type(agent_cfg)
+        if agent_type == 'LLM':
+            return isinstance(output, GenerationResult)
+        if agent_type == 'TOOL':
+            return isinstance(output, BlobRef) or not str(output).startswith((_TOOL_ERROR, _TOOL_MISSING))
+        return False
+
     async def _dispatch_to_adapter(self, agent_cfg: Dict[str, Any], intent: Dict[str, Any], input_data: str) -> str:
         """Encaminha execução ao adapter correto (LLM ou TOOL) com base no agent_type."""
-        res_type = agent_cfg['properties'].get('agent_type', agent_cfg.get('agent_type', 'LLM'))
-        agent_type = str(res_type).replace('"', '').upper()
+        agent_type = self._agent_type(agent_cfg)
         adapter = self.adapters.get(agent_type)
-        if not adapter:
-            print(f"⚠️  Adapter '{agent_type}' não implementado — mock.")
-            return f"mock_result_{intent['name']}({input_data})"
-        return await adapter(agent_cfg, intent, input_data)
+        with trace_span(f"intent {intent['name']}", **{"synai.intent": intent['name'],
+                                                        "synai.agent": agent_cfg.get('id'),
+                                                        "synai.agent_type": agent_type}):
+            if not adapter:
+                logger.warning(f"Adapter '{agent_type}' não implementado — mock.")
+                return f"mock_result_{intent['name']}({input_data})"
+            return await adapter(agent_cfg, intent, input_data)
 
     # ─────────────────────────────────────────────────────────────────────────
     # ADAPTER: TOOL
@@ -289,38 +870,95 @@ class SynRuntime:
         res_func = config.get('properties', {}).get('function', intent['name'])
         tool_name = str(res_func).replace('"', '')
 
-        print(f"🛠️  Tool: {tool_name}({input_data[:60]}...)")
+        logger.debug("Tool: %s(%.60s...)", tool_name,
+                     repr(input_data) if isinstance(input_data, BlobRef) else input_data)
 
         if tool_name not in self.tools:
-            msg = f"Aviso: Ferramenta '{tool_name}' não registrada no runtime."
-            print(f"⚠️  [SynAI] {msg}")
+            msg = f"{_TOOL_MISSING} '{tool_name}' não registrada no runtime."
+            logger.warning(msg)
             return msg
 
         try:
             func = self.tools[tool_name]
-            if asyncio.iscoroutinefunction(func):
-                result = await func(input_data)
-            else:
-                result = func(input_data)
+            options = self.tool_options.get(tool_name, ToolOptions()).merged(
+                ToolOptions.from_properties(config.get('properties', {})))
+            if isinstance(input_data, BlobRef) and not options.buffers:
+                input_data = input_data.text()
+            with trace_span(f"tool {tool_name}", **{"synai.tool": tool_name,
+                                                    "synai.tool.executor": options.executor or "default"}), \
+                    profile_span(f"tool {tool_name}", "tool", executor=options.executor or "default"):
+                result = await self.tool_executor.run(tool_name, func, input_data, options)
+            blobs = current_blobs()
+            if blobs is not None and blobs.accepts(result):
+                return blobs.put(result)
             return str(result)
         except Exception as e:
-            msg = f"Erro na ferramenta '{tool_name}': {e}"
-            print(f"❌ [SynAI] {msg}")
+            msg = f"{_TOOL_ERROR} '{tool_name}': {e}"
+            logger.warning(msg)
             return msg
 
     # ─────────────────────────────────────────────────────────────────────────
     # ADAPTER: LLM
     # ─────────────────────────────────────────────────────────────────────────
     async def _llm_adapter(self, config: Dict[str, Any], intent: Dict[str, Any], input_data: str) -> str:
-        """Adapter LLM — delega ao call_model com fallback automático."""
-        model = config['properties'].get('model', 'unknown')
-        preferred = config['properties'].get('provider', None)
-        prompt = (
-            f"Tarefa: {intent['name']}\n"
-            f"Input: {input_data}\n"
-            f"Formato de saída: {intent.get('output', 'texto')}."
-        )
-        return await self.call_model(model, prompt, preferred_provider=preferred)
+        """
+        Adapter LLM — delega ao call_model com fallback automático. 'system' e
+        'context' do agente vão como prefixo estável (cacheável pelo provider);
+        só a tarefa e o input variam entre chamadas. Com 'memory', o histórico
+        do agente na execução entra antes da tarefa, ajustado à janela.
+        """
+        props = config['properties']
+        model = props.get('model', 'unknown')
+        preferred = props.get('provider', None)
+        prompt = _task_prompt(intent, input_data)
+        system = _system_prompt(props)
+        memory = self._agent_memory(config, model)
+        if memory is None:
+            return await self.call_model(model, prompt, self.LLM_MAX_TOKENS, preferred_provider=preferred,
+                                         system=system)
+
+        async def summarize(text: str, limit: int) -> str:
+            result = await self.call_model(
+                model, f"Resuma a conversa abaixo em até {limit} tokens, preservando fatos, decisões e "
+                       f"pendências:\n\n{text}", limit, preferred_provider=preferred)
+            # call_model devolve falhas como texto: elas não podem virar o resumo do histórico
+            if not isinstance(result, GenerationResult):
+                raise RuntimeError(str(result))
+            return result
+
+        fixed = estimate_tokens(system or "") + estimate_tokens(prompt) + self.LLM_MAX_TOKENS
+        if fixed > memory.window:
+            logger.warning(f"Intent '{intent['name']}': prompt (~{fixed} tokens com a resposta) excede a janela "
+                           f"de {memory.window} tokens de '{config.get('id')}'.")
+        await memory.fit(memory.window - fixed - _HISTORY_OVERHEAD, summarize)
+        history = memory.render()
+        full_prompt = f"Histórico:\n{history}\n\n{prompt}" if history else prompt
+        result = await self.call_model(model, full_prompt, self.LLM_MAX_TOKENS, preferred_provider=preferred,
+                                       system=system)
+        # Falhas (texto simples) não entram no histórico
+        if isinstance(result, GenerationResult):
+            memory.exchange(prompt, str(result))
+        return result
+
+    @staticmethod
+    def _agent_memory(config: Dict[str, Any], model: str) -> Optional[ConversationMemory]:
+        """Memória de conversa do agente na execução atual (None se o agente não declara 'memory')."""
+        props = config['properties']
+        memories = current_memories()
+        if memories is None or 'memory' not in props:
+            return None
+        window = memory_window(props['memory'], model)
+        if window is None:
+            return None
+        return memories.get(config.get('id', model), window, props.get('memory_strategy', 'trim'))
+
+    def _replay_memory(self, agent_cfg: Dict[str, Any], stmt: Dict[str, Any], input_data: Any, output: Any) -> None:
+        """Passo restaurado (checkpoint ou incremental): a troca entra no histórico como se tivesse rodado."""
+        if self._agent_type(agent_cfg) != 'LLM' or str(output).startswith(_FAILURES):
+            return
+        memory = self._agent_memory(agent_cfg, str(agent_cfg['properties'].get('model', 'unknown')))
+        if memory is not None:
+            memory.exchange(_task_prompt(stmt, input_data), str(materialize(output)))
 
     # ─────────────────────────────────────────────────────────────────────────
     # CALL MODEL — API Pública com Fallback Chain
@@ -332,6 +970,7 @@ class SynRuntime:
         max_tokens: int = 1024,
         endpoint: str = "",
         preferred_provider: Optional[str] = None,
+        system: Optional[str] = None,
     ) -> str:
         """
         Invoca um LLM diretamente, com fallback automático em cadeia.
@@ -342,100 +981,228 @@ class SynRuntime:
             3. provider padrão (default_provider)
             4. toda a FALLBACK_CHAIN na ordem definida
 
+        Com self.cache definido, uma resposta já gerada para o mesmo modelo,
+        prompt, max_tokens e policy volta do cache sem chamar provider.
+
         Args:
             model:              Slug do modelo (ex: 'deepseek-chat', 'gpt-4o').
             prompt:             Texto de entrada.
             max_tokens:         Limite de tokens na resposta.
             endpoint:           Endpoint customizado (legado, não recomendado).
             preferred_provider: Alias do provider preferencial.
+            system:             Instruções/contexto estáveis, enviados como
+                                segmento separado e cacheável pelo provider.
 
         Returns:
             Resposta gerada pelo primeiro provider bem-sucedido.
         """
-        print(f"[SynAI] call_model: '{model}'")
+        if self.cache is None:
+            return await self._route_model(model, prompt, max_tokens, preferred_provider, system)
+
+        key = cache_key("generate", model, prompt, max_tokens, preferred_provider, self.policy,
+                        *((system,) if system else ()))
+        with trace_span("cache lookup", **{"synai.model": model}) as span:
+            cached = await self.cache.get(key)
+            span.set(**{"synai.cache_hit": cached is not None})
+        if cached is not None:
+            self.metrics.cache.inc("generate", "hit")
+            profile_instant(f"cache hit {model}", "cache", kind="generate")
+            logger.debug("call_model: '%s' servido do cache", model)
+            return GenerationResult(cached, Usage())
+        self.metrics.cache.inc("generate", "miss")
+        result = await self._route_model(model, prompt, max_tokens, preferred_provider, system)
+        # Só gerações reais viram cache (mocks e mensagens de falha são str simples)
+        if isinstance(result, GenerationResult):
+            await self.cache.set(key, str(result))
+        return result
+
+    async def _route_model(self, model: str, prompt: str, max_tokens: int,
+                           preferred_provider: Optional[str], system: Optional[str] = None) -> str:
+        """Corpo de call_model: perfis, policy e a cadeia de fallback."""
+        logger.debug("call_model: '%s'", model)
 
         # ── Detecção de perfil: 'best-coder', 'auto', etc. ──────────────────
         if is_profile(model):
-            return await self._call_profile(model, prompt, max_tokens)
-
-        self._dispatch_event("routing_start", {
-            "model": model,
-            "type": "single",
-            "prompt": prompt[:150] + "..." if len(prompt) > 150 else prompt
-        })
-
-        # Resolver nome amigavel do registry para real slug
-        registry_entry = resolve_model(model)
-        if registry_entry:
-            inferred, real_model = registry_entry
-        else:
-            inferred = _infer_provider(model)
-            real_model = model
-
-        # ── Option B: policy FREE sempre prevalece ──────────────────────────
-        # Se o provider nativo do modelo e bloqueado pela policy, substitui
-        # o slug pelo melhor modelo gratuito equivalente.
-        if inferred and not self._is_allowed_by_policy(inferred):
-            if self.policy in {"local", "sovereign"}:
-                # Local: usa Ollama com llama3 como fallback soberano
-                real_model = "llama3"
-                inferred = "ollama"
-                print(f"   [POLICY:{self.policy}] '{model}' bloqueado. Usando 'llama3' (ollama).")
-            else:
-                # Free/cheapest: substitui pelo melhor modelo OpenRouter :free
-                real_model = RouterEngine.get_free_model("geral")
-                inferred = "openrouter"
-                print(f"   [POLICY:{self.policy}] '{model}' bloqueado. Usando '{real_model}' (openrouter:free).")
-            self._dispatch_event("routing_policy_override", {
-                "original_model": model,
-                "policy": self.policy,
-                "substituted_model": real_model,
-                "substituted_provider": inferred,
-            })
-
-        # Montar lista de candidatos via RouterEngine (respeita a policy ativa)
-        candidates = self._build_candidate_chain(preferred_provider, inferred)
-
-        for alias in candidates:
-            driver = self.llm_providers.get(alias)
-            if not driver or (hasattr(driver, 'is_available') and not driver.is_available()):
-                self._dispatch_event("routing_skip", {
+            return await self._call_profile(model, prompt, max_tokens, system)
+
+        with trace_span(f"call_model {model}", **{"synai.model": model, "synai.routing": "single",
+                                                   "synai.policy": self.policy}) as route:
+            # Payloads de telemetria só são montados se a chamada for observada
+            observe = self.telemetry.sample()
+            emit = self.telemetry.emit
+            if observe:
+                emit("routing_start", {
                     "model": model,
-                    "provider": alias,
-                    "reason": "Driver not registered" if not driver else "Missing API key"
+                    "type": "single",
+                    "prompt": _clip(prompt),
                 })
-                if driver:
-                     print(f"   [SKIP] '{alias}' sem API key - pulando.")
-                continue
 
-            try:
-                self._dispatch_event("routing_try", {
-                    "model": model,
-                    "provider": alias,
-                    "slug": real_model
-                })
-                print(f"   >> Tentando '{alias}' (slug: '{real_model}')...")
-                result = await driver.generate(prompt=prompt, model=real_model, max_tokens=max_tokens)
-                self._dispatch_event("routing_success", {
-                    "model": model,
-                    "provider": alias,
-                    "response": result[:150] + "..." if len(result) > 150 else result
-                })
-                print(f"   OK Resposta via '{alias}'.")
-                return result
-            except Exception as e:
-                self._dispatch_event("routing_fail", {
-                    "model": model,
-                    "provider": alias,
-                    "error": f"{type(e).__name__}: {e}"
-                })
-                print(f"   FAIL '{alias}' falhou: {type(e).__name__}: {e}. Proximo...")
+            # Resolver nome amigavel do registry para real slug
+            registry_entry = resolve_model(model)
+            if registry_entry:
+                inferred, real_model = registry_entry
+            else:
+                inferred = _infer_provider(model)
+                real_model = model
+
+            # ── Option B: policy FREE sempre prevalece ──────────────────────────
+            # Se o provider nativo do modelo e bloqueado pela policy, substitui
+            # o slug pelo melhor modelo gratuito equivalente.
+            if inferred and not self._is_allowed_by_policy(inferred):
+                if self.policy in {"local", "sovereign"}:
+                    # Local: usa Ollama com llama3 como fallback soberano
+                    real_model = "llama3"
+                    inferred = "ollama"
+                else:
+                    # Free/cheapest: substitui pelo melhor modelo OpenRouter :free
+                    real_model = RouterEngine.get_free_model("geral")
+                    inferred = "openrouter"
+                logger.debug("[POLICY:%s] '%s' bloqueado. Usando '%s' (%s).", self.policy, model, real_model, inferred)
+                if observe:
+                    emit("routing_policy_override", {
+                        "original_model": model,
+                        "policy": self.policy,
+                        "substituted_model": real_model,
+                        "substituted_provider": inferred,
+                    })
+
+            # Montar lista de candidatos via RouterEngine (respeita a policy ativa)
+            candidates = self._build_candidate_chain(preferred_provider, inferred)
+
+            ledger = current_ledger()
+            full_prompt = f"{system}\n{prompt}" if system else prompt
+            failed_attempts = budget_skips = 0
+            for alias in candidates:
+                driver = self.llm_providers.get(alias)
+                if not driver or (hasattr(driver, 'is_available') and not driver.is_available()):
+                    self.metrics.skips.inc(alias, "missing_key" if driver else "not_registered")
+                    if observe:
+                        emit("routing_skip", {
+                            "model": model,
+                            "provider": alias,
+                            "reason": "Driver not registered" if not driver else "Missing API key"
+                        })
+                    route.add_event("skip", provider=alias,
+                                    reason="missing_key" if driver else "not_registered")
+                    profile_instant(f"skip {alias}", "routing", model=model,
+                                    reason="missing_key" if driver else "not_registered")
+                    if driver:
+                        logger.debug("[SKIP] '%s' sem API key - pulando.", alias)
+                    continue
 
-        # Todos os providers falharam
-        self._dispatch_event("routing_failed_all", {"model": model})
-        if not self.real:
-            return f"MOCK_RESPONSE({model}): {prompt[:40]}..."
-        return f"Todos os providers falharam para o modelo '{model}'."
+                if ledger is not None and not ledger.allows(alias, real_model, full_prompt, max_tokens):
+                    budget_skips += 1
+                    self.metrics.skips.inc(alias, "budget")
+                    route.add_event("skip", provider=alias, reason="budget")
+                    profile_instant(f"skip {alias}", "routing", model=model, reason="budget")
+                    if observe:
+                        emit("routing_skip", {"model": model, "provider": alias, "reason": "Over budget"})
+                    logger.debug("[SKIP] '%s' estouraria o budget - pulando.", alias)
+                    continue
+
+                if self.quota is not None and not await self.quota.acquire(alias, estimate_tokens(full_prompt) + max_tokens):
+                    self.metrics.skips.inc(alias, "quota")
+                    route.add_event("skip", provider=alias, reason="quota")
+                    profile_instant(f"skip {alias}", "routing", model=model, reason="quota")
+                    if observe:
+                        emit("routing_skip", {"model": model, "provider": alias, "reason": "Quota exhausted"})
+                    logger.debug("[SKIP] '%s' sem quota disponivel - pulando.", alias)
+                    continue
+
+                try:
+                    if observe:
+                        emit("routing_try", {
+                            "model": model,
+                            "provider": alias,
+                            "slug": real_model
+                        })
+                    logger.debug(">> Tentando '%s' (slug: '%s')...", alias, real_model)
+                    result = await self._attempt(driver, alias, real_model, prompt, max_tokens, system)
+                    self.metrics.calls.inc("model", "fallback" if failed_attempts else "first_try")
+                    route.set(**{"synai.provider": alias, "synai.slug": real_model,
+                                 "synai.failed_attempts": failed_attempts})
+                    if observe:
+                        emit("routing_success", {
+                            "model": model,
+                            "provider": alias,
+                            "response": _clip(result)
+                        })
+                    logger.debug("OK Resposta via '%s'.", alias)
+                    return result
+                except Exception as e:
+                    failed_attempts += 1
+                    if observe:
+                        emit("routing_fail", {
+                            "model": model,
+                            "provider": alias,
+                            "error": f"{type(e).__name__}: {e}"
+                        })
+                    logger.info("'%s' falhou: %s: %s. Proximo...", alias, type(e).__name__, e)
+
+            # Todos os providers falharam
+            self.metrics.calls.inc("model", "failed")
+            route.set_status(STATUS_ERROR, "all providers failed")
+            if observe:
+                emit("routing_failed_all", {"model": model})
+            if budget_skips:
+                raise BudgetExceededError(model, ledger.budget, ledger.cost_usd)
+            if not self.real:
+                return f"MOCK_RESPONSE({model}): {prompt[:40]}..."
+            logger.warning(f"{_ALL_FAILED} para o modelo '{model}'.")
+            return f"{_ALL_FAILED} para o modelo '{model}'."
+
+    async def _attempt(self, driver, alias: str, slug: str, prompt: str, max_tokens: int,
+                       system: Optional[str] = None, **span_args) -> str:
+        """
+        Uma tentativa de geração: span do profiler, contadores, latência, gauge
+        em voo e contabilidade de tokens/custo no ledger do workflow.
+        """
+        # 'system' só é repassado quando existe: drivers de terceiros sem o parâmetro seguem funcionando
+        extra = {"system": system} if system else {}
+        metrics = self.metrics
+        metrics.attempts.inc(alias, slug)
+        metrics.in_flight.inc(alias)
+        started = time.perf_counter()
+        try:
+            with trace_span(f"attempt {alias}:{slug}", **{"gen_ai.system": alias, "gen_ai.request.model": slug,
+                                                          "gen_ai.request.max_tokens": max_tokens}) as traced, \
+                    profile_span(f"{alias}:{slug}", "provider", provider=alias, slug=slug, **span_args) as attempt:
+                result = await driver.generate(prompt=prompt, model=slug, max_tokens=max_tokens, **extra)
+                attempt.set(outcome="ok")
+                usage = getattr(result, "usage", None)
+                if usage is not None:
+                    traced.set(**{"gen_ai.usage.input_tokens": usage.prompt_tokens,
+                                  "gen_ai.usage.output_tokens": usage.completion_tokens,
+                                  "gen_ai.usage.cache_read_input_tokens": usage.cached_tokens})
+                traced.set(**{"synai.outcome": "ok"})
+        except Exception as e:
+            reason = metrics.failure_reason(e)
+            metrics.failures.inc(alias, slug, reason)
+            if reason == "http_429" and self.quota is not None:
+                await self.quota.throttled(alias)
+            raise
+        finally:
+            metrics.latency.observe(alias, slug, seconds=time.perf_counter() - started)
+            metrics.in_flight.dec(alias)
+        metrics.successes.inc(alias, slug)
+
+        full_prompt = f"{system}\n{prompt}" if system else prompt
+        if usage is None:
+            usage = Usage(estimate_tokens(full_prompt), estimate_tokens(result), estimated=True)
+            result = GenerationResult(result, usage)
+        if self.quota is not None:
+            self.quota.record(alias, estimate_tokens(full_prompt) + max_tokens, usage.total_tokens)
+        price = get_model_price(alias, slug)
+        metrics.tokens.inc(alias, slug, "prompt", amount=usage.prompt_tokens)
+        metrics.tokens.inc(alias, slug, "completion", amount=usage.completion_tokens)
+        if usage.cached_tokens:
+            metrics.tokens.inc(alias, slug, "cached", amount=usage.cached_tokens)
+        if price:
+            metrics.cost.inc(alias, slug, amount=usage_cost(alias, price, usage))
+        ledger = current_ledger()
+        if ledger is not None:
+            ledger.record(alias, slug, usage, price)
+        return result
 
     # ─────────────────────────────────────────────────────────────────────────
     # CALL PROFILE — Roteamento por Perfil Semântico
@@ -445,6 +1212,7 @@ class SynRuntime:
         profile: str,
         prompt: str,
         max_tokens: int = 1024,
+        system: Optional[str] = None,
     ) -> str:
         """
         Itera pelos modelos de um perfil (ex: 'best-coder') em ordem de prioridade,
@@ -455,99 +1223,154 @@ class SynRuntime:
             2. Se não estiver no registry, trata como slug direto e infere o provider
             3. Verifica se o driver está disponível (API key configurada)
             4. Tenta gerar; em falha, avança para o próximo
-        """
-        model_list = get_profile_models(profile)
-        print(f"[SynAI][PROFILE] '{profile}' -> {len(model_list)} modelos candidatos (policy='{self.policy}')")
-
-        self._dispatch_event("routing_start", {
-            "model": profile,
-            "type": "profile",
-            "policy": self.policy,
-            "prompt": prompt[:150] + "..." if len(prompt) > 150 else prompt
-        })
-
-        for friendly_name in model_list:
-            # Resolver: nome amigavel ou slug direto
-            registry_entry = resolve_model(friendly_name)
-            if registry_entry:
-                provider_alias, api_slug = registry_entry
-            else:
-                api_slug = friendly_name
-                provider_alias = _infer_provider(friendly_name)
-
-            if not provider_alias:
-                self._dispatch_event("routing_skip", {
-                    "model": profile,
-                    "friendly_name": friendly_name,
-                    "provider": "unknown",
-                    "reason": "No provider inferred"
-                })
-                print(f"   [PROFILE] '{friendly_name}' sem provider inferido — pulando.")
-                continue
 
-            # ── Option B: policy FREE sempre prevalece ──────────────────────
-            if not self._is_allowed_by_policy(provider_alias):
-                self._dispatch_event("routing_skip", {
+        Modelos locais já carregados no Ollama são tentados antes dos frios
+        vizinhos na lista, e os não instalados são pulados.
+        """
+        with trace_span(f"call_model {profile}", **{"synai.model": profile, "synai.routing": "profile",
+                                                     "synai.policy": self.policy}) as route:
+            model_list, installed = await self._order_local_models(get_profile_models(profile))
+            logger.debug("[PROFILE] '%s' -> %d modelos candidatos (policy='%s')", profile, len(model_list), self.policy)
+
+            observe = self.telemetry.sample()
+            emit = self.telemetry.emit
+            if observe:
+                emit("routing_start", {
                     "model": profile,
-                    "friendly_name": friendly_name,
-                    "provider": provider_alias,
-                    "reason": f"Blocked by policy '{self.policy}'"
+                    "type": "profile",
+                    "policy": self.policy,
+                    "prompt": _clip(prompt),
                 })
-                print(f"   [PROFILE][POLICY:{self.policy}] '{friendly_name}' ({provider_alias}) bloqueado — pulando.")
-                continue
 
-            driver = self.llm_providers.get(provider_alias)
-            if not driver:
-                self._dispatch_event("routing_skip", {
-                    "model": profile,
-                    "friendly_name": friendly_name,
-                    "provider": provider_alias,
-                    "reason": "Driver not registered"
-                })
-                print(f"   [PROFILE] Provider '{provider_alias}' nao registrado — pulando '{friendly_name}'.")
-                continue
+            ledger = current_ledger()
+            full_prompt = f"{system}\n{prompt}" if system else prompt
+            failed_attempts = budget_skips = 0
+            for friendly_name in model_list:
+                # Resolver: nome amigavel ou slug direto
+                registry_entry = resolve_model(friendly_name)
+                if registry_entry:
+                    provider_alias, api_slug = registry_entry
+                else:
+                    api_slug = friendly_name
+                    provider_alias = _infer_provider(friendly_name)
+
+                if not provider_alias:
+                    reason, code = "No provider inferred", "no_provider"
+                # ── Option B: policy FREE sempre prevalece ──────────────────────
+                elif not self._is_allowed_by_policy(provider_alias):
+                    reason, code = f"Blocked by policy '{self.policy}'", "policy"
+                elif provider_alias not in self.llm_providers:
+                    reason, code = "Driver not registered", "not_registered"
+                elif provider_alias == "ollama" and installed and model_tag(api_slug) not in installed:
+                    reason, code = "Not installed", "not_installed"
+                else:
+                    driver = self.llm_providers[provider_alias]
+                    reason = None
+                    if hasattr(driver, 'is_available') and not driver.is_available():
+                        reason, code = "Missing API key", "missing_key"
+                    elif ledger is not None and not ledger.allows(provider_alias, api_slug, full_prompt, max_tokens):
+                        reason, code = "Over budget", "budget"
+                        budget_skips += 1
+                    elif self.quota is not None and not await self.quota.acquire(
+                            provider_alias, estimate_tokens(full_prompt) + max_tokens):
+                        reason, code = "Quota exhausted", "quota"
+
+                if reason:
+                    self.metrics.skips.inc(provider_alias or "unknown", code)
+                    route.add_event("skip", provider=provider_alias or "unknown", model=friendly_name, reason=code)
+                    profile_instant(f"skip {friendly_name}", "routing", profile=profile, reason=code)
+                    if observe:
+                        emit("routing_skip", {
+                            "model": profile,
+                            "friendly_name": friendly_name,
+                            "provider": provider_alias or "unknown",
+                            "reason": reason
+                        })
+                    logger.debug("[PROFILE] '%s' (%s): %s — pulando.", friendly_name, provider_alias or "unknown", reason)
+                    continue
 
-            if hasattr(driver, 'is_available') and not driver.is_available():
-                self._dispatch_event("routing_skip", {
-                    "model": profile,
-                    "friendly_name": friendly_name,
-                    "provider": provider_alias,
-                    "reason": "Missing API key"
-                })
-                print(f"   [PROFILE] '{provider_alias}' sem API key — pulando '{friendly_name}'.")
+                try:
+                    if observe:
+                        emit("routing_try", {
+                            "model": profile,
+                            "friendly_name": friendly_name,
+                            "provider": provider_alias,
+                            "slug": api_slug
+                        })
+                    logger.debug("[PROFILE] Tentando '%s' via '%s' (slug: %s)...", friendly_name, provider_alias, api_slug)
+                    result = await self._attempt(driver, provider_alias, api_slug, prompt, max_tokens, system,
+                                                 profile=profile)
+                    self.metrics.calls.inc("profile", "fallback" if failed_attempts else "first_try")
+                    route.set(**{"synai.provider": provider_alias, "synai.slug": api_slug,
+                                 "synai.failed_attempts": failed_attempts})
+                    if observe:
+                        emit("routing_success", {
+                            "model": profile,
+                            "friendly_name": friendly_name,
+                            "provider": provider_alias,
+                            "response": _clip(result)
+                        })
+                    logger.debug("[PROFILE] OK via '%s' (%s).", friendly_name, provider_alias)
+                    return result
+                except Exception as e:
+                    failed_attempts += 1
+                    if observe:
+                        emit("routing_fail", {
+                            "model": profile,
+                            "friendly_name": friendly_name,
+                            "provider": provider_alias,
+                            "error": f"{type(e).__name__}: {e}"
+                        })
+                    logger.info("[PROFILE] '%s' falhou: %s: %s. Proximo...", friendly_name, type(e).__name__, e)
+
+            # Todos os modelos do perfil falharam
+            self.metrics.calls.inc("profile", "failed")
+            route.set_status(STATUS_ERROR, "all profile models failed")
+            if observe:
+                emit("routing_failed_all", {"model": profile})
+            if budget_skips:
+                raise BudgetExceededError(profile, ledger.budget, ledger.cost_usd)
+            if not self.real:
+                return f"MOCK_PROFILE({profile}): {prompt[:40]}..."
+            logger.warning(f"{_PROFILE_FAILED} '{profile}' falharam.")
+            return f"{_PROFILE_FAILED} '{profile}' falharam."
+
+    async def _order_local_models(self, model_list: List[str]) -> Tuple[List[str], set]:
+        """
+        Modelos Ollama já carregados passam à frente dos frios no mesmo trecho
+        contíguo de modelos locais do perfil — trocar de modelo no Ollama custa
+        segundos. Retorna a lista reordenada e os modelos instalados (vazio se
+        o Ollama não respondeu ou o perfil não tem modelos locais).
+        """
+        driver = self.llm_providers.get("ollama")
+        if driver is None or not hasattr(driver, 'running_models') or not self._is_allowed_by_policy("ollama"):
+            return model_list, set()
+        slugs = {}
+        for friendly_name in model_list:
+            alias, slug = resolve_model(friendly_name) or (_infer_provider(friendly_name), friendly_name)
+            if alias == "ollama":
+                slugs[friendly_name] = model_tag(slug)
+        if not slugs:
+            return model_list, set()
+
+        state = self.ollama_state
+        if state is None or state.driver is not driver:
+            state = self.ollama_state = OllamaState(driver)
+        running, installed = await asyncio.gather(state.running(), state.installed())
+        ordered: List[str] = []
+        block: List[str] = []
+        for friendly_name in model_list + [None]:
+            if friendly_name in slugs:
+                block.append(friendly_name)
                 continue
-
-            try:
-                self._dispatch_event("routing_try", {
-                    "model": profile,
-                    "friendly_name": friendly_name,
-                    "provider": provider_alias,
-                    "slug": api_slug
-                })
-                print(f"   [PROFILE] Tentando '{friendly_name}' via '{provider_alias}' (slug: {api_slug})...")
-                result = await driver.generate(prompt=prompt, model=api_slug, max_tokens=max_tokens)
-                self._dispatch_event("routing_success", {
-                    "model": profile,
-                    "friendly_name": friendly_name,
-                    "provider": provider_alias,
-                    "response": result[:150] + "..." if len(result) > 150 else result
-                })
-                print(f"   [PROFILE] OK via '{friendly_name}' ({provider_alias}).")
-                return result
-            except Exception as e:
-                self._dispatch_event("routing_fail", {
-                    "model": profile,
-                    "friendly_name": friendly_name,
-                    "provider": provider_alias,
-                    "error": f"{type(e).__name__}: {e}"
-                })
-                print(f"   [PROFILE] '{friendly_name}' falhou: {type(e).__name__}: {e}. Proximo...")
-
-        # Todos os modelos do perfil falharam
-        self._dispatch_event("routing_failed_all", {"model": profile})
-        if not self.real:
-            return f"MOCK_PROFILE({profile}): {prompt[:40]}..."
-        return f"Todos os modelos do perfil '{profile}' falharam."
+            # sort estável: entre residentes (e entre frios) vale a ordem do perfil
+            ordered.extend(sorted(block, key=lambda name: slugs[name] not in running))
+            block = []
+            if friendly_name is not None:
+                ordered.append(friendly_name)
+        if ordered != model_list:
+            logger.debug("[PROFILE] Modelos locais residentes primeiro: %s", ordered)
+        return ordered, installed
 
     # ─────────────────────────────────────────────────────────────────────────
     # EMBEDDINGS — RAG Support
@@ -556,7 +1379,23 @@ class SynRuntime:
         """
         Gera vetor de embedding via drivers disponíveis.
         Preferência: google → ollama → qualquer driver com get_embedding.
+        Com self.cache definido, embeddings já calculados voltam do cache.
         """
+        if self.cache is None:
+            return await self._embed(text)
+        key = cache_key("embedding", text)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            self.metrics.cache.inc("embedding", "hit")
+            profile_instant("cache hit embedding", "cache", kind="embedding")
+            return cached
+        self.metrics.cache.inc("embedding", "miss")
+        emb = await self._embed(text)
+        if emb:
+            await self.cache.set(key, emb)
+        return emb
+
+    async def _embed(self, text: str) -> Optional[list]:
         preferred_for_embed = ["google", "ollama"]
 
         for alias in preferred_for_embed:
@@ -567,7 +1406,7 @@ class SynRuntime:
                     if emb:
                         return emb
                 except Exception as e:
-                    print(f"⚠️ Embedding via '{alias}' falhou: {e}")
+                    logger.info(f"Embedding via '{alias}' falhou: {e}")
 
         # Fallback: qualquer outro driver que suporte embeddings
         for alias, driver in self.llm_providers.items():
@@ -581,7 +1420,7 @@ class SynRuntime:
                 except Exception:
                     continue
 
-        print("❌ Nenhum driver de embedding encontrado.")
+        logger.warning("Nenhum driver de embedding encontrado.")
         return None
 
 
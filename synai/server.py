@@ -0,0 +1,302 @@
+"""
+SynAI — Servidor de Workflows (synai serve)
+============================================
+
+Mantém um único SynRuntime aquecido (drivers registrados, pools de conexão
+abertos) e os workflows linked pré-carregados em memória. Cada execução
+chega por HTTP local (TCP ou Unix socket) e os resultados de cada intent são
+devolvidos em streaming (NDJSON) à medida que terminam.
+
+Endpoints:
+    GET  /health     → {"status": "ok", "workflows": [...]}
+    GET  /workflows  → lista de workflows carregados
+    GET  /metrics    → métricas de roteamento (Prometheus text format);
+                       /metrics?format=json devolve rt.metrics.snapshot()
+    POST /run        → {"workflow": "...", "inputs": {...}, "budget": 0.05}
+                       (header 'traceparent' opcional: continua o trace do chamador)
+                       Resposta chunked, uma linha JSON por evento:
+                         {"event": "intent", "intent": ..., "agent": ..., "output": ...}
+                         {"event": "completed", "status": ..., "flow": {...}, "usage": {...}}
+
+Uso:
+    synai serve out/demo_linked.synx --port 8765
+    curl -N -X POST localhost:8765/run -d '{"inputs": {"data.txt": "..."}}'
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from .runtime import SynRuntime
+from .weaver import load_linked
+
+logger = logging.getLogger("SynAI.Server")
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# HTTP mínimo sobre asyncio streams
+# ─────────────────────────────────────────────────────────────────────────────
+async def read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    """
+    Lê uma requisição HTTP/1.1 do stream.
+
+    Returns:
+        (method, path, headers, body) ou None se a conexão foi fechada.
+    """
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    parts = request_line.decode('latin-1').strip().split()
+    if len(parts) < 2:
+        raise ValueError("Linha de requisição inválida")
+    method, path = parts[0].upper(), parts[1]
+
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if not line or line in (b"\r\n", b"\n"):
+            break
+        key, _, value = line.decode('latin-1').partition(":")
+        headers[key.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", "0") or 0)
+    if length > MAX_BODY_BYTES:
+        raise OverflowError(length)
+    body = await reader.readexactly(length) if length else b""
+    return method, path, headers, body
+
+
+def _status_line(status: int) -> str:
+    return f"HTTP/1.1 {status} {_REASONS.get(status, 'Unknown')}\r\n"
+
+
+async def send_json(
+    writer: asyncio.StreamWriter,
+    status: int,
+    payload: Any,
+    headers: Optional[Dict[str, str]] = None,
+) -> None:
+    """Envia uma resposta JSON completa (Content-Length)."""
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    head = _status_line(status)
+    head += "Content-Type: application/json\r\n"
+    for key, value in (headers or {}).items():
+        head += f"{key}: {value}\r\n"
+    head += f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n"
+    writer.write(head.encode('latin-1') + body)
+    await writer.drain()
+
+
+async def send_text(
+    writer: asyncio.StreamWriter,
+    status: int,
+    text: str,
+    content_type: str = "text/plain; charset=utf-8",
+) -> None:
+    """Envia uma resposta de texto completa (Content-Length)."""
+    body = text.encode('utf-8')
+    head = _status_line(status)
+    head += f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n"
+    writer.write(head.encode('latin-1') + body)
+    await writer.drain()
+
+
+async def start_chunked(writer: asyncio.StreamWriter, content_type: str = "application/x-ndjson") -> None:
+    """Inicia uma resposta 200 com Transfer-Encoding: chunked."""
+    head = _status_line(200)
+    head += f"Content-Type: {content_type}\r\nTransfer-Encoding: chunked\r\nConnection: keep-alive\r\n\r\n"
+    writer.write(head.encode('latin-1'))
+    await writer.drain()
+
+
+async def send_chunk(writer: asyncio.StreamWriter, data: bytes) -> None:
+    """Envia um chunk (vazio = fim da resposta)."""
+    writer.write(f"{len(data):X}\r\n".encode('latin-1') + data + b"\r\n")
+    await writer.drain()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SynServer
+# ─────────────────────────────────────────────────────────────────────────────
+class SynServer:
+    """
+    Servidor de longa duração que executa workflows pré-carregados
+    sobre um único SynRuntime.
+    """
+
+    def __init__(
+        self,
+        runtime: SynRuntime,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        unix_socket: Optional[str] = None,
+    ):
+        self.runtime = runtime
+        self.host = host
+        self.port = port
+        self.unix_socket = unix_socket
+        self.workflows: Dict[str, Dict[str, Any]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    # ── Workflows ────────────────────────────────────────────────────────────
+    def load(self, linked_path: str, name: Optional[str] = None) -> str:
+        """
+        Pré-carrega um arquivo linked. Retorna o nome sob o qual o workflow
+        fica disponível (padrão: nome do workflow declarado no 'run').
+        """
+        ast, run_decl = load_linked(linked_path)
+        key = name or run_decl['workflow']
+        if key in self.workflows:
+            key = os.path.splitext(os.path.basename(linked_path))[0]
+        self.workflows[key] = {"ast": ast, "run_decl": run_decl, "source": linked_path}
+        logger.info(f"Workflow '{key}' carregado de {linked_path}")
+        return key
+
+    def _select(self, name: Optional[str]) -> Optional[Dict[str, Any]]:
+        if name:
+            return self.workflows.get(name)
+        if len(self.workflows) == 1:
+            return next(iter(self.workflows.values()))
+        return None
+
+    # ── Ciclo de vida ────────────────────────────────────────────────────────
+    async def start(self) -> None:
+        """Abre o socket de escuta (TCP ou Unix)."""
+        if self.unix_socket:
+            if os.path.exists(self.unix_socket):
+                os.unlink(self.unix_socket)
+            self._server = await asyncio.start_unix_server(self._handle, path=self.unix_socket)
+            logger.info(f"Escutando em unix:{self.unix_socket}")
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+            logger.info(f"Escutando em http://{self.host}:{self.port}")
+
+    async def serve_forever(self) -> None:
+        if not self._server:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self) -> None:
+        """Fecha o socket e os pools de conexão do runtime."""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self.unix_socket and os.path.exists(self.unix_socket):
+            os.unlink(self.unix_socket)
+        await self.runtime.aclose()
+
+    # ── Conexões ─────────────────────────────────────────────────────────────
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except OverflowError:
+                    await send_json(writer, 413, {"error": "payload too large"})
+                    break
+                except (ValueError, asyncio.IncompleteReadError):
+                    await send_json(writer, 400, {"error": "bad request"})
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                await self._route(method, path, headers, body, writer)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        except Exception as e:
+            logger.error(f"Erro na conexão: {type(e).__name__}: {e}")
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, headers: Dict[str, str], body: bytes,
+                     writer: asyncio.StreamWriter) -> None:
+        path, _, query = path.partition("?")
+        if path == "/health":
+            await send_json(writer, 200, {"status": "ok", "workflows": sorted(self.workflows)})
+        elif path == "/workflows":
+            await send_json(writer, 200, {
+                name: {"orchestrator": wf["run_decl"]["orchestrator"],
+                       "workflow": wf["run_decl"]["workflow"],
+                       "source": wf["source"]}
+                for name, wf in self.workflows.items()
+            })
+        elif path == "/metrics":
+            if "format=json" in query:
+                await send_json(writer, 200, self.runtime.metrics.snapshot())
+            else:
+                await send_text(writer, 200, self.runtime.metrics.to_prometheus(),
+                                "text/plain; version=0.0.4; charset=utf-8")
+        elif path == "/run":
+            if method != "POST":
+                await send_json(writer, 405, {"error": "use POST"})
+                return
+            await self._run(body, writer, headers.get("traceparent"))
+        else:
+            await send_json(writer, 404, {"error": f"rota desconhecida: {path}"})
+
+    async def _run(self, body: bytes, writer: asyncio.StreamWriter, traceparent: Optional[str] = None) -> None:
+        try:
+            request = json.loads(body or b"{}")
+        except json.JSONDecodeError as e:
+            await send_json(writer, 400, {"error": f"JSON inválido: {e}"})
+            return
+        if not isinstance(request, dict):
+            await send_json(writer, 400, {"error": "o corpo deve ser um objeto JSON"})
+            return
+
+        wf = self._select(request.get("workflow"))
+        if not wf:
+            await send_json(writer, 404, {"error": "workflow não encontrado",
+                                          "workflows": sorted(self.workflows)})
+            return
+        inputs = request.get("inputs") or {}
+        if not isinstance(inputs, dict):
+            await send_json(writer, 400, {"error": "'inputs' deve ser um objeto JSON"})
+            return
+        budget = request.get("budget")
+        if budget is not None and not isinstance(budget, (int, float)):
+            await send_json(writer, 400, {"error": "'budget' deve ser um número (USD)"})
+            return
+
+        await start_chunked(writer)
+
+        async def emit(event: Dict[str, Any]) -> None:
+            line = json.dumps(event, ensure_ascii=False, default=str) + "\n"
+            await send_chunk(writer, line.encode('utf-8'))
+
+        try:
+            result = await self.runtime.execute_workflow(
+                wf["ast"], wf["run_decl"], mock=not self.runtime.real,
+                inputs=inputs,
+                on_result=lambda entry: emit({"event": "intent", **entry}),
+                budget=budget,
+                traceparent=traceparent,
+            )
+            completed = {"event": "completed", "status": result["status"], "flow": result["flow"],
+                         "usage": result["usage"]}
+            if "error" in result:
+                completed["error"] = result["error"]
+            await emit(completed)
+        except (ConnectionError, asyncio.CancelledError):
+            raise
+        except Exception as e:
+            logger.error(f"Falha no workflow: {type(e).__name__}: {e}")
+            await emit({"event": "error", "error": f"{type(e).__name__}: {e}"})
+        await send_chunk(writer, b"")
@@ -0,0 +1,236 @@
+"""
+SynAI — Barramento de Telemetria
+================================
+
+Os eventos de roteamento (routing_start, routing_try, routing_success...)
+deixam de ser entregues de forma síncrona dentro de call_model. O runtime só
+monta o payload quando há assinantes (e a chamada foi amostrada), enfileira
+um registro compacto em uma fila limitada e retorna; uma task de fundo entrega
+os eventos em lotes aos listeners, síncronos ou assíncronos.
+
+Se a fila estiver cheia o evento é descartado (contado em stats['dropped'])
+— a telemetria nunca bloqueia o caminho quente.
+
+Um listener é tratado como assíncrono pelo que devolve: se a chamada retorna
+um awaitable, ele é aguardado (vale para functools.partial de coroutines e
+objetos com __call__ async).
+
+Uso:
+    rt.add_event_listener(lambda name, payload: ...)          # um evento por vez
+    rt.add_event_listener(async_callback)                      # coroutine também
+    rt.add_event_listener(lambda events: ..., batch=True)      # lista de TelemetryEvent
+    rt.event_listeners.append(callback)                        # equivale a add_event_listener
+    rt.telemetry.sample_rate = 0.1                             # 10% das chamadas
+    await rt.flush_events()                                    # espera a entrega
+"""
+import asyncio
+import inspect
+import logging
+import random
+import time
+from collections.abc import MutableSequence
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger("SynAI.Telemetry")
+
+
+class TelemetryEvent(NamedTuple):
+    """Registro compacto de um evento de telemetria."""
+    name: str
+    ts: float
+    payload: Dict[str, Any]
+
+
+class _Listener(NamedTuple):
+    callback: Callable
+    batch: bool
+
+
+class ListenerList(MutableSequence):
+    """
+    Visão mutável dos callbacks de um TelemetryBus (SynRuntime.event_listeners):
+    append/remove/del alteram as assinaturas do barramento, com batch=False.
+    """
+
+    def __init__(self, bus: "TelemetryBus"):
+        self._bus = bus
+
+    def __getitem__(self, index):
+        callbacks = [l.callback for l in self._bus.listeners]
+        return callbacks[index]
+
+    def __setitem__(self, index, value) -> None:
+        listeners = list(self._bus.listeners)
+        if isinstance(index, slice):
+            listeners[index] = [_Listener(callback, False) for callback in value]
+        else:
+            listeners[index] = _Listener(value, False)
+        self._bus.listeners = listeners
+
+    def __delitem__(self, index) -> None:
+        listeners = list(self._bus.listeners)
+        del listeners[index]
+        self._bus.listeners = listeners
+
+    def __len__(self) -> int:
+        return len(self._bus.listeners)
+
+    def insert(self, index: int, value: Callable) -> None:
+        listeners = list(self._bus.listeners)
+        listeners.insert(index, _Listener(value, False))
+        self._bus.listeners = listeners
+
+    def __eq__(self, other) -> bool:
+        return list(self) == list(other) if isinstance(other, (list, ListenerList)) else NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class TelemetryBus:
+    """Fila limitada + entrega em lote, em background, para listeners de telemetria."""
+
+    def __init__(
+        self,
+        maxsize: int = 4096,
+        batch_size: int = 128,
+        sample_rate: float = 1.0,
+    ):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.sample_rate = sample_rate
+        self.listeners: List[_Listener] = []
+        self.stats = {"emitted": 0, "delivered": 0, "dropped": 0, "sampled_out": 0, "listener_errors": 0}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # ── Assinatura ───────────────────────────────────────────────────────────
+    def subscribe(self, callback: Callable, batch: bool = False) -> None:
+        """
+        Registra um listener.
+
+        Args:
+            callback: f(event_name, payload) — ou f(events) se batch=True.
+                      Pode ser uma função comum ou uma coroutine function.
+            batch:    Se True, recebe listas de TelemetryEvent.
+        """
+        self.listeners.append(_Listener(callback, batch))
+
+    def unsubscribe(self, callback: Callable) -> None:
+        self.listeners = [l for l in self.listeners if l.callback is not callback]
+
+    @property
+    def active(self) -> bool:
+        return bool(self.listeners)
+
+    def sample(self) -> bool:
+        """
+        Decide se uma operação de roteamento será observada.
+        False quando não há listeners — o chamador não monta payload algum.
+        """
+        if not self.listeners:
+            return False
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.stats["sampled_out"] += 1
+            return False
+        return True
+
+    # ── Emissão ──────────────────────────────────────────────────────────────
+    def emit(self, name: str, payload: Dict[str, Any]) -> None:
+        """Enfileira um evento sem bloquear. Fora de um event loop, entrega na hora."""
+        if not self.listeners:
+            return
+        event = TelemetryEvent(name, time.time(), payload)
+        self.stats["emitted"] += 1
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._deliver_sync([event])
+            return
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._start(loop)
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+
+    def _start(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._worker = loop.create_task(self._drain(self._queue))
+
+    async def _drain(self, queue: asyncio.Queue) -> None:
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            try:
+                await self._deliver(batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def _deliver(self, events: List[TelemetryEvent]) -> None:
+        for listener in list(self.listeners):
+            try:
+                if listener.batch:
+                    ret = listener.callback(events)
+                    if inspect.isawaitable(ret):
+                        await ret
+                else:
+                    for ev in events:
+                        ret = listener.callback(ev.name, ev.payload)
+                        if inspect.isawaitable(ret):
+                            await ret
+            except Exception as e:
+                self.stats["listener_errors"] += 1
+                logger.warning(f"Erro em listener de telemetria: {type(e).__name__}: {e}")
+        self.stats["delivered"] += len(events)
+
+    def _deliver_sync(self, events: List[TelemetryEvent]) -> None:
+        # Sem event loop não há como aguardar: listeners assíncronos ficam de fora
+        for listener in list(self.listeners):
+            if asyncio.iscoroutinefunction(listener.callback):
+                continue
+            try:
+                if listener.batch:
+                    _discard(listener.callback(events))
+                else:
+                    for ev in events:
+                        if _discard(listener.callback(ev.name, ev.payload)):
+                            break
+            except Exception as e:
+                self.stats["listener_errors"] += 1
+                logger.warning(f"Erro em listener de telemetria: {type(e).__name__}: {e}")
+        self.stats["delivered"] += len(events)
+
+    # ── Ciclo de vida ────────────────────────────────────────────────────────
+    async def flush(self) -> None:
+        """Aguarda a entrega de todos os eventos enfileirados neste loop."""
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+
+    async def aclose(self) -> None:
+        """Entrega o que restar e encerra a task de entrega."""
+        await self.flush()
+        worker, self._worker = self._worker, None
+        if worker is not None and self._loop is asyncio.get_running_loop():
+            worker.cancel()
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        self._queue = None
+        self._loop = None
+
+
+def _discard(ret: Any) -> bool:
+    """Fecha uma coroutine que não pode ser aguardada (evita o aviso 'never awaited')."""
+    if inspect.iscoroutine(ret):
+        ret.close()
+        return True
+    return False
@@ -0,0 +1,331 @@
+"""
+SynAI — Executores de Ferramentas
+=================================
+
+Ferramentas síncronas não rodam mais no event loop: uma função pesada ou
+bloqueante congelaria todas as chamadas de LLM e workflows concorrentes do
+processo. Cada ferramenta escolhe onde roda:
+
+    inline   no próprio event loop (funções triviais; coroutines sempre rodam aqui)
+    thread   num pool de threads compartilhado (padrão para funções síncronas)
+    process  num pool de processos com workers quentes (trabalho CPU-bound)
+
+Opções por ferramenta:
+    buffers          recebe dados grandes (BlobRef) como memoryview, sem cópia
+    max_concurrency  execuções simultâneas da ferramenta (as demais esperam)
+    timeout          prazo em segundos. Coroutines são canceladas. Em
+                     'process', o worker é morto e substituído por um novo.
+                     Em 'thread' a espera é abandonada, mas a thread não pode
+                     ser interrompida e segura a vaga de concorrência até
+                     terminar. Use 'process' quando o prazo precisa matar o
+                     trabalho. Funções 'inline' síncronas não têm prazo.
+
+Os workers de processo são persistentes: sobem todos juntos no primeiro uso,
+já importando os módulos das ferramentas registradas, e atendem chamadas
+seguidas sem novo spawn. Funções e inputs atravessam o processo via pickle:
+a função precisa ser importável (definida no nível de um módulo).
+
+Uso:
+    rt.register_tool("ocr", ocr_pdf, executor="process", timeout=60, max_concurrency=2)
+    rt.register_toolkit({"grep": grep_repo, "stat": stat_repo}, executor="thread")
+    agents { parser: TOOL { function: "ocr" executor: "process" timeout: "30s" } }
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import pickle
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .blobs import BlobRef
+
+logger = logging.getLogger("SynAI.Tools")
+
+EXECUTORS = ("inline", "thread", "process")
+
+
+class ToolTimeoutError(asyncio.TimeoutError):
+    """A ferramenta não terminou dentro do 'timeout' configurado."""
+
+    def __init__(self, tool: str, timeout: float):
+        super().__init__(f"Ferramenta '{tool}' excedeu {timeout}s.")
+        self.tool = tool
+        self.timeout = timeout
+
+
+class ToolWorkerError(RuntimeError):
+    """O worker de processo morreu durante a execução da ferramenta."""
+
+
+@dataclass(frozen=True)
+class ToolOptions:
+    """Onde e com quais limites uma ferramenta roda."""
+    executor: Optional[str] = None
+    max_concurrency: Optional[int] = None
+    timeout: Optional[float] = None
+    buffers: Optional[bool] = None
+
+    def __post_init__(self):
+        if self.executor is not None and self.executor not in EXECUTORS:
+            raise ValueError(f"executor inválido: '{self.executor}' (use {', '.join(EXECUTORS)})")
+        if self.max_concurrency is not None and self.max_concurrency < 1:
+            raise ValueError(f"max_concurrency inválido: {self.max_concurrency}")
+        if self.timeout is not None and self.timeout <= 0:
+            raise ValueError(f"timeout inválido: {self.timeout}")
+
+    @classmethod
+    def from_properties(cls, props: Dict[str, Any]) -> "ToolOptions":
+        """Opções declaradas nas propriedades de um agente TOOL do DSL (valores em texto)."""
+        timeout = props.get('timeout')
+        limit = props.get('max_concurrency')
+        buffers = props.get('buffers')
+        return cls(
+            executor=str(props['executor']) if props.get('executor') else None,
+            max_concurrency=int(limit) if limit else None,
+            timeout=float(str(timeout).strip().rstrip('s')) if timeout else None,
+            buffers=str(buffers).strip().lower() in ("true", "on", "yes") if buffers is not None else None,
+        )
+
+    def merged(self, override: "ToolOptions") -> "ToolOptions":
+        """Estas opções com os campos definidos em 'override' por cima."""
+        return replace(self, **{name: value for name, value in vars(override).items() if value is not None})
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# POOL DE PROCESSOS
+# ─────────────────────────────────────────────────────────────────────────────
+def _worker_main(conn) -> None:
+    """Loop de um worker: recebe (função, input), devolve ('ok', valor) ou ('error', texto)."""
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        except Exception as e:
+            # Falha ao desserializar (ex: módulo da ferramenta não importável no worker)
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+            continue
+        if task is None:
+            return
+        func, arg = task
+        if func is None:
+            # Aquecimento: desserializar as funções importa seus módulos
+            for blob in arg:
+                try:
+                    pickle.loads(blob)
+                except Exception as e:
+                    logger.debug("Pré-carga de ferramenta falhou no worker: %s", e)
+            conn.send(("ok", None))
+            continue
+        if isinstance(arg, BlobRef):
+            # Mapeia o mesmo arquivo do processo pai: o conteúdo não passa pelo pipe
+            arg = arg.buffer()
+        try:
+            conn.send(("ok", func(arg)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child,), name="synai-tool-worker", daemon=True)
+        self.process.start()
+        child.close()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5)
+        self.kill()
+
+
+class ProcessToolPool:
+    """
+    Workers de processo persistentes. Cada chamada ocupa um worker ocioso.
+    Um worker que estoura o prazo ou morre é descartado, e o próximo uso
+    sobe outro.
+    """
+
+    def __init__(self, size: Optional[int] = None):
+        self.size = size or os.cpu_count() or 2
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: List[_Worker] = []
+        self._busy = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._warming = threading.Lock()
+        self.killed = 0
+
+    @property
+    def workers(self) -> int:
+        return len(self._idle) + self._busy
+
+    def warm(self, funcs: Iterable[Callable[..., Any]] = ()) -> None:
+        """
+        Sobe os workers que faltam (todos em paralelo) e pré-carrega neles os
+        módulos de 'funcs'. Bloqueia até os workers estarem prontos.
+        """
+        preload = []
+        for func in funcs:
+            try:
+                preload.append(pickle.dumps(func))
+            except (pickle.PicklingError, AttributeError, TypeError):
+                pass
+        with self._warming:
+            fresh = [_Worker(self._ctx) for _ in range(self.size - self.workers)]
+            for worker in fresh:
+                worker.conn.send((None, preload))
+            for worker in fresh:
+                try:
+                    worker.conn.recv()
+                except (EOFError, OSError):
+                    worker.kill()
+                    continue
+                self._idle.append(worker)
+        logger.debug("Pool de processos aquecido: %d worker(s)", self.workers)
+
+    async def run(self, func: Callable[[Any], Any], arg: Any, timeout: Optional[float] = None,
+                  name: str = "") -> Any:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        async with self._slots:
+            worker = self._idle.pop() if self._idle else _Worker(self._ctx)
+            self._busy += 1
+            try:
+                try:
+                    worker.conn.send((func, arg))
+                except (pickle.PicklingError, AttributeError, TypeError) as e:
+                    self._idle.append(worker)
+                    raise ValueError(f"Ferramenta '{name}' não serializável para executor 'process': {e}")
+                reply = asyncio.get_running_loop().run_in_executor(None, worker.conn.recv)
+                try:
+                    status, value = await asyncio.wait_for(reply, timeout)
+                except asyncio.TimeoutError:
+                    self._discard(worker)
+                    raise ToolTimeoutError(name, timeout) from None
+                except asyncio.CancelledError:
+                    self._discard(worker)
+                    raise
+                except (EOFError, OSError):
+                    self._discard(worker)
+                    raise ToolWorkerError(f"Worker da ferramenta '{name}' terminou inesperadamente.")
+            finally:
+                self._busy -= 1
+            self._idle.append(worker)
+        if status == "error":
+            raise RuntimeError(value)
+        return value
+
+    def _discard(self, worker: _Worker) -> None:
+        worker.kill()
+        self.killed += 1
+
+    def close(self) -> None:
+        workers, self._idle = self._idle, []
+        for worker in workers:
+            worker.stop()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# EXECUTOR DE FERRAMENTAS
+# ─────────────────────────────────────────────────────────────────────────────
+class ToolExecutor:
+    """Despacha cada ferramenta para inline/thread/process com limite e prazo próprios."""
+
+    def __init__(self, threads: Optional[int] = None, processes: Optional[int] = None):
+        self._threads_size = threads
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self.processes = ProcessToolPool(processes)
+        self._limits: Dict[Tuple[str, int], asyncio.Semaphore] = {}
+        self._warm_funcs: Dict[str, Callable[..., Any]] = {}
+        self._warm_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def threads(self) -> ThreadPoolExecutor:
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(self._threads_size, thread_name_prefix="synai-tool")
+        return self._threads
+
+    def prepare(self, name: str, func: Callable[..., Any], options: ToolOptions) -> None:
+        """Valida as opções de uma ferramenta no registro e a inclui no aquecimento do pool."""
+        if options.executor == "process":
+            if asyncio.iscoroutinefunction(func):
+                raise ValueError(f"Ferramenta async '{name}' não roda em executor 'process'.")
+            self._warm_funcs[name] = func
+
+    async def run(self, name: str, func: Callable[..., Any], arg: Any, options: ToolOptions) -> Any:
+        """Executa func(arg) conforme 'options'. Estouro de prazo levanta ToolTimeoutError."""
+        limit = options.max_concurrency
+        if limit is None:
+            return await self._run(name, func, arg, options, [])
+        semaphore = self._limits.get((name, limit))
+        if semaphore is None:
+            semaphore = self._limits[(name, limit)] = asyncio.Semaphore(limit)
+        await semaphore.acquire()
+        stranded: List[Future] = []
+        try:
+            return await self._run(name, func, arg, options, stranded)
+        finally:
+            if stranded:
+                # A thread abandonada segue rodando: a vaga só volta quando ela terminar
+                loop = asyncio.get_running_loop()
+
+                def release(_):
+                    if not loop.is_closed():
+                        loop.call_soon_threadsafe(semaphore.release)
+                stranded[0].add_done_callback(release)
+            else:
+                semaphore.release()
+
+    async def _run(self, name: str, func: Callable[..., Any], arg: Any, options: ToolOptions,
+                   stranded: List[Future]) -> Any:
+        timeout = options.timeout
+        executor = options.executor or "thread"
+        if isinstance(arg, BlobRef) and executor != "process":
+            arg = arg.buffer()
+        if asyncio.iscoroutinefunction(func):
+            if timeout is None:
+                return await func(arg)
+            try:
+                return await asyncio.wait_for(func(arg), timeout)
+            except asyncio.TimeoutError:
+                raise ToolTimeoutError(name, timeout) from None
+        if executor == "inline":
+            return func(arg)
+        if executor == "process":
+            if self.processes.workers == 0:
+                if self._warm_lock is None:
+                    self._warm_lock = asyncio.Lock()
+                async with self._warm_lock:
+                    if self.processes.workers == 0:
+                        await asyncio.to_thread(self.processes.warm, self._warm_funcs.values())
+            return await self.processes.run(func, arg, timeout, name)
+        job = self.threads.submit(func, arg)
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job)), timeout)
+        except asyncio.TimeoutError:
+            if not job.cancel():  # só cancela se ainda não começou
+                stranded.append(job)
+            raise ToolTimeoutError(name, timeout) from None
+        except asyncio.CancelledError:
+            if not job.cancel():
+                stranded.append(job)
+            raise
+
+    def close(self) -> None:
+        """Encerra os workers de processo e o pool de threads (sem esperar threads presas)."""
+        self.processes.close()
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+            self._threads = None
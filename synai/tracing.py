@@ -0,0 +1,335 @@
+"""
+SynAI — Tracing compatível com OpenTelemetry
+============================================
+
+Spans opcionais ao longo de uma execução:
+
+    workflow <nome>                       execute_workflow
+      └─ intent <nome>                    _dispatch_to_adapter
+           └─ call_model <modelo|perfil>  call_model / _call_profile
+                └─ attempt <provider>:<slug>
+                     └─ HTTP POST         transporte httpx dos drivers (CLIENT)
+
+IDs seguem o formato W3C/OpenTelemetry (trace_id de 16 bytes, span_id de 8,
+em hex). O contexto vive em ContextVars — herdado pelas tasks asyncio — e o
+header `traceparent` é injetado nas requisições HTTP dos drivers e aceito em
+execute_workflow(traceparent=...), para que as chamadas de LLM apareçam
+dentro do trace do serviço que hospeda o SynAI.
+
+Sem tracer ativo, trace_span() devolve um context manager no-op.
+
+Exporters sem rede:
+    InMemoryExporter()          → spans em memória (testes)
+    JsonlExporter("spans.jsonl") → uma linha OTLP/JSON ({"resourceSpans": ...})
+                                   por lote, legível pelo receiver otlpjsonfile
+                                   do OpenTelemetry Collector
+
+Uso:
+    rt = SynRuntime(tracer=Tracer(JsonlExporter("spans.jsonl")))
+    await rt.execute_workflow(ast, run_decl, traceparent=request_headers.get("traceparent"))
+    synai run pipeline.synx --trace spans.jsonl
+"""
+import json
+import os
+import secrets
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Union
+
+SPAN_KIND_INTERNAL = "SPAN_KIND_INTERNAL"
+SPAN_KIND_CLIENT = "SPAN_KIND_CLIENT"
+SPAN_KIND_SERVER = "SPAN_KIND_SERVER"
+
+STATUS_UNSET = "STATUS_CODE_UNSET"
+STATUS_OK = "STATUS_CODE_OK"
+STATUS_ERROR = "STATUS_CODE_ERROR"
+
+
+class SpanContext:
+    """Identidade de um span (local ou remoto, vindo de um traceparent)."""
+
+    __slots__ = ("trace_id", "span_id", "sampled")
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool = True):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+    @classmethod
+    def from_traceparent(cls, header: Optional[str]) -> Optional["SpanContext"]:
+        """Interpreta um header W3C 'traceparent' (00-<trace>-<span>-<flags>)."""
+        if not header:
+            return None
+        parts = header.strip().split("-")
+        if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+            return None
+        try:
+            flags = int(parts[3][:2], 16)
+            int(parts[1], 16), int(parts[2], 16)
+        except ValueError:
+            return None
+        if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+            return None
+        return cls(parts[1], parts[2], bool(flags & 1))
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+class _NoopSpan:
+    """Span vazio usado quando não há tracer ativo."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attributes) -> None:
+        pass
+
+    def add_event(self, name: str, **attributes) -> None:
+        pass
+
+    def set_status(self, code: str, message: str = "") -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """Span de um Tracer; context manager que se torna o span corrente."""
+
+    __slots__ = ("tracer", "name", "kind", "context", "parent_id", "attributes", "events",
+                 "status_code", "status_message", "start_ns", "end_ns", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, kind: str, attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.context: Optional[SpanContext] = None
+        self.parent_id: Optional[str] = None
+        self.attributes = attributes
+        self.events: List[Dict[str, Any]] = []
+        self.status_code = STATUS_UNSET
+        self.status_message = ""
+        self.start_ns = 0
+        self.end_ns = 0
+        self._token = None
+
+    @property
+    def trace_id(self) -> str:
+        return self.context.trace_id
+
+    @property
+    def span_id(self) -> str:
+        return self.context.span_id
+
+    def set(self, **attributes) -> None:
+        """Adiciona atributos (ex: gen_ai.usage.input_tokens)."""
+        self.attributes.update(attributes)
+
+    def add_event(self, name: str, **attributes) -> None:
+        self.events.append({"name": name, "timeUnixNano": time.time_ns(), "attributes": attributes})
+
+    def set_status(self, code: str, message: str = "") -> None:
+        self.status_code = code
+        self.status_message = message
+
+    def __enter__(self) -> "Span":
+        parent = _current_span.get()
+        if parent is not None:
+            self.context = SpanContext(parent.trace_id, _new_span_id())
+            self.parent_id = parent.span_id
+        else:
+            self.context = SpanContext(_new_trace_id(), _new_span_id())
+        self._token = _current_span.set(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.status_code = STATUS_ERROR
+            self.status_message = f"{exc_type.__name__}: {exc}"
+            self.add_event("exception", **{"exception.type": exc_type.__name__,
+                                           "exception.message": str(exc)})
+        self.tracer._finish(self)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Representação plana, com os nomes de campo do OTLP/JSON."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": dict(self.attributes),
+            "events": list(self.events),
+            "status": {"code": self.status_code, "message": self.status_message},
+        }
+
+
+_current_tracer: ContextVar[Optional["Tracer"]] = ContextVar("synai_tracer", default=None)
+_current_span: ContextVar[Optional[Union[Span, SpanContext]]] = ContextVar("synai_trace_span", default=None)
+
+
+def _new_trace_id() -> str:
+    return secrets.token_hex(16)
+
+
+def _new_span_id() -> str:
+    return secrets.token_hex(8)
+
+
+def current_tracer() -> Optional["Tracer"]:
+    """Retorna o tracer ativo no contexto atual (ou None)."""
+    return _current_tracer.get()
+
+
+def current_traceparent() -> Optional[str]:
+    """Header traceparent do span corrente — para propagar a serviços externos."""
+    span_ = _current_span.get()
+    if span_ is None or _current_tracer.get() is None:
+        return None
+    context = span_.context if isinstance(span_, Span) else span_
+    return context.traceparent()
+
+
+def trace_span(name: str, kind: str = SPAN_KIND_INTERNAL, **attributes):
+    """Abre um span no tracer ativo; no-op se não houver tracer."""
+    tracer = _current_tracer.get()
+    if tracer is None:
+        return NOOP_SPAN
+    return Span(tracer, name, kind, attributes)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Exporters
+# ─────────────────────────────────────────────────────────────────────────────
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items() if v is not None]
+
+
+def to_otlp(spans: List[Span], service_name: str = "synai") -> Dict[str, Any]:
+    """Monta um documento OTLP/JSON (ExportTraceServiceRequest) com os spans."""
+    from . import __version__
+
+    return {"resourceSpans": [{
+        "resource": {"attributes": _otlp_attributes({"service.name": service_name})},
+        "scopeSpans": [{
+            "scope": {"name": "synai", "version": __version__},
+            "spans": [{
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "parentSpanId": s.parent_id or "",
+                "name": s.name,
+                "kind": s.kind,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": _otlp_attributes(s.attributes),
+                "events": [{"name": e["name"], "timeUnixNano": str(e["timeUnixNano"]),
+                            "attributes": _otlp_attributes(e["attributes"])} for e in s.events],
+                "status": {"code": s.status_code, "message": s.status_message},
+            } for s in spans],
+        }],
+    }]}
+
+
+class InMemoryExporter:
+    """Guarda os spans exportados em memória — útil em testes."""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def export(self, spans: List[Span], service_name: str = "synai") -> None:
+        self.spans.extend(spans)
+
+    def find(self, name_prefix: str) -> List[Span]:
+        return [s for s in self.spans if s.name.startswith(name_prefix)]
+
+    def clear(self) -> None:
+        self.spans.clear()
+
+    def shutdown(self) -> None:
+        pass
+
+
+class JsonlExporter:
+    """Acrescenta cada lote de spans como uma linha OTLP/JSON em um arquivo."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def export(self, spans: List[Span], service_name: str = "synai") -> None:
+        line = json.dumps(to_otlp(spans, service_name), ensure_ascii=False, default=str)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+
+    def shutdown(self) -> None:
+        pass
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Tracer
+# ─────────────────────────────────────────────────────────────────────────────
+class Tracer:
+    """
+    Coleta spans finalizados e os entrega ao exporter em lotes: quando um
+    span raiz local termina ou quando o buffer atinge batch_size.
+    """
+
+    def __init__(self, exporter=None, service_name: str = "synai", batch_size: int = 256):
+        self.exporter = exporter if exporter is not None else InMemoryExporter()
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self._pending: List[Span] = []
+
+    def activate(self, traceparent: Optional[str] = None):
+        """
+        Torna este tracer o ativo no contexto atual, opcionalmente como filho
+        de um trace remoto. Retorna o token para deactivate().
+        """
+        remote = SpanContext.from_traceparent(traceparent)
+        return _current_tracer.set(self), _current_span.set(remote)
+
+    @staticmethod
+    def deactivate(token) -> None:
+        tracer_token, span_token = token
+        _current_span.reset(span_token)
+        _current_tracer.reset(tracer_token)
+
+    def _finish(self, span_: Span) -> None:
+        self._pending.append(span_)
+        if len(self._pending) >= self.batch_size or not isinstance(_current_span.get(), Span):
+            self.flush()
+
+    def flush(self) -> None:
+        """Entrega ao exporter os spans finalizados ainda pendentes."""
+        pending, self._pending = self._pending, []
+        if pending:
+            self.exporter.export(pending, self.service_name)
+
+    def shutdown(self) -> None:
+        self.flush()
+        self.exporter.shutdown()
@@ -1,6 +1,9 @@
 import jsonschema
 from jsonschema import validate
 
+from .memory import STRATEGIES, memory_window
+from .tools import ToolOptions
+
 ast_schema = {
     "type": "object",
     "properties": {
@@ -10,6 +13,18 @@ ast_schema = {
     "required": ["type", "declarations"]
 }
 
+def iter_statements(statements: list):
+    """Percorre as instruções de um workflow, descendo nos ramos de blocos parallel."""
+    for stmt in statements:
+        yield stmt
+        if stmt['type'] == 'Parallel':
+            yield from iter_statements(stmt.get('branches', []))
+
+def _has_memory(agent: dict) -> bool:
+    props = agent.get('properties', {})
+    return memory_window(props.get('memory'), str(props.get('model', ''))) is not None
+
+
 def build_synai(ast: dict) -> dict:
     """Valida e enriquece AST."""
     warnings = []
@@ -22,12 +37,44 @@ def build_synai(ast: dict) -> dict:
                 name = decl.get('name', '')
                 agents = {a['id']: a for block in decl.get('blocks', []) if block['type'] == 'AgentsBlock' for a in block.get('agents', [])}
 
-                # valida intents e conexões
+                # memória de conversa: janela válida e estratégia conhecida
+                for agent_id, agent in agents.items():
+                    props = agent.get('properties', {})
+                    if 'memory' in props:
+                        memory_window(props['memory'], str(props.get('model', '')))
+                    if props.get('memory_strategy', 'trim') not in STRATEGIES:
+                        raise ValueError(f"memory_strategy inválida em '{agent_id}': '{props['memory_strategy']}'")
+                    # executor/max_concurrency/timeout de agentes TOOL
+                    if str(props.get('agent_type', agent.get('agent_type', ''))).upper() == 'TOOL':
+                        try:
+                            ToolOptions.from_properties(props)
+                        except ValueError as e:
+                            raise ValueError(f"Opções de ferramenta inválidas em '{agent_id}': {e}")
+
+                # valida intents, fan-outs e conexões (inclusive dentro de blocos parallel)
                 for block in decl.get('blocks', []):
                     if block['type'] == 'Workflow':
-                        for stmt in block.get('statements', []):
-                            if stmt['type'] == 'Intent' and stmt['agent'] not in agents:
+                        for stmt in iter_statements(block.get('statements', [])):
+                            if stmt['type'] in ('Intent', 'Map') and stmt['agent'] not in agents:
                                 raise ValueError(f"Agent '{stmt['agent']}' not definido em '{name}'")
+                            elif stmt['type'] == 'Map' and _has_memory(agents[stmt['agent']]):
+                                raise ValueError(f"Map '{stmt['name']}': o agente '{stmt['agent']}' usa memory, "
+                                                 f"que não vale em map")
+                            elif stmt['type'] == 'Map' and stmt.get('max_concurrency') is not None \
+                                    and stmt['max_concurrency'] < 1:
+                                raise ValueError(f"max_concurrency inválido em map '{stmt['name']}'")
+                            elif stmt['type'] == 'Parallel' and not stmt.get('branches'):
+                                raise ValueError(f"Bloco parallel vazio em '{name}'")
+                            elif stmt['type'] == 'Parallel':
+                                # memória: um ramo por agente, senão as trocas entram em ordem arbitrária
+                                owner = {}
+                                for index, branch in enumerate(stmt['branches']):
+                                    for inner in iter_statements([branch]):
+                                        agent_id = inner.get('agent')
+                                        if inner['type'] in ('Intent', 'Map') and _has_memory(agents.get(agent_id, {})) \
+                                                and owner.setdefault(agent_id, index) != index:
+                                            raise ValueError(f"Agente '{agent_id}' usa memory e aparece em mais de "
+                                                             f"um ramo do mesmo bloco parallel")
                             elif stmt['type'] == 'Connect':
                                 if stmt['from'] not in agents or stmt['to'] not in agents:
                                     raise ValueError(f"Conexão inválida '{stmt['from']} -> {stmt['to']}'")
@@ -3,8 +3,49 @@ import os
 import uuid
 import networkx as nx
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 from networkx.readwrite import json_graph
+from .weave import iter_statements
+
+def linked_path_for(source_path: str) -> str:
+    """Retorna o caminho do arquivo linked correspondente (foo.synx → foo_linked.synx)."""
+    dir_name = os.path.dirname(source_path)
+    base_name = os.path.basename(source_path)
+    if base_name.endswith('.synx'):
+        linked_base = base_name[:-5] + '_linked.synx'
+    else:
+        root, ext = os.path.splitext(base_name)
+        linked_base = f"{root}_linked{ext}"
+    return os.path.join(dir_name, linked_base)
+
+
+def resolve_linked_path(synx_path: str) -> Optional[str]:
+    """
+    Localiza o arquivo linked a executar.
+    Aceita o próprio arquivo linked ou o .synx original (auto-detecta o linked).
+    Retorna None se nenhum arquivo linked existir.
+    """
+    if '_linked' in os.path.basename(synx_path):
+        return synx_path if os.path.exists(synx_path) else None
+    linked_path = linked_path_for(synx_path)
+    return linked_path if os.path.exists(linked_path) else None
+
+
+def load_linked(linked_path: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Carrega um arquivo linked e retorna (validated_ast, run_decl).
+
+    Raises:
+        ValueError: Se o arquivo não contém uma declaração 'run'.
+    """
+    with open(linked_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    ast = data.get('validated_ast', data)
+    run_decl = next((d for d in ast.get('declarations', []) if d['type'] == 'Run'), None)
+    if not run_decl:
+        raise ValueError(f"Nenhuma declaração 'run' em {linked_path}.")
+    return ast, run_decl
+
 
 def weave_linker(ast: Dict[str, Any], source_path: str) -> str:
     """
@@ -49,7 +90,7 @@ def weave_linker(ast: Dict[str, Any], source_path: str) -> str:
             if block['type'] == 'Workflow':
                 wf_name = block.get('name', 'unnamed_workflow')
                 print(f"🔄  Workflow: {wf_name}")
-                for stmt in block.get('statements', []):
+                for stmt in iter_statements(block.get('statements', [])):
                     if stmt['type'] == 'Connect':
                         src = stmt['from']
                         dst = stmt['to']
@@ -79,15 +120,8 @@ def weave_linker(ast: Dict[str, Any], source_path: str) -> str:
     }
 
     # Caminho de saída: mantém o diretório original e altera o nome do arquivo com robustez
-    dir_name = os.path.dirname(source_path)
-    base_name = os.path.basename(source_path)
-    if base_name.endswith('.synx'):
-        linked_base = base_name[:-5] + '_linked.synx'
-    else:
-        root, ext = os.path.splitext(base_name)
-        linked_base = f"{root}_linked{ext}"
-    output_path = os.path.join(dir_name, linked_base)
-    os.makedirs(dir_name or '.', exist_ok=True)
+    output_path = linked_path_for(source_path)
+    os.makedirs(os.path.dirname(source_path) or '.', exist_ok=True)
 
     with open(output_path, 'w', encoding='utf-8') as f:
         json.dump(linked_data, f, indent=2, ensure_ascii=False)
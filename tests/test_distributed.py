@@ -0,0 +1,127 @@
+"""Execução distribuída com workers em processos separados, em localhost."""
+import asyncio
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from synai.accounting import CostLedger
+from synai.network import DistributedExecutor, MeshNode, RemoteIntentError
+from synai.runtime import SynRuntime
+
+SECRET = "segredo-de-teste"
+
+WORKER = textwrap.dedent('''
+    import asyncio, sys
+    from synai.interfaces import GenerationResult, Usage
+    from synai.network import MeshNode, WorkerService
+    from synai.runtime import SynRuntime
+
+    class Echo:
+        def is_available(self):
+            return True
+
+        async def generate(self, prompt, model, **kwargs):
+            return GenerationResult("ok", Usage(100, 10))
+
+    async def main():
+        runtime = SynRuntime(real=False)
+        runtime.register_llm_provider("echo", Echo(), set_default=True)
+
+        attempts = []
+
+        async def boom(config, intent, input_data):
+            attempts.append(intent["name"])
+            await runtime.call_model("m", "antes da falha", 16, preferred_provider="echo")
+            raise ValueError("falha determinística")
+
+        runtime.adapters["BOOM"] = boom
+        node = MeshNode(sys.argv[1], port=0, secret=sys.argv[2])
+        WorkerService(node, runtime)
+        node.on_message("attempts", lambda sender, content: asyncio.sleep(0, len(attempts)))
+        await node.start()
+        print(node.port, flush=True)
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+''')
+
+AGENT = {"id": "a", "properties": {"model": "m", "provider": "echo"}}
+BOOM = {"id": "b", "properties": {"agent_type": "BOOM"}}
+RUNTIME = SynRuntime(real=False)  # só o coordenador; os intents rodam nos workers
+
+
+@pytest.fixture
+def workers():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PYTHONPATH": root + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    procs = [subprocess.Popen([sys.executable, "-c", WORKER, f"w{i}", SECRET], stdout=subprocess.PIPE,
+                              env=env, text=True) for i in range(2)]
+    try:
+        yield [(f"w{i}", int(proc.stdout.readline())) for i, proc in enumerate(procs)]
+    finally:
+        for proc in procs:
+            proc.kill()
+            proc.wait()
+
+
+async def _executor(workers):
+    executor = DistributedExecutor(MeshNode("coord", role="coordinator", secret=SECRET),
+                                   timeout=10, local_fallback=False)
+    for worker_id, port in workers:
+        executor.add_worker(worker_id, f"tcp://127.0.0.1:{port}")
+    return executor
+
+
+def test_intents_run_on_worker_processes(workers):
+    async def scenario():
+        executor = await _executor(workers)
+        ledger = CostLedger()
+        token = ledger.activate()
+        try:
+            outputs = await asyncio.gather(*(
+                executor.run_intent(RUNTIME, AGENT, {"name": f"i{n}", "type": "Intent"}, "x") for n in range(6)))
+        finally:
+            CostLedger.deactivate(token)
+            await executor.aclose()
+        assert outputs == ["ok"] * 6
+        assert executor.stats == {"dispatched": 6, "retries": 0, "local": 0}
+        assert len(ledger.calls) == 6 and ledger.prompt_tokens == 600
+
+    asyncio.run(scenario())
+
+
+def test_worker_error_is_not_retried_and_keeps_its_calls(workers):
+    async def scenario():
+        executor = await _executor(workers)
+        ledger = CostLedger()
+        token = ledger.activate()
+        try:
+            with pytest.raises(RemoteIntentError, match="falha determinística"):
+                await executor.run_intent(RUNTIME, BOOM, {"name": "quebra", "type": "Intent"}, "x")
+            attempts = [(await executor.node.send(worker_id, "attempts"))["data"] for worker_id, _ in workers]
+        finally:
+            CostLedger.deactivate(token)
+            await executor.aclose()
+        # Uma única tentativa, num único worker, e o gasto dela chegou ao coordenador
+        assert executor.stats["retries"] == 0 and executor.stats["local"] == 0
+        assert sorted(attempts) == [0, 1]
+        assert len(ledger.calls) == 1 and ledger.calls[0]["provider"] == "echo"
+
+    asyncio.run(scenario())
+
+
+def test_dead_worker_is_retried_on_the_next(workers):
+    async def scenario():
+        executor = await _executor(workers)
+        executor.add_worker("morto", "tcp://127.0.0.1:1")
+        executor.node.peers["morto"]["load"] = {"in_flight": -1}  # o preferido do pick_peer
+        try:
+            output = await executor.run_intent(RUNTIME, AGENT, {"name": "i", "type": "Intent"}, "x")
+        finally:
+            await executor.aclose()
+        assert output == "ok" and executor.stats["retries"] == 1
+
+    asyncio.run(scenario())
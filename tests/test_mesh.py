@@ -0,0 +1,116 @@
+"""Malha em localhost: vários nós, handshake com segredo compartilhado e HELLOs assinados."""
+import asyncio
+import json
+
+import pytest
+
+from synai.network import MeshDiscovery, MeshNode, MeshServer, MeshTransportError
+
+SECRET = "segredo-de-teste"
+
+
+async def _echo(sender, content):
+    return {"echo": content, "from": sender}
+
+
+async def _start_nodes(*secrets):
+    nodes = []
+    for i, secret in enumerate(secrets):
+        node = MeshNode(f"n{i}", port=0, secret=secret)
+        node.on_message("echo", _echo)
+        nodes.append(await node.start())
+    return nodes
+
+
+def test_nodes_talk_with_shared_secret():
+    async def scenario():
+        nodes = await _start_nodes(SECRET, SECRET, SECRET)
+        try:
+            for node in nodes:
+                for peer in nodes:
+                    if peer is not node:
+                        node.register_peer(peer.node_id, f"tcp://127.0.0.1:{peer.port}")
+            results = await asyncio.gather(*(nodes[0].broadcast("echo", {"n": 1}) for _ in range(5)))
+            for result in results:
+                assert {peer: r["data"]["from"] for peer, r in result.items()} == {"n1": "n0", "n2": "n0"}
+            response = await nodes[2].send("n1", "echo", "oi")
+            assert response["status"] == "success" and response["data"]["echo"] == "oi"
+        finally:
+            for node in nodes:
+                await node.stop()
+
+    asyncio.run(scenario())
+
+
+def test_wrong_or_missing_secret_is_rejected(monkeypatch):
+    monkeypatch.delenv("SYNAI_MESH_SECRET", raising=False)
+
+    async def scenario():
+        server, intruder, anonymous = await _start_nodes(SECRET, "outro", None)
+        try:
+            for node in (intruder, anonymous):
+                node.register_peer("server", f"tcp://127.0.0.1:{server.port}")
+                with pytest.raises(MeshTransportError):
+                    await node.send("server", "echo", "x")
+                assert node.get_peer("server")["status"] == "unreachable"
+            # E o servidor não fala com quem não conhece o segredo (autenticação mútua)
+            server.register_peer("intruder", f"tcp://127.0.0.1:{intruder.port}")
+            with pytest.raises(MeshTransportError):
+                await server.send("intruder", "echo", "x")
+        finally:
+            for node in (server, intruder, anonymous):
+                await node.stop()
+
+    asyncio.run(scenario())
+
+
+def test_raw_connection_without_handshake_gets_no_response():
+    async def scenario():
+        calls = []
+
+        async def handler(sender, payload, origin):
+            calls.append(payload)
+            return {"status": "success"}
+
+        server = MeshServer("s", handler, port=0, secret=SECRET)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            body = json.dumps({"id": 1, "kind": "request", "sender": "x", "payload": {"action": "echo"}}).encode()
+            writer.write(len(body).to_bytes(4, "big") + b"\x00" + body)
+            await writer.drain()
+            data = await asyncio.wait_for(reader.read(), 2)  # desafio e depois EOF
+            assert b'"challenge"' in data and b'"response"' not in data
+            writer.close()
+        finally:
+            await server.stop()
+        assert calls == []
+
+    asyncio.run(scenario())
+
+
+def test_server_refuses_public_bind_without_secret(monkeypatch):
+    monkeypatch.delenv("SYNAI_MESH_SECRET", raising=False)
+
+    async def scenario():
+        with pytest.raises(ValueError):
+            await MeshServer("s", _echo, host="0.0.0.0", port=0).start()
+
+    asyncio.run(scenario())
+    assert MeshNode("n").host == "127.0.0.1"
+
+
+def test_discovery_accepts_only_signed_hellos():
+    seen = []
+    listener = MeshDiscovery("a", secret=SECRET)
+    listener.on_peer = seen.append
+
+    listener._on_datagram(MeshDiscovery("b", 9001, secret=SECRET)._hello(), ("127.0.0.1", 1))
+    listener._on_datagram(MeshDiscovery("c", 9002, secret="outro")._hello(), ("127.0.0.1", 1))
+    forged = json.loads(MeshDiscovery("d", 9003, secret=SECRET)._hello())
+    forged["port"] = 6666
+    listener._on_datagram(json.dumps(forged).encode(), ("127.0.0.1", 1))
+    listener._on_datagram(json.dumps({"type": "HELLO", "id": "e", "port": 9004}).encode(), ("127.0.0.1", 1))
+
+    assert [peer["id"] for peer in seen] == ["b"]
+    assert seen[0]["url"] == "tcp://127.0.0.1:9001" and "ts" not in seen[0]